@@ -1,21 +1,228 @@
 """
 Script Python pour extraire TOUTES les informations des BLOCS uniquement
-Nécessite: pip install pywin32
+Nécessite: pip install pywin32 (fichiers DWG via AutoCAD)
+Les fichiers DXF sont lus directement, sans AutoCAD
 """
 
-import win32com.client
 import os
+import sys
 import json
 import time
+import contextlib
+from array import array
 from datetime import datetime
 
+from backends import choisir_backend
+from xrefs import CacheXrefs, XrefCirculaire, trouver_xref
+from parcours import ParcoursEntites, ContexteParcours, espace_du_bloc
+from acces_com import AccesseurCOM, PlanProprietes
+from statistiques import AccumulateurStatistiques
+from sorties import EcrivainNDJSON
+from export_colonnes import exporter_colonnes
+from index_incremental import extraire_incremental
+from reprise import PointDeReprise
+from surveillance import Surveillant, DocumentAbandonne
+from selection import FiltreReferences, source_references
+from profils import profil_extraction, developper, empreinte_reglages
+from hierarchie_blocs import HierarchieBlocs
+from emprises import EmprisesBlocs, union_boites, emprise_en_dict
+from empreintes import dedupliquer, definition_compacte
+from index_spatial import IndexSpatial
+from instrumentation import Instrumentation, mesurer_phase
+from rapport_blocs import RapportTexte, RapportCSV, RapportHTML, generer_rapports, enregistrements_blocs_info
+from enregistrements import Instance, AttributInstance, nouvelle_entite, restaurer, en_json, TYPES_COTES
+
+# Gestionnaires de géométrie par type d'entité (ObjectName)
+GEOMETRIES = {
+    "AcDbAttributeDefinition": "_geometrie_attribut",
+    "AcDbLine": "_geometrie_ligne",
+    "AcDbCircle": "_geometrie_cercle",
+    "AcDbArc": "_geometrie_arc",
+    "AcDbText": "_geometrie_texte",
+    "AcDbMText": "_geometrie_texte",
+    "AcDbPolyline": "_geometrie_polyligne",
+    "AcDb2dPolyline": "_geometrie_polyligne",
+    "AcDb3dPolyline": "_geometrie_polyligne",
+    "AcDbPoint": "_geometrie_point",
+    "AcDbSpline": "_geometrie_spline",
+    "AcDbHatch": "_geometrie_hachure",
+    "AcDbBlockReference": "_geometrie_reference",
+}
+
+# Toujours relevés, quel que soit le profil: attributs et hiérarchie des blocs
+STRUCTURE = ("AcDbAttributeDefinition", "AcDbBlockReference")
+GEOMETRIES.update((obj_type, "_geometrie_cote") for obj_type in TYPES_COTES)
+
+# Plans de lecture des propriétés COM: (champ, propriété)
+PLAN_INSTANCE = PlanProprietes(
+    obligatoires=[
+        ('nom_bloc', 'Name'),
+        ('est_dynamique', 'IsDynamicBlock'),
+        ('insertion', 'InsertionPoint'),
+        ('rotation', 'Rotation'),
+        ('echelle_x', 'XScaleFactor'),
+        ('echelle_y', 'YScaleFactor'),
+        ('echelle_z', 'ZScaleFactor'),
+        ('calque', 'Layer')
+    ],
+    optionnels=[
+        ('couleur', 'Color'),
+        ('type_ligne', 'Linetype'),
+        ('epaisseur_ligne', 'Lineweight'),
+        ('visible', 'Visible'),
+        ('handle', 'Handle')
+    ]
+)
+
+PLAN_ATTRIBUT = PlanProprietes(
+    obligatoires=[
+        ('tag', 'TagString'),
+        ('valeur', 'TextString'),
+        ('invisible', 'Invisible'),
+        ('hauteur', 'Height'),
+        ('insertion', 'InsertionPoint')
+    ]
+)
+
+PLAN_REFERENCE_IMBRIQUEE = PlanProprietes(
+    obligatoires=[
+        ('nom_bloc', 'Name'),
+        ('insertion', 'InsertionPoint'),
+        ('rotation', 'Rotation'),
+        ('echelle_x', 'XScaleFactor'),
+        ('echelle_y', 'YScaleFactor'),
+        ('echelle_z', 'ZScaleFactor')
+    ],
+    optionnels=[('est_dynamique', 'IsDynamicBlock')]
+)
+
+# Géométries lues d'un bloc: un seul appel par tableau de coordonnées
+PLAN_LIGNE = PlanProprietes(
+    obligatoires=[('debut', 'StartPoint'), ('fin', 'EndPoint'), ('longueur', 'Length')]
+)
+
+PLAN_CERCLE = PlanProprietes(
+    obligatoires=[('centre', 'Center'), ('rayon', 'Radius')]
+)
+
+PLAN_ARC = PlanProprietes(
+    obligatoires=[('centre', 'Center'), ('rayon', 'Radius'),
+                  ('angle_debut', 'StartAngle'), ('angle_fin', 'EndAngle')]
+)
+
+PLAN_TEXTE = PlanProprietes(
+    obligatoires=[('texte', 'TextString'), ('hauteur', 'Height')],
+    optionnels=[('insertion', 'InsertionPoint')]
+)
+
+PLAN_POLYLIGNE = PlanProprietes(
+    obligatoires=[('sommets', 'Coordinates')],
+    optionnels=[('ferme', 'Closed'), ('elevation', 'Elevation')]
+)
+
+PLAN_SPLINE = PlanProprietes(
+    obligatoires=[('degre', 'Degree'), ('points_controle', 'ControlPoints')],
+    optionnels=[('ferme', 'Closed'), ('points_ajustement', 'FitPoints')]
+)
+
+PLAN_COTE = PlanProprietes(
+    optionnels=[
+        ('mesure', 'Measurement'),
+        ('texte', 'TextOverride'),
+        ('position_texte', 'TextPosition'),
+        ('point_1', 'ExtLine1Point'),
+        ('point_2', 'ExtLine2Point')
+    ]
+)
+
+PLAN_HACHURE = PlanProprietes(
+    optionnels=[('motif', 'PatternName'), ('aire', 'Area'), ('nombre_boucles', 'NumberOfLoops')]
+)
+
+# En-tête d'une définition de bloc
+PLAN_DEFINITION = PlanProprietes(
+    obligatoires=[
+        ('est_xref', 'IsXRef'),
+        ('est_layout', 'IsLayout'),
+        ('nombre_entites', 'Count')
+    ]
+)
+
+PLAN_XREF = PlanProprietes(
+    obligatoires=[('nom', 'Name'), ('chemin', 'Path')]
+)
+
+# Propriété dynamique: nom et valeur par instance, métadonnées une fois par bloc
+PLAN_PROPRIETE_DYNAMIQUE = PlanProprietes(
+    obligatoires=[('nom', 'PropertyName'), ('valeur', 'Value')]
+)
+
+PLAN_METADONNEES_PROPRIETE = PlanProprietes(
+    obligatoires=[('lecture_seule', 'ReadOnly'), ('type_unite', 'UnitsType')],
+    optionnels=[('description', 'Description')]
+)
+
+PLAN_DEFINITION_ATTRIBUT = PlanProprietes(
+    optionnels=[
+        ('tag', 'TagString'),
+        ('prompt', 'PromptString'),
+        ('valeur_defaut', 'TextString'),
+        ('constant', 'Constant'),
+        ('invisible', 'Invisible'),
+        ('preset', 'Preset'),
+        ('verification', 'Verify')
+    ]
+)
+
 class ExtracteurBlocs:
     """Classe pour extraire toutes les informations des blocs d'un fichier DWG"""
     
-    def __init__(self, chemin_dwg):
+    def __init__(self, chemin_dwg, backend=None, delais=None, filtre_references=None,
+                 selection_serveur=False, valeurs_autorisees='instance', profil=None,
+                 instrumentation=None, xrefs=None):
         self.chemin_dwg = chemin_dwg
+        self.backend = backend if backend is not None else choisir_backend(chemin_dwg)
         self.acad = None
         self.doc = None
+        self.acces = AccesseurCOM()
+        # Mesures de l'extraction (voir instrumentation): Instrumentation, True, ou None
+        self.instrumentation = Instrumentation() if instrumentation is True else instrumentation
+        self.acces.instrumentation = self.instrumentation
+        self.erreur = None
+        # Délais des appels COM (voir surveillance.DELAIS_PAR_DEFAUT); None: sans surveillance
+        self.delais = delais
+        self.surveillant = None
+        # Références retenues ({'calques': [...], 'noms': [...]}) et, pour
+        # l'extraction des instances seules, sélection filtrée par AutoCAD
+        self.filtre = FiltreReferences(**filtre_references) if filtre_references else None
+        self.selection_serveur = selection_serveur
+        # Définitions développées et géométries relevées (voir profils.PROFILS)
+        self.profil = profil_extraction(profil)
+        # Métadonnées des propriétés dynamiques par (nom effectif, propriété):
+        # lues une fois par bloc, seule la valeur est lue pour chaque instance.
+        # valeurs_autorisees='definition': les valeurs autorisées sont écrites une
+        # fois par bloc (blocs_info['proprietes_dynamiques']) et non par instance
+        self.valeurs_autorisees = valeurs_autorisees
+        self._proprietes_dynamiques = {}
+        # Xrefs suivies (voir xrefs): CacheXrefs partagé, dossier du cache,
+        # True (cache en mémoire) ou None (xrefs relevées sans être ouvertes)
+        if xrefs is True:
+            xrefs = CacheXrefs()
+        elif isinstance(xrefs, str):
+            xrefs = CacheXrefs(xrefs)
+        self.cache_xrefs = xrefs
+        # Clés (voir CacheXrefs.cle) des dessins en cours d'extraction, de l'hôte à celui-ci
+        self._pile_xrefs = None
+        self.statistiques = AccumulateurStatistiques()
+        self.nombre_extraits = {
+            'definitions_blocs': 0,
+            'instances_blocs': 0,
+            'blocs_dynamiques': 0
+        }
+        # Écrivain NDJSON en mode flux: les enregistrements ne sont pas conservés
+        self._flux = None
+        # Progression du parcours des blocs (reprise après une erreur)
+        self._reprise = None
         self.blocs_info = {
             'definitions_blocs': [],
             'instances_blocs': [],
@@ -23,411 +230,890 @@ class ExtracteurBlocs:
             'statistiques': {}
         }
         
+    def _ignorer(self, site, erreur):
+        """Exception ignorée: comptée par site quand l'extraction est instrumentée"""
+        if self.instrumentation is not None:
+            self.instrumentation.exception(site, erreur)
+    
+    @mesurer_phase
     def ouvrir_fichier(self):
-        """Ouvre le fichier DWG"""
+        """Ouvre le fichier DWG (ou DXF) avec le backend choisi"""
         try:
-            if not os.path.exists(self.chemin_dwg):
-                raise FileNotFoundError(f"Le fichier n'existe pas: {self.chemin_dwg}")
-            
             print(f"Ouverture du fichier: {self.chemin_dwg}")
             print("Veuillez patienter...\n")
             
-            self.acad = win32com.client.Dispatch("AutoCAD.Application")
-            self.acad.Visible = True
-            
-            # Ouvrir le document
-            self.doc = self.acad.Documents.Open(self.chemin_dwg)
-            
-            # IMPORTANT: Attendre que le document soit complètement chargé
-            print("⏳ Chargement du document en cours...")
-            time.sleep(3)  # Attendre 3 secondes
-            
-            # Forcer AutoCAD à terminer le chargement
-            try:
-                self.acad.Update()
-            except:
-                pass
-            
-            time.sleep(2)  # Attendre encore 2 secondes
+            self.doc = self.backend.ouvrir(self.chemin_dwg)
+            self.acad = getattr(self.backend, 'acad', None)
             
             print("✅ Fichier ouvert avec succès!\n")
             return True
             
         except Exception as e:
+            self.erreur = str(e)
             print(f"❌ ERREUR lors de l'ouverture: {str(e)}")
             return False
     
-    def extraire_definitions_blocs(self):
-        """Extrait toutes les définitions de blocs (Block Definitions)"""
-        print("🔲 Extraction des définitions de blocs...")
+    def fermer_fichier(self):
+        """Ferme le document (sans enregistrer); la session AutoCAD reste ouverte"""
+        if self.doc is None:
+            return
+        if self.surveillant is not None and self.surveillant.abandon is not None:
+            # Application bloquée ou arrêtée: aucun appel de plus
+            self.doc = None
+            return
+        fermer = getattr(self.backend, 'fermer', None)
+        try:
+            if fermer is not None:
+                fermer(self.doc)
+        except Exception as e:
+            print(f"⚠️ Fermeture du document impossible: {str(e)}")
+        self.doc = None
+    
+    def _creer_parcours(self, definitions=False, instances=False, dynamiques=False):
+        """Prépare le parcours unique avec les gestionnaires demandés"""
+        parcours = ParcoursEntites(self.acces)
+        if self.surveillant is not None:
+            surveillant = self.surveillant
+            parcours.sur_entite(lambda ctx, j: surveillant.entite(ctx.nom or ctx.espace, j))
+        
+        if definitions:
+            parcours.sur_bloc(self._debut_definition, self._fin_definition)
+            self._enregistrer_definition(parcours)
+        
+        if instances or dynamiques:
+            def visiter_reference(entity, obj_type, ctx):
+                self._visiter_reference(entity, ctx, instances, dynamiques)
+            parcours.enregistrer(visiter_reference, "AcDbBlockReference")
+        
+        return parcours
+    
+    def _enregistrer_definition(self, parcours):
+        """Gestionnaires décrivant les entités d'une définition de bloc"""
+        geometries = self.profil['geometries']
+        parcours.enregistrer(self._visiter_entite_definition)
+        for obj_type, nom_methode in GEOMETRIES.items():
+            if geometries is None or obj_type in geometries or obj_type in STRUCTURE:
+                parcours.enregistrer(getattr(self, nom_methode), obj_type)
+        parcours.enregistrer(self._ajouter_entite_definition)
+    
+    def _extraire(self, definitions=False, instances=False, dynamiques=False):
+        """Extrait en un seul passage sur le dessin les informations demandées"""
+        parcours = self._creer_parcours(definitions, instances, dynamiques)
+        
+        if definitions:
+            # Les espaces objet et papier sont des blocs de présentation:
+            # leurs instances sont relevées pendant le même passage, ou par un
+            # parcours des seules références si le profil ne les développe pas
+            parcours_references = None
+            if instances or dynamiques:
+                parcours_references = self._creer_parcours(instances=instances, dynamiques=dynamiques)
+            self._parcourir_blocs(parcours, parcours_references)
+        else:
+            for espace in ("ModelSpace", "PaperSpace"):
+                with source_references(self.doc, espace, self.filtre,
+                                       self.selection_serveur) as (source, par_selection):
+                    mode = "jeu de sélection" if par_selection else "toutes les entités"
+                    print(f"  → Parcours du {espace} ({mode})...")
+                    ctx = ContexteParcours(source, espace=espace)
+                    ctx.selection = par_selection
+                    parcours.parcourir_bloc(ctx)
+        
+        if dynamiques and self.valeurs_autorisees == 'definition':
+            proprietes = self.proprietes_dynamiques_par_bloc()
+            if self._flux is not None:
+                self._flux.ecrire('proprietes_dynamiques', proprietes)
+            else:
+                self.blocs_info['proprietes_dynamiques'] = proprietes
+    
+    def _compter(self, categorie, enregistrement):
+        """Tient à jour les compteurs et les statistiques"""
+        self.nombre_extraits[categorie] += 1
+        if categorie == 'definitions_blocs':
+            self.statistiques.ajouter_definition(enregistrement)
+        elif categorie == 'instances_blocs':
+            self.statistiques.ajouter_instance(enregistrement)
+    
+    def _emettre(self, categorie, enregistrement):
+        """Transmet un enregistrement extrait: ajouté à blocs_info,
+        ou écrit immédiatement en mode flux"""
+        self._compter(categorie, enregistrement)
+        if self._flux is not None:
+            self._flux.ecrire(categorie, enregistrement)
+        else:
+            self.blocs_info[categorie].append(enregistrement)
+    
+    def _parcourir_blocs(self, parcours, parcours_references=None):
+        """Parcourt toutes les définitions de blocs (Block Definitions)
+        Après une erreur COM, le parcours reprend au bloc en échec"""
+        reprise = self._reprise if self._reprise is not None else PointDeReprise()
         
         # Plusieurs tentatives en cas d'erreur COM
         max_retries = 3
         for attempt in range(max_retries):
             try:
-                # Convertir en liste pour éviter les problèmes d'itération COM
-                blocks_list = []
-                blocks_count = self.doc.Blocks.Count
+                blocks = self.doc.Blocks
+                blocks_count = blocks.Count
                 
-                for i in range(blocks_count):
-                    try:
-                        block = self.doc.Blocks.Item(i)
-                        blocks_list.append(block)
-                    except:
-                        continue
+                while reprise.prochain_index < blocks_count:
+                    self._parcourir_bloc_valide(parcours, blocks, reprise, parcours_references)
                 
-                # Maintenant extraire les informations
-                for block in blocks_list:
-                    try:
-                        bloc_def = {
-                            'nom': block.Name,
-                            'est_dynamique': False,
-                            'est_xref': block.IsXRef,
-                            'est_layout': block.IsLayout,
-                            'nombre_entites': block.Count,
-                            'origine': None,
-                            'entites_contenues': [],
-                            'attributs': []
-                        }
-                        
-                        # Origine du bloc
-                        try:
-                            bloc_def['origine'] = {
-                                'x': block.Origin[0],
-                                'y': block.Origin[1],
-                                'z': block.Origin[2]
-                            }
-                        except:
-                            pass
-                        
-                        # Vérifier si c'est un bloc dynamique
-                        try:
-                            bloc_def['est_dynamique'] = block.IsDynamicBlock
-                        except:
-                            pass
-                        
-                        # Lister les entités contenues dans le bloc
-                        entites_types = {}
-                        try:
-                            for j in range(block.Count):
-                                try:
-                                    entity = block.Item(j)
-                                    obj_type = entity.ObjectName
-                                    entites_types[obj_type] = entites_types.get(obj_type, 0) + 1
-                                    
-                                    # Détails de l'entité
-                                    entite_info = {
-                                        'type': obj_type,
-                                        'calque': entity.Layer if hasattr(entity, 'Layer') else None
-                                    }
-                                    
-                                    # Informations spécifiques pour les attributs
-                                    if obj_type == "AcDbAttributeDefinition":
-                                        entite_info['tag'] = entity.TagString if hasattr(entity, 'TagString') else None
-                                        entite_info['prompt'] = entity.PromptString if hasattr(entity, 'PromptString') else None
-                                        entite_info['valeur_defaut'] = entity.TextString if hasattr(entity, 'TextString') else None
-                                        entite_info['constant'] = entity.Constant if hasattr(entity, 'Constant') else None
-                                        entite_info['invisible'] = entity.Invisible if hasattr(entity, 'Invisible') else None
-                                        entite_info['preset'] = entity.Preset if hasattr(entity, 'Preset') else None
-                                        entite_info['verification'] = entity.Verify if hasattr(entity, 'Verify') else None
-                                        
-                                        bloc_def['attributs'].append(entite_info)
-                                    
-                                    # Info géométrique selon le type
-                                    elif obj_type == "AcDbLine":
-                                        entite_info['debut'] = list(entity.StartPoint)
-                                        entite_info['fin'] = list(entity.EndPoint)
-                                        entite_info['longueur'] = entity.Length
-                                    
-                                    elif obj_type == "AcDbCircle":
-                                        entite_info['centre'] = list(entity.Center)
-                                        entite_info['rayon'] = entity.Radius
-                                    
-                                    elif obj_type == "AcDbArc":
-                                        entite_info['centre'] = list(entity.Center)
-                                        entite_info['rayon'] = entity.Radius
-                                        entite_info['angle_debut'] = entity.StartAngle
-                                        entite_info['angle_fin'] = entity.EndAngle
-                                    
-                                    elif obj_type == "AcDbText" or obj_type == "AcDbMText":
-                                        entite_info['texte'] = entity.TextString
-                                        entite_info['hauteur'] = entity.Height
-                                    
-                                    bloc_def['entites_contenues'].append(entite_info)
-                                    
-                                except Exception as e:
-                                    continue
-                        except:
-                            pass
-                        
-                        bloc_def['types_entites'] = entites_types
-                        bloc_def['nombre_attributs'] = len(bloc_def['attributs'])
-                        
-                        self.blocs_info['definitions_blocs'].append(bloc_def)
-                        
-                    except Exception as e:
-                        continue
-                
-                print(f"  ✓ {len(self.blocs_info['definitions_blocs'])} définitions de blocs extraites")
+                reprise.complet = True
                 return  # Succès, sortir de la fonction
                 
+            except DocumentAbandonne:
+                raise
             except Exception as e:
+                self._ignorer('blocs.tentative', e)
                 if attempt < max_retries - 1:
-                    print(f"  ⚠️  Tentative {attempt + 1} échouée, nouvelle tentative...")
+                    print(f"  ⚠️  Tentative {attempt + 1} échouée, reprise au bloc {reprise.prochain_index}...")
                     time.sleep(2)
                 else:
                     print(f"  ❌ ERREUR après {max_retries} tentatives: {str(e)}")
-                    print(f"  ℹ️  {len(self.blocs_info['definitions_blocs'])} blocs extraits avant l'erreur")
+                    print(f"  ℹ️  {self.nombre_extraits['definitions_blocs']} blocs extraits avant l'erreur")
     
+    def _parcourir_bloc_valide(self, parcours, blocks, reprise, parcours_references, tentatives=3):
+        """Parcourt le bloc reprise.prochain_index; ses enregistrements ne sont
+        conservés que si le bloc est parcouru en entier"""
+        index = reprise.prochain_index
+        for tentative in range(tentatives):
+            etat = self._etat_extraction()
+            if self._flux is not None:
+                self._flux.commencer_lot()
+            try:
+                block = blocks.Item(index)
+                nom = self.acces.lire_obligatoire(block, "AcDbBlockTableRecord", 'Name')
+                espace = espace_du_bloc(nom) if parcours_references is not None else None
+                self._parcourir_definition(parcours, ContexteParcours(block, index, nom, espace),
+                                           parcours_references)
+            except DocumentAbandonne:
+                self._restaurer_extraction(etat)
+                raise
+            except Exception as e:
+                self._restaurer_extraction(etat)
+                if tentative < tentatives - 1:
+                    time.sleep(0.2 * (tentative + 1))
+                    continue
+                # Document inaccessible: erreur remontée, reprise à ce bloc
+                self.doc.Blocks.Count
+                # Bloc illisible: ignoré, le parcours continue
+                self._ignorer('bloc', e)
+                print(f"  ⚠️  Bloc {index} ignoré: {str(e)}")
+                nom = None
+            
+            position = self._flux.valider_lot() if self._flux is not None and nom is not None else None
+            reprise.valider(index, nom, **self._donnees_reprise(reprise, etat, position))
+            return
+    
+    def _parcourir_definition(self, parcours, ctx, parcours_references=None):
+        """Parcourt une définition selon le profil; une définition non développée
+        n'est pas parcourue, seules les références d'un espace sont relevées
+        (par un jeu de sélection si possible)"""
+        if developper(self.profil, self.acces, ctx.bloc, ctx.nom):
+            parcours.parcourir_bloc(ctx)
+            return
+        
+        self._debut_definition(ctx)
+        if ctx.espace is not None and parcours_references is not None:
+            with source_references(self.doc, ctx.espace, self.filtre,
+                                   self.selection_serveur) as (source, par_selection):
+                ctx_references = ContexteParcours(source, ctx.index, ctx.nom, ctx.espace)
+                ctx_references.selection = par_selection
+                parcours_references.parcourir_bloc(ctx_references)
+        self._fin_definition(ctx)
+    
+    def _etat_extraction(self):
+        """État à restaurer si le parcours d'un bloc échoue"""
+        longueurs = {categorie: len(self.blocs_info[categorie]) for categorie in self.nombre_extraits}
+        return self.statistiques.etat(), dict(self.nombre_extraits), longueurs
+    
+    def _restaurer_extraction(self, etat):
+        statistiques, nombre_extraits, longueurs = etat
+        self.statistiques.restaurer(statistiques)
+        self.nombre_extraits.update(nombre_extraits)
+        for categorie, longueur in longueurs.items():
+            del self.blocs_info[categorie][longueur:]
+        if self._flux is not None:
+            self._flux.annuler_lot()
+    
+    def _donnees_reprise(self, reprise, etat, position):
+        """Contenu du point de reprise d'un bloc validé (enregistré sur disque)"""
+        if reprise.chemin is None:
+            return {}
+        donnees = {
+            'statistiques': self.statistiques.etat(),
+            'nombre_extraits': dict(self.nombre_extraits)
+        }
+        if self._flux is not None:
+            donnees['position'] = position or self._flux.position()
+        else:
+            longueurs = etat[2]
+            donnees['enregistrements'] = {categorie: self.blocs_info[categorie][longueur:]
+                                          for categorie, longueur in longueurs.items()}
+        return donnees
+    
+    def _reprendre(self, entrees):
+        """Restaure les blocs validés d'un point de reprise"""
+        for entree in entrees:
+            for categorie, enregistrements in entree.get('enregistrements', {}).items():
+                self.blocs_info[categorie].extend(restaurer(categorie, e) for e in enregistrements)
+        derniere = entrees[-1]
+        self.statistiques.restaurer(derniere['statistiques'])
+        self.nombre_extraits.update(derniere['nombre_extraits'])
+        print(f"♻️  Reprise après le bloc {derniere['index']} ({derniere['nom']}): "
+              f"{len(entrees)} blocs déjà extraits")
+    
+    def _debut_definition(self, ctx):
+        """Crée la définition du bloc parcouru"""
+        acces = self.acces
+        obj_type = "AcDbBlockTableRecord"
+        block = ctx.bloc
+        entete = acces.lire_plan(block, obj_type, PLAN_DEFINITION)
+        bloc_def = {
+            'nom': ctx.nom,
+            'est_dynamique': False,
+            'est_xref': entete['est_xref'],
+            'est_layout': entete['est_layout'],
+            'nombre_entites': entete['nombre_entites'],
+            'origine': None,
+            'entites_contenues': [],
+            'attributs': []
+        }
+        
+        # Fichier référencé par une xref, tel qu'enregistré dans le dessin
+        if bloc_def['est_xref']:
+            try:
+                bloc_def['chemin_xref'] = acces.lire_obligatoire(block, obj_type, 'Path')
+            except Exception as e:
+                self._ignorer('definition.chemin_xref', e)
+        
+        # Origine du bloc
+        try:
+            origine = acces.lire_obligatoire(block, obj_type, 'Origin')
+            bloc_def['origine'] = {
+                'x': origine[0],
+                'y': origine[1],
+                'z': origine[2]
+            }
+        except Exception as e:
+            self._ignorer('definition.origine', e)
+        
+        # Vérifier si c'est un bloc dynamique
+        try:
+            bloc_def['est_dynamique'] = acces.lire_obligatoire(block, obj_type, 'IsDynamicBlock')
+        except Exception as e:
+            self._ignorer('definition.est_dynamique', e)
+        
+        ctx.bloc_def = bloc_def
+        ctx.types_entites = {}
+        ctx.references_imbriquees = {}
+        
+        # En mode flux, les entités sont écrites au fil du parcours
+        # (l'espace objet peut en contenir des centaines de milliers)
+        if self._flux is not None:
+            debut = {cle: valeur for cle, valeur in bloc_def.items()
+                     if cle not in ('entites_contenues', 'attributs')}
+            ctx.flux_entites = self._flux.commencer('definitions_blocs', debut, 'entites_contenues')
+    
+    def _completer_definition(self, ctx):
+        """Complète la définition du bloc parcouru"""
+        bloc_def = ctx.bloc_def
+        bloc_def['types_entites'] = ctx.types_entites
+        bloc_def['nombre_attributs'] = len(bloc_def['attributs'])
+        bloc_def['references_imbriquees'] = ctx.references_imbriquees
+        return bloc_def
+    
+    def _fin_definition(self, ctx):
+        """Termine la définition du bloc parcouru"""
+        bloc_def = self._completer_definition(ctx)
+        
+        if ctx.flux_entites is not None:
+            self._compter('definitions_blocs', bloc_def)
+            ctx.flux_entites.terminer({
+                'attributs': bloc_def['attributs'],
+                'types_entites': bloc_def['types_entites'],
+                'nombre_attributs': bloc_def['nombre_attributs'],
+                'references_imbriquees': bloc_def['references_imbriquees']
+            })
+        else:
+            self._emettre('definitions_blocs', bloc_def)
+    
+    def _visiter_entite_definition(self, entity, obj_type, ctx):
+        """Compte le type de l'entité et crée sa description"""
+        ctx.types_entites[obj_type] = ctx.types_entites.get(obj_type, 0) + 1
+        
+        # Détails de l'entité
+        ctx.entite = nouvelle_entite(obj_type, self.acces.lire(entity, obj_type, 'Layer'))
+    
+    def _entite_hors_delai(self):
+        """Vrai si un appel COM de l'entité en cours a dépassé son délai"""
+        return self.surveillant is not None and self.surveillant.entite_en_depassement()
+    
+    def _ajouter_entite_definition(self, entity, obj_type, ctx):
+        """Ajoute l'entité décrite à la définition du bloc
+        (une entité ignorée après un dépassement de délai n'est nulle part)"""
+        if self._entite_hors_delai():
+            return
+        if obj_type == "AcDbAttributeDefinition":
+            ctx.bloc_def['attributs'].append(ctx.entite)
+        if ctx.flux_entites is not None:
+            ctx.flux_entites.ajouter(ctx.entite)
+        else:
+            ctx.bloc_def['entites_contenues'].append(ctx.entite)
+    
+    def _geometrie_attribut(self, entity, obj_type, ctx):
+        """Informations spécifiques pour les définitions d'attributs"""
+        entite_info = ctx.entite
+        for champ, valeur in self.acces.lire_plan(entity, obj_type, PLAN_DEFINITION_ATTRIBUT).items():
+            setattr(entite_info, champ, valeur)
+    
+    def _geometrie_ligne(self, entity, obj_type, ctx):
+        v = self.acces.lire_plan(entity, obj_type, PLAN_LIGNE)
+        ctx.entite.debut = array('d', v['debut'])
+        ctx.entite.fin = array('d', v['fin'])
+        ctx.entite.longueur = v['longueur']
+    
+    def _geometrie_cercle(self, entity, obj_type, ctx):
+        v = self.acces.lire_plan(entity, obj_type, PLAN_CERCLE)
+        ctx.entite.centre = array('d', v['centre'])
+        ctx.entite.rayon = v['rayon']
+    
+    def _geometrie_arc(self, entity, obj_type, ctx):
+        v = self.acces.lire_plan(entity, obj_type, PLAN_ARC)
+        ctx.entite.centre = array('d', v['centre'])
+        ctx.entite.rayon = v['rayon']
+        ctx.entite.angle_debut = v['angle_debut']
+        ctx.entite.angle_fin = v['angle_fin']
+    
+    def _geometrie_texte(self, entity, obj_type, ctx):
+        v = self.acces.lire_plan(entity, obj_type, PLAN_TEXTE)
+        ctx.entite.texte = v['texte']
+        ctx.entite.hauteur = v['hauteur']
+        ctx.entite.insertion = array('d', v['insertion']) if v['insertion'] is not None else None
+    
+    def _geometrie_reference(self, entity, obj_type, ctx):
+        """Référence imbriquée: bloc référencé et transformation
+        (les références des présentations sont les instances, relevées à part)"""
+        if ctx.bloc_def['est_layout']:
+            return
+        v = self.acces.lire_plan(entity, obj_type, PLAN_REFERENCE_IMBRIQUEE)
+        reference = ctx.entite
+        reference.nom_bloc = v['nom_bloc']
+        reference.insertion = array('d', v['insertion'][:3])
+        reference.rotation = v['rotation']
+        reference.echelle = array('d', (v['echelle_x'], v['echelle_y'], v['echelle_z']))
+        nom = v['nom_bloc']
+        if v['est_dynamique']:
+            reference.nom_effectif = nom = self.acces.lire(entity, obj_type, 'EffectiveName') or nom
+        ctx.references_imbriquees[nom] = ctx.references_imbriquees.get(nom, 0) + 1
+    
+    def _geometrie_polyligne(self, entity, obj_type, ctx):
+        v = self.acces.lire_plan(entity, obj_type, PLAN_POLYLIGNE)
+        ctx.entite.dimension = 2 if obj_type == "AcDbPolyline" else 3
+        ctx.entite.sommets = array('d', v['sommets'])
+        ctx.entite.ferme = v['ferme']
+        ctx.entite.elevation = v['elevation']
+    
+    def _geometrie_point(self, entity, obj_type, ctx):
+        ctx.entite.position = array('d', self.acces.lire_obligatoire(entity, obj_type, 'Coordinates'))
+    
+    def _geometrie_spline(self, entity, obj_type, ctx):
+        v = self.acces.lire_plan(entity, obj_type, PLAN_SPLINE)
+        ctx.entite.degre = v['degre']
+        ctx.entite.ferme = v['ferme']
+        ctx.entite.points_controle = array('d', v['points_controle'])
+        ctx.entite.points_ajustement = array('d', v['points_ajustement'] or ())
+    
+    def _geometrie_cote(self, entity, obj_type, ctx):
+        v = self.acces.lire_plan(entity, obj_type, PLAN_COTE)
+        for champ, valeur in v.items():
+            if champ in ctx.entite.POINTS and valeur is not None:
+                valeur = array('d', valeur)
+            setattr(ctx.entite, champ, valeur)
+    
+    def _geometrie_hachure(self, entity, obj_type, ctx):
+        for champ, valeur in self.acces.lire_plan(entity, obj_type, PLAN_HACHURE).items():
+            setattr(ctx.entite, champ, valeur)
+    
+    def _visiter_reference(self, entity, ctx, instances, dynamiques):
+        """Relève une référence de bloc d'un espace objet ou papier"""
+        if ctx.espace is None:
+            return
+        if self.filtre is not None and not self.filtre.retenir(self.acces, entity, ctx.selection):
+            return
+        
+        instance = None
+        if instances:
+            instance = self._extraire_info_instance(entity, ctx.espace)
+            if self._entite_hors_delai():
+                return
+            if instance:
+                self._emettre('instances_blocs', instance)
+        
+        if dynamiques:
+            if instance:
+                est_dynamique = instance['est_dynamique']
+            else:
+                est_dynamique = self.acces.lire(entity, "AcDbBlockReference", 'IsDynamicBlock', False)
+            if est_dynamique:
+                bloc_dyn = self._extraire_info_bloc_dynamique(entity, ctx.espace, instance)
+                if bloc_dyn and not self._entite_hors_delai():
+                    self._emettre('blocs_dynamiques', bloc_dyn)
+    
+    @mesurer_phase
+    def extraire_definitions_blocs(self):
+        """Extrait toutes les définitions de blocs (Block Definitions)"""
+        print("🔲 Extraction des définitions de blocs...")
+        
+        self._extraire(definitions=True)
+        
+        print(f"  ✓ {self.nombre_extraits['definitions_blocs']} définitions de blocs extraites")
+    
+    @mesurer_phase
     def extraire_instances_blocs(self):
         """Extrait toutes les instances de blocs dans le dessin"""
         print("\n📍 Extraction des instances de blocs...")
         
-        # Dans ModelSpace
-        print("  → Parcours du ModelSpace...")
-        for entity in self.doc.ModelSpace:
-            try:
-                if entity.ObjectName == "AcDbBlockReference":
-                    instance = self._extraire_info_instance(entity, "ModelSpace")
-                    if instance:
-                        self.blocs_info['instances_blocs'].append(instance)
-            except:
-                pass
-        
-        # Dans PaperSpace
-        print("  → Parcours du PaperSpace...")
-        for entity in self.doc.PaperSpace:
-            try:
-                if entity.ObjectName == "AcDbBlockReference":
-                    instance = self._extraire_info_instance(entity, "PaperSpace")
-                    if instance:
-                        self.blocs_info['instances_blocs'].append(instance)
-            except:
-                pass
+        self._extraire(instances=True)
         
-        print(f"  ✓ {len(self.blocs_info['instances_blocs'])} instances de blocs extraites")
+        print(f"  ✓ {self.nombre_extraits['instances_blocs']} instances de blocs extraites")
     
     def _extraire_info_instance(self, entity, espace):
         """Extrait les informations d'une instance de bloc"""
+        acces = self.acces
         try:
-            instance = {
-                'nom_bloc': entity.Name,
-                'espace': espace,
-                'est_dynamique': entity.IsDynamicBlock,
-                'position': {
-                    'x': entity.InsertionPoint[0],
-                    'y': entity.InsertionPoint[1],
-                    'z': entity.InsertionPoint[2]
-                },
-                'rotation': entity.Rotation,
-                'rotation_degres': entity.Rotation * 180 / 3.14159265359,
-                'echelle': {
-                    'x': entity.XScaleFactor,
-                    'y': entity.YScaleFactor,
-                    'z': entity.ZScaleFactor
-                },
-                'calque': entity.Layer,
-                'couleur': entity.Color if hasattr(entity, 'Color') else None,
-                'type_ligne': entity.Linetype if hasattr(entity, 'Linetype') else None,
-                'epaisseur_ligne': entity.Lineweight if hasattr(entity, 'Lineweight') else None,
-                'visible': entity.Visible if hasattr(entity, 'Visible') else None,
-                'attributs': [],
-                'handle': entity.Handle if hasattr(entity, 'Handle') else None
-            }
+            v = acces.lire_plan(entity, "AcDbBlockReference", PLAN_INSTANCE)
+            instance = Instance(v, espace)
             
             # Extraire les attributs de l'instance
             try:
-                attributes = entity.GetAttributes()
+                attributes = acces.appeler(entity, "AcDbBlockReference", 'GetAttributes')
                 for attr in attributes:
-                    attr_info = {
-                        'tag': attr.TagString,
-                        'valeur': attr.TextString,
-                        'invisible': attr.Invisible,
-                        'hauteur': attr.Height,
-                        'position': {
-                            'x': attr.InsertionPoint[0],
-                            'y': attr.InsertionPoint[1],
-                            'z': attr.InsertionPoint[2]
-                        }
-                    }
-                    instance['attributs'].append(attr_info)
-            except:
-                pass
-            
-            instance['nombre_attributs'] = len(instance['attributs'])
+                    a = acces.lire_plan(attr, "AcDbAttribute", PLAN_ATTRIBUT)
+                    instance.attributs.append(AttributInstance(
+                        a['tag'], a['valeur'], a['invisible'], a['hauteur'], a['insertion'][:3]))
+            except Exception as e:
+                self._ignorer('instance.attributs', e)
             
             # Si c'est un bloc dynamique, extraire le nom effectif
-            if instance['est_dynamique']:
+            if instance.est_dynamique:
                 try:
-                    instance['nom_effectif'] = entity.EffectiveName
-                except:
-                    pass
+                    instance.nom_effectif = acces.lire_obligatoire(entity, "AcDbBlockReference", 'EffectiveName')
+                except Exception as e:
+                    self._ignorer('instance.nom_effectif', e)
             
             return instance
             
         except Exception as e:
+            self._ignorer('instance', e)
             return None
     
+    @mesurer_phase
     def extraire_blocs_dynamiques(self):
         """Extrait toutes les informations des blocs dynamiques"""
         print("\n🔄 Extraction des blocs dynamiques...")
         
-        # Dans ModelSpace
-        for entity in self.doc.ModelSpace:
-            try:
-                if entity.ObjectName == "AcDbBlockReference" and entity.IsDynamicBlock:
-                    bloc_dyn = self._extraire_info_bloc_dynamique(entity, "ModelSpace")
-                    if bloc_dyn:
-                        self.blocs_info['blocs_dynamiques'].append(bloc_dyn)
-            except:
-                pass
-        
-        # Dans PaperSpace
-        for entity in self.doc.PaperSpace:
-            try:
-                if entity.ObjectName == "AcDbBlockReference" and entity.IsDynamicBlock:
-                    bloc_dyn = self._extraire_info_bloc_dynamique(entity, "PaperSpace")
-                    if bloc_dyn:
-                        self.blocs_info['blocs_dynamiques'].append(bloc_dyn)
-            except:
-                pass
+        self._extraire(dynamiques=True)
         
-        print(f"  ✓ {len(self.blocs_info['blocs_dynamiques'])} blocs dynamiques extraits")
+        print(f"  ✓ {self.nombre_extraits['blocs_dynamiques']} blocs dynamiques extraits")
     
-    def _extraire_info_bloc_dynamique(self, entity, espace):
-        """Extrait les informations complètes d'un bloc dynamique"""
+    def _extraire_info_bloc_dynamique(self, entity, espace, instance=None):
+        """Extrait les informations complètes d'un bloc dynamique
+        à partir des champs déjà lus pour l'instance"""
+        acces = self.acces
         try:
+            if instance is None:
+                instance = self._extraire_info_instance(entity, espace)
             bloc_dyn = {
-                'nom': entity.Name,
-                'nom_effectif': entity.EffectiveName,
+                'nom': instance['nom_bloc'],
+                'nom_effectif': instance.get('nom_effectif') or acces.lire_obligatoire(entity, "AcDbBlockReference", 'EffectiveName'),
                 'espace': espace,
-                'position': {
-                    'x': entity.InsertionPoint[0],
-                    'y': entity.InsertionPoint[1],
-                    'z': entity.InsertionPoint[2]
-                },
-                'rotation': entity.Rotation,
-                'rotation_degres': entity.Rotation * 180 / 3.14159265359,
-                'echelle': {
-                    'x': entity.XScaleFactor,
-                    'y': entity.YScaleFactor,
-                    'z': entity.ZScaleFactor
-                },
-                'calque': entity.Layer,
-                'couleur': entity.Color if hasattr(entity, 'Color') else None,
-                'handle': entity.Handle if hasattr(entity, 'Handle') else None,
+                'position': instance['position'],
+                'rotation': instance['rotation'],
+                'rotation_degres': instance['rotation_degres'],
+                'echelle': instance['echelle'],
+                'calque': instance['calque'],
+                'couleur': instance['couleur'],
+                'handle': instance['handle'],
                 'proprietes_dynamiques': [],
                 'attributs': []
             }
             
             # Extraire les propriétés dynamiques
-            dynamic_props = entity.GetDynamicBlockProperties()
+            nom_effectif = bloc_dyn['nom_effectif']
+            dynamic_props = acces.appeler(entity, "AcDbBlockReference", 'GetDynamicBlockProperties')
             for prop in dynamic_props:
                 try:
-                    prop_info = {
-                        'nom': prop.PropertyName,
-                        'valeur': prop.Value,
-                        'lecture_seule': prop.ReadOnly,
-                        'type_unite': prop.UnitsType,
-                        'description': prop.Description if hasattr(prop, 'Description') else None
-                    }
-                    
-                    # Valeurs autorisées
-                    try:
-                        allowed = prop.AllowedValues
-                        if allowed:
-                            prop_info['valeurs_autorisees'] = list(allowed)
-                            prop_info['nombre_valeurs_autorisees'] = len(list(allowed))
-                    except:
-                        pass
-                    
+                    prop_info = acces.lire_plan(prop, "AcadDynamicBlockReferenceProperty", PLAN_PROPRIETE_DYNAMIQUE)
+                    prop_info.update(self._metadonnees_propriete(nom_effectif, prop_info['nom'], prop))
                     bloc_dyn['proprietes_dynamiques'].append(prop_info)
-                except:
-                    pass
+                except Exception as e:
+                    self._ignorer('dynamique.propriete', e)
             
             bloc_dyn['nombre_proprietes_dynamiques'] = len(bloc_dyn['proprietes_dynamiques'])
             
-            # Extraire les attributs
-            try:
-                attributes = entity.GetAttributes()
-                for attr in attributes:
-                    attr_info = {
-                        'tag': attr.TagString,
-                        'valeur': attr.TextString,
-                        'invisible': attr.Invisible,
-                        'hauteur': attr.Height
-                    }
-                    bloc_dyn['attributs'].append(attr_info)
-            except:
-                pass
+            # Reprendre les attributs déjà lus pour l'instance
+            for attr in instance['attributs']:
+                bloc_dyn['attributs'].append({
+                    'tag': attr['tag'],
+                    'valeur': attr['valeur'],
+                    'invisible': attr['invisible'],
+                    'hauteur': attr['hauteur']
+                })
             
             bloc_dyn['nombre_attributs'] = len(bloc_dyn['attributs'])
             
             return bloc_dyn
             
         except Exception as e:
+            self._ignorer('dynamique', e)
             return None
     
+    def _metadonnees_propriete(self, nom_effectif, nom, prop):
+        """Métadonnées d'une propriété dynamique (identiques pour toutes les
+        instances d'un même bloc), lues à la première instance rencontrée"""
+        cle = (nom_effectif, nom)
+        metadonnees = self._proprietes_dynamiques.get(cle)
+        if metadonnees is None:
+            obj_type = "AcadDynamicBlockReferenceProperty"
+            completes = self.acces.lire_plan(prop, obj_type, PLAN_METADONNEES_PROPRIETE)
+            
+            # Valeurs autorisées
+            try:
+                allowed = self.acces.lire_obligatoire(prop, obj_type, 'AllowedValues')
+                if allowed:
+                    completes['valeurs_autorisees'] = list(allowed)
+                    completes['nombre_valeurs_autorisees'] = len(completes['valeurs_autorisees'])
+            except Exception as e:
+                self._ignorer('dynamique.valeurs_autorisees', e)
+            
+            par_instance = completes
+            if self.valeurs_autorisees == 'definition':
+                par_instance = {k: v for k, v in completes.items() if k != 'valeurs_autorisees'}
+            metadonnees = self._proprietes_dynamiques[cle] = (completes, par_instance)
+        return metadonnees[1]
+    
+    def proprietes_dynamiques_par_bloc(self):
+        """Métadonnées des propriétés dynamiques lues, par nom effectif de bloc:
+        {nom_effectif: [{'nom': ..., 'valeurs_autorisees': ..., ...}]}"""
+        par_bloc = {}
+        for (nom_effectif, nom), (completes, _) in self._proprietes_dynamiques.items():
+            par_bloc.setdefault(nom_effectif, []).append({'nom': nom, **completes})
+        return par_bloc
+    
+    # Itérateurs: extraction à la demande, sans remplir blocs_info
+    # (le document doit être ouvert; l'appelant peut s'arrêter à tout moment)
+    
+    def iter_definitions(self):
+        """Génère les définitions de blocs une à une"""
+        parcours = ParcoursEntites(self.acces)
+        parcours.sur_bloc(self._debut_definition)
+        self._enregistrer_definition(parcours)
+        
+        blocks = self.doc.Blocks
+        for index in range(blocks.Count):
+            try:
+                block = blocks.Item(index)
+                ctx = ContexteParcours(block, index, self.acces.lire_obligatoire(block, "AcDbBlockTableRecord", 'Name'))
+                if developper(self.profil, self.acces, block, ctx.nom):
+                    parcours.parcourir_bloc(ctx)
+                else:
+                    self._debut_definition(ctx)
+            except Exception as e:
+                self._ignorer('bloc', e)
+                print(f"  ⚠️  Bloc {index} ignoré: {str(e)}")
+                continue
+            yield self._completer_definition(ctx)
+    
+    def _iter_references(self, references=None):
+        """Génère (entité, espace) pour les références de blocs des espaces
+        objet et papier retenues par le filtre (references: {'calques', 'noms'},
+        sinon le filtre de l'extracteur)"""
+        filtre = FiltreReferences(**references) if references else self.filtre
+        for espace in ("ModelSpace", "PaperSpace"):
+            with source_references(self.doc, espace, filtre,
+                                   self.selection_serveur) as (source, par_selection):
+                for j in range(source.Count):
+                    try:
+                        entity = source.Item(j)
+                        if self.acces.type_objet(entity) != "AcDbBlockReference":
+                            continue
+                        if filtre is not None and not filtre.retenir(self.acces, entity, par_selection):
+                            continue
+                    except Exception as e:
+                        self._ignorer('references.entite', e)
+                        continue
+                    yield entity, espace
+    
+    def iter_instances(self, filtre=None, references=None):
+        """Génère les instances de blocs une à une
+        filtre: fonction(instance) -> bool appliquée aux instances extraites
+        references: {'calques': [...], 'noms': [...]} vérifié avant extraction"""
+        for entity, espace in self._iter_references(references):
+            instance = self._extraire_info_instance(entity, espace)
+            if instance and (filtre is None or filtre(instance)):
+                yield instance
+    
+    def iter_blocs_dynamiques(self, filtre=None, references=None):
+        """Génère les blocs dynamiques un à un (mêmes filtres que iter_instances)"""
+        for entity, espace in self._iter_references(references):
+            if not self.acces.lire(entity, "AcDbBlockReference", 'IsDynamicBlock', False):
+                continue
+            bloc_dyn = self._extraire_info_bloc_dynamique(entity, espace)
+            if bloc_dyn and (filtre is None or filtre(bloc_dyn)):
+                yield bloc_dyn
+    
+    def hierarchie_blocs(self):
+        """Graphe des références imbriquées des définitions extraites
+        (hierarchie_blocs().aplatir('Etage')['Porte']: portes contenues dans Etage)"""
+        return HierarchieBlocs(self.statistiques.references_blocs)
+    
+    @mesurer_phase
+    def resoudre_xrefs(self):
+        """Extrait les dessins référencés par les xrefs, récursivement, une
+        fois par contenu dans le cache partagé (self.cache_xrefs, en mémoire
+        s'il n'a pas été fourni); une entrée par xref dans blocs_info['xrefs']"""
+        print("\n🔗 Résolution des xrefs...")
+        
+        if self.cache_xrefs is None:
+            self.cache_xrefs = CacheXrefs()
+        if self._pile_xrefs is None:
+            empreinte = self.cache_xrefs.empreinte(os.path.abspath(self.chemin_dwg))
+            self._pile_xrefs = (self.cache_xrefs.cle(empreinte, self._options_xrefs()),)
+        xrefs = []
+        blocks = self.doc.Blocks
+        for index in range(blocks.Count):
+            try:
+                block = blocks.Item(index)
+                if self.acces.lire_obligatoire(block, "AcDbBlockTableRecord", 'IsXRef'):
+                    xref = self.acces.lire_plan(block, "AcDbBlockTableRecord", PLAN_XREF)
+                    xrefs.append(self._resoudre_xref(xref['nom'], xref['chemin']))
+            except Exception as e:
+                self._ignorer('xref', e)
+        
+        self.blocs_info['xrefs'] = xrefs
+        if self._flux is not None:
+            self._flux.ecrire('xrefs', xrefs)
+        
+        resolues = [x for x in xrefs if x['statut'] == 'resolue']
+        print(f"  ✓ {len(resolues)}/{len(xrefs)} xrefs résolues, "
+              f"{sum(x['depuis_cache'] for x in resolues)} depuis le cache")
+    
+    def _resoudre_xref(self, nom, chemin):
+        """Entrée de blocs_info['xrefs'] d'une xref, extraite au besoin"""
+        xref = {'nom': nom, 'chemin': chemin, 'statut': 'introuvable',
+                'fichier': trouver_xref(chemin, self.chemin_dwg, self.cache_xrefs.dossiers_recherche)}
+        if xref['fichier'] is None:
+            print(f"  ⚠️  Xref {nom} introuvable: {chemin}")
+            return xref
+        try:
+            xref['empreinte'] = self.cache_xrefs.empreinte(xref['fichier'])
+            _, resume, extraite = self.cache_xrefs.obtenir(xref['fichier'], self._extraire_xref,
+                                                           self._pile_xrefs, self._options_xrefs())
+        except XrefCirculaire:
+            xref['statut'] = 'circulaire'
+            return xref
+        except Exception as e:
+            self._ignorer('xref.extraction', e)
+            xref['statut'] = 'erreur'
+            xref['erreur'] = f"{type(e).__name__}: {e}"
+            print(f"  ⚠️  Xref {nom} non extraite: {xref['erreur']}")
+            return xref
+        
+        xref.update(statut='resolue', depuis_cache=not extraite, sortie=resume['sortie'],
+                    definitions=resume['definitions'], instances=resume['instances'], xrefs=resume['xrefs'])
+        return xref
+    
+    def _options_xrefs(self):
+        """Empreinte des options héritées par l'extraction d'une xref"""
+        return empreinte_reglages({'profil': self.profil, 'valeurs_autorisees': self.valeurs_autorisees})
+    
+    def _extraire_xref(self, fichier, cle, sortie):
+        """Extraction d'un dessin référencé (voir CacheXrefs.obtenir)"""
+        if not fichier.lower().endswith('.dxf') and getattr(self.backend, 'nom', None) == 'autocad':
+            backend = self.backend
+        else:
+            backend = choisir_backend(fichier)
+        enfant = ExtracteurBlocs(fichier, backend=backend, delais=self.delais,
+                                 valeurs_autorisees=self.valeurs_autorisees, profil=self.profil,
+                                 xrefs=self.cache_xrefs)
+        enfant._pile_xrefs = self._pile_xrefs + (cle,)
+        try:
+            if not enfant.extraire_tout():
+                raise RuntimeError(enfant.erreur or "extraction de la xref impossible")
+        finally:
+            if backend is not self.backend and hasattr(backend, 'terminer'):
+                backend.terminer()
+        
+        if sortie is not None:
+            enfant.sauvegarder_json(sortie)
+        else:
+            self.cache_xrefs.extractions[cle] = enfant.blocs_info
+        stats = enfant.blocs_info['statistiques']
+        return {
+            'definitions': stats['definitions']['total'],
+            'instances': stats['instances']['total'],
+            'xrefs': [{champ: x.get(champ) for champ in ('nom', 'chemin', 'empreinte', 'statut')}
+                      for x in enfant.blocs_info['xrefs']]
+        }
+    
+    @mesurer_phase
+    def dedupliquer_definitions(self):
+        """Empreinte géométrique de chaque définition et partage des corps
+        identiques (voir empreintes); résumé dans blocs_info['deduplication']
+        Enregistrements en mémoire uniquement (pas en mode flux NDJSON)"""
+        print("\n🧬 Déduplication des définitions...")
+        
+        resume = dedupliquer(self.blocs_info['definitions_blocs'])
+        self.blocs_info['deduplication'] = resume
+        
+        print(f"  ✓ {resume['corps_uniques']} corps uniques, "
+              f"{resume['definitions_dupliquees']} définitions en double")
+    
+    @mesurer_phase
+    def calculer_emprises(self):
+        """Emprise de chaque instance dans le repère du dessin (champ 'emprise')
+        et emprise des blocs par espace (blocs_info['emprises'])
+        Enregistrements en mémoire uniquement (pas en mode flux NDJSON)"""
+        print("\n📐 Calcul des emprises...")
+        
+        instances = self.blocs_info['instances_blocs']
+        emprises = EmprisesBlocs(self.blocs_info['definitions_blocs']).emprises_instances(instances)
+        
+        par_espace = {}
+        sans_emprise = 0
+        for instance, emprise in zip(instances, emprises):
+            if emprise is None:
+                sans_emprise += 1
+                if hasattr(instance, 'emprise'):
+                    del instance.emprise
+                continue
+            instance.emprise = array('d', emprise)
+            par_espace.setdefault(instance['espace'], []).append(emprise)
+        
+        self.blocs_info['emprises'] = {
+            'espaces': {espace: dict(emprise_en_dict(union_boites(boites)), instances=len(boites))
+                        for espace, boites in par_espace.items()},
+            'instances_sans_emprise': sans_emprise
+        }
+        
+        print(f"  ✓ {len(instances) - sans_emprise} emprises d'instances calculées")
+    
+    def index_spatial(self, espace='ModelSpace'):
+        """Index spatial des instances extraites en mémoire (voir index_spatial)
+        (index_spatial().dans_polygone(piece, filtre=lambda i: i.get('nom_effectif') == 'Porte'))"""
+        return IndexSpatial.depuis_instances(self.blocs_info['instances_blocs'], espace)
+    
+    @mesurer_phase
     def calculer_statistiques(self):
         """Calcule des statistiques sur les blocs"""
         print("\n📊 Calcul des statistiques...")
         
-        # Statistiques des définitions
-        total_defs = len(self.blocs_info['definitions_blocs'])
-        defs_dynamiques = sum(1 for b in self.blocs_info['definitions_blocs'] if b['est_dynamique'])
-        defs_xref = sum(1 for b in self.blocs_info['definitions_blocs'] if b['est_xref'])
-        defs_avec_attributs = sum(1 for b in self.blocs_info['definitions_blocs'] if b['nombre_attributs'] > 0)
-        
-        # Statistiques des instances
-        total_instances = len(self.blocs_info['instances_blocs'])
-        instances_modelspace = sum(1 for b in self.blocs_info['instances_blocs'] if b['espace'] == 'ModelSpace')
-        instances_paperspace = sum(1 for b in self.blocs_info['instances_blocs'] if b['espace'] == 'PaperSpace')
-        instances_dynamiques = sum(1 for b in self.blocs_info['instances_blocs'] if b['est_dynamique'])
-        
-        # Blocs les plus utilisés
-        utilisation_blocs = {}
-        for instance in self.blocs_info['instances_blocs']:
-            nom = instance['nom_bloc']
-            utilisation_blocs[nom] = utilisation_blocs.get(nom, 0) + 1
-        
-        top_blocs = sorted(utilisation_blocs.items(), key=lambda x: x[1], reverse=True)[:10]
-        
-        # Calques utilisés par les blocs
-        calques_blocs = set(b['calque'] for b in self.blocs_info['instances_blocs'] if b['calque'])
-        
-        self.blocs_info['statistiques'] = {
-            'definitions': {
-                'total': total_defs,
-                'dynamiques': defs_dynamiques,
-                'xref': defs_xref,
-                'avec_attributs': defs_avec_attributs
-            },
-            'instances': {
-                'total': total_instances,
-                'modelspace': instances_modelspace,
-                'paperspace': instances_paperspace,
-                'dynamiques': instances_dynamiques
-            },
-            'top_10_blocs_utilises': [{'nom': nom, 'nombre': count} for nom, count in top_blocs],
-            'nombre_calques_utilises': len(calques_blocs),
-            'calques_utilises': sorted(list(calques_blocs))
-        }
+        # Cumulées au fil de l'extraction, sans reparcourir les enregistrements
+        self.blocs_info['statistiques'] = self.statistiques.resultat()
         
         print(f"  ✓ Statistiques calculées")
     
-    def extraire_tout(self):
-        """Extrait toutes les informations des blocs"""
-        if not self.ouvrir_fichier():
+    @mesurer_phase
+    def extraire_en_un_passage(self):
+        """Extrait définitions, instances et blocs dynamiques en parcourant
+        chaque entité du dessin une seule fois"""
+        print("🔲 Extraction des définitions, instances et blocs dynamiques...")
+        
+        self._extraire(definitions=True, instances=True, dynamiques=True)
+        
+        print(f"  ✓ {self.nombre_extraits['definitions_blocs']} définitions de blocs extraites")
+        print(f"  ✓ {self.nombre_extraits['instances_blocs']} instances de blocs extraites")
+        print(f"  ✓ {self.nombre_extraits['blocs_dynamiques']} blocs dynamiques extraits")
+    
+    @mesurer_phase
+    def extraire_tout(self, sortie_ndjson=None, point_de_reprise=None):
+        """Extrait toutes les informations des blocs
+        Avec sortie_ndjson, chaque enregistrement est écrit dans ce fichier
+        dès son extraction et n'est pas conservé en mémoire.
+        Avec point_de_reprise (fichier), la progression est enregistrée bloc
+        par bloc: une extraction interrompue reprend au bloc en échec.
+        Avec des délais (self.delais), les appels COM sont surveillés et le
+        document est abandonné s'il ne répond plus.
+        Avec une instrumentation qui le demande, l'extraction est profilée (cProfile)"""
+        profil = self.instrumentation.profil() if self.instrumentation is not None else contextlib.nullcontext()
+        with profil:
+            if self.delais is None:
+                return self._extraire_tout(sortie_ndjson, point_de_reprise)
+            return self._extraire_surveille(sortie_ndjson, point_de_reprise)
+    
+    def _extraire_surveille(self, sortie_ndjson, point_de_reprise):
+        """Extraction sous surveillance des délais"""
+        self.surveillant = Surveillant(self.delais, getattr(self.backend, 'interrompre', None))
+        self.acces.surveillant = self.surveillant
+        try:
+            with self.surveillant:
+                return self._extraire_tout(sortie_ndjson, point_de_reprise)
+        except DocumentAbandonne as e:
+            self.erreur = f"document abandonné: {e}"
+            print(f"❌ {self.erreur}")
+            return False
+        finally:
+            rapport = self.surveillant.rapport()
+            self.blocs_info['surveillance'] = rapport
+            if rapport['depassements']:
+                print(f"  ⏱️  {len(rapport['depassements'])} appels COM hors délai, "
+                      f"{len(rapport['entites_ignorees'])} entités ignorées")
+            self.acces.surveillant = None
+            self.surveillant = None
+    
+    def _phase(self, nom):
+        """Phase surveillée de l'extraction"""
+        if self.surveillant is None:
+            return contextlib.nullcontext()
+        return self.surveillant.phase(nom)
+    
+    def _extraire_tout(self, sortie_ndjson, point_de_reprise):
+        with self._phase('ouverture'):
+            ouvert = self.ouvrir_fichier()
+        if not ouvert:
+            if self.surveillant is not None and self.surveillant.abandon is not None:
+                raise DocumentAbandonne(self.surveillant.abandon)
             return False
         
         print("\n" + "="*80)
         print("EXTRACTION DE TOUTES LES INFORMATIONS DES BLOCS")
         print("="*80)
         
-        self.extraire_definitions_blocs()
-        self.extraire_instances_blocs()
-        self.extraire_blocs_dynamiques()
-        self.calculer_statistiques()
+        self._reprise = PointDeReprise(point_de_reprise)
+        entrees = self._reprise.charger(self.chemin_dwg, sortie_ndjson) if point_de_reprise else []
+        if entrees:
+            self._reprendre(entrees)
+        
+        if sortie_ndjson is not None:
+            if entrees:
+                self._flux = EcrivainNDJSON(sortie_ndjson, reprise=self._reprise.derniere['position'])
+            else:
+                self._flux = EcrivainNDJSON(sortie_ndjson)
+                self._flux.ecrire('entete', self._entete())
+        try:
+            with self._phase('extraction'):
+                self.extraire_en_un_passage()
+            if self.cache_xrefs is not None:
+                self.resoudre_xrefs()
+            self.calculer_statistiques()
+            if self._flux is None:
+                self.dedupliquer_definitions()
+                self.calculer_emprises()
+            else:
+                self._flux.terminer(self.blocs_info['statistiques'])
+                print(f"\n💾 Données des blocs écrites en flux dans: {os.path.abspath(sortie_ndjson)}")
+        finally:
+            if self._flux is not None:
+                self._flux.fermer()
+                self._flux = None
+            if self._reprise.complet:
+                self._reprise.terminer()
+            else:
+                self._reprise.fermer()
+                if point_de_reprise:
+                    print(f"  ℹ️  Point de reprise conservé: {os.path.abspath(point_de_reprise)}")
+            self._reprise = None
+            self.fermer_fichier()
         
         print("\n" + "="*80)
         print("✅ EXTRACTION TERMINÉE!")
@@ -435,6 +1121,44 @@ class ExtracteurBlocs:
         
         return True
     
+    @mesurer_phase
+    def extraire_incremental(self, chemin_index=None, complet=False):
+        """Ré-extraction incrémentale: seuls les instances et définitions
+        ajoutées, modifiées ou supprimées depuis la dernière extraction sont
+        relues (index SQLite par handle, voir index_incremental; complet:
+        jetons de modification complets). blocs_info est rechargé depuis
+        l'index et le résumé des changements est placé dans
+        blocs_info['modifications']"""
+        if chemin_index is None:
+            nom_base = os.path.splitext(os.path.basename(self.chemin_dwg))[0]
+            chemin_index = f"{nom_base}_index.sqlite"
+        
+        print("♻️  Extraction incrémentale...")
+        modifications = extraire_incremental(self, chemin_index, complet)
+        if modifications is None:
+            return False
+        
+        # Compteurs et statistiques recalculés sur le contenu de l'index
+        self.statistiques = AccumulateurStatistiques()
+        for categorie in self.nombre_extraits:
+            self.nombre_extraits[categorie] = 0
+            for enregistrement in self.blocs_info[categorie]:
+                self._compter(categorie, enregistrement)
+        self.calculer_statistiques()
+        self.dedupliquer_definitions()
+        self.calculer_emprises()
+        self.blocs_info['modifications'] = modifications
+        
+        for categorie in self.nombre_extraits:
+            m = modifications[categorie]
+            print(f"  ✓ {categorie}: {len(m['ajoutes'])} ajoutés, {len(m['modifies'])} modifiés, "
+                  f"{len(m['supprimes'])} supprimés, {m['inchanges']} inchangés")
+        if modifications['blocs_incomplets']:
+            print(f"  ⚠️  {len(modifications['blocs_incomplets'])} blocs lus incomplètement: "
+                  f"rien n'en est supprimé, le dessin sera relu à la prochaine extraction")
+        print(f"  ⏱️  {modifications['duree_s']:.2f} s")
+        return True
+    
     def afficher_resume(self):
         """Affiche un résumé des blocs extraits"""
         stats = self.blocs_info['statistiques']
@@ -448,6 +1172,10 @@ class ExtracteurBlocs:
         print(f"  Dynamiques: {stats['definitions']['dynamiques']}")
         print(f"  XRef: {stats['definitions']['xref']}")
         print(f"  Avec attributs: {stats['definitions']['avec_attributs']}")
+        if self.blocs_info.get('deduplication'):
+            deduplication = self.blocs_info['deduplication']
+            print(f"  Corps uniques: {deduplication['corps_uniques']} "
+                  f"({deduplication['definitions_dupliquees']} en double)")
         
         print(f"\n📍 INSTANCES DE BLOCS:")
         print(f"  Total: {stats['instances']['total']}")
@@ -461,100 +1189,119 @@ class ExtracteurBlocs:
         
         print(f"\n🎨 CALQUES:")
         print(f"  Nombre de calques utilisés par les blocs: {stats['nombre_calques_utilises']}")
+        
+        if self.blocs_info.get('xrefs'):
+            print(f"\n🔗 XREFS:")
+            for xref in self.blocs_info['xrefs']:
+                if xref['statut'] == 'resolue':
+                    origine = "cache" if xref['depuis_cache'] else "extraite"
+                    print(f"  {xref['nom']}: {xref['fichier']} ({xref['instances']} instances, {origine})")
+                else:
+                    print(f"  {xref['nom']}: {xref['statut']} ({xref['chemin']})")
+        
+        if self.blocs_info.get('emprises'):
+            print(f"\n📐 EMPRISES:")
+            for espace, emprise in self.blocs_info['emprises']['espaces'].items():
+                mini, maxi = emprise['min'], emprise['max']
+                print(f"  {espace}: X {mini['x']:.2f} → {maxi['x']:.2f}, Y {mini['y']:.2f} → {maxi['y']:.2f} "
+                      f"({emprise['instances']} instances)")
+    
+    def _entete(self):
+        """En-tête des sorties NDJSON"""
+        return {
+            'fichier': self.chemin_dwg,
+            'backend': getattr(self.backend, 'nom', None),
+            'date': datetime.now().isoformat()
+        }
     
-    def sauvegarder_json(self, fichier_sortie=None):
-        """Sauvegarde toutes les informations des blocs dans un fichier JSON"""
+    @mesurer_phase
+    def sauvegarder_json(self, fichier_sortie=None, format='json', dedupliquer=True):
+        """Sauvegarde toutes les informations des blocs dans un fichier JSON
+        (format='ndjson': une ligne par enregistrement, statistiques en dernier)
+        Les définitions en double n'y renvoient qu'au corps de la première
+        (dedupliquer=False: chaque définition garde son corps complet)"""
+        compacter = definition_compacte if dedupliquer else (lambda bloc_def: bloc_def)
         if fichier_sortie is None:
             nom_base = os.path.splitext(os.path.basename(self.chemin_dwg))[0]
-            fichier_sortie = f"{nom_base}_blocs.json"
+            extension = 'ndjson' if format == 'ndjson' else 'json'
+            fichier_sortie = f"{nom_base}_blocs.{extension}"
         
-        with open(fichier_sortie, 'w', encoding='utf-8') as f:
-            json.dump(self.blocs_info, f, indent=2, ensure_ascii=False, default=str)
+        if format == 'ndjson':
+            with EcrivainNDJSON(fichier_sortie) as flux:
+                flux.ecrire('entete', self._entete())
+                for categorie in ('definitions_blocs', 'instances_blocs', 'blocs_dynamiques'):
+                    for enregistrement in self.blocs_info[categorie]:
+                        if categorie == 'definitions_blocs':
+                            enregistrement = compacter(enregistrement)
+                        flux.ecrire(categorie, enregistrement)
+                flux.terminer(self.blocs_info['statistiques'])
+        else:
+            blocs_info = dict(self.blocs_info, definitions_blocs=[
+                compacter(bloc_def) for bloc_def in self.blocs_info['definitions_blocs']])
+            with open(fichier_sortie, 'w', encoding='utf-8') as f:
+                json.dump(blocs_info, f, indent=2, ensure_ascii=False, default=en_json)
         
         print(f"\n💾 Données des blocs sauvegardées dans: {os.path.abspath(fichier_sortie)}")
         return fichier_sortie
     
-    def sauvegarder_rapport(self, fichier_sortie=None):
-        """Sauvegarde un rapport détaillé sur les blocs"""
+    @mesurer_phase
+    def sauvegarder_colonnes(self, dossier_sortie=None):
+        """Sauvegarde instances et géométrie en colonnes typées (.npy)
+        pour un chargement en mémoire projetée sans analyse JSON"""
+        if dossier_sortie is None:
+            nom_base = os.path.splitext(os.path.basename(self.chemin_dwg))[0]
+            dossier_sortie = f"{nom_base}_colonnes"
+        
+        exporter_colonnes(self.blocs_info, dossier_sortie)
+        
+        print(f"🧮 Colonnes des blocs sauvegardées dans: {os.path.abspath(dossier_sortie)}")
+        return dossier_sortie
+    
+    def sauvegarder_metriques(self, fichier_sortie=None):
+        """Sauvegarde les métriques de l'instrumentation (JSON) et, si le
+        profilage est demandé, le profil cProfile (.prof) à côté"""
+        if self.instrumentation is None:
+            return None
+        if fichier_sortie is None:
+            nom_base = os.path.splitext(os.path.basename(self.chemin_dwg))[0]
+            fichier_sortie = f"{nom_base}_metriques.json"
+        
+        fichier_profil = fichier_sortie[:-len('_metriques.json')] if fichier_sortie.endswith('_metriques.json') \
+            else os.path.splitext(fichier_sortie)[0]
+        fichiers = self.instrumentation.sauvegarder(fichier_sortie, f"{fichier_profil}_profil.prof")
+        
+        for fichier in fichiers:
+            print(f"⏱️  Mesures de l'extraction sauvegardées dans: {os.path.abspath(fichier)}")
+        return fichier_sortie
+    
+    @mesurer_phase
+    def sauvegarder_rapport(self, fichier_sortie=None, formats=('txt',)):
+        """Sauvegarde un rapport détaillé sur les blocs
+        (formats: 'txt', 'csv', 'html'; voir rapport_blocs)"""
         if fichier_sortie is None:
             nom_base = os.path.splitext(os.path.basename(self.chemin_dwg))[0]
             fichier_sortie = f"{nom_base}_rapport_blocs.txt"
+        base = os.path.splitext(fichier_sortie)[0]
         
-        with open(fichier_sortie, 'w', encoding='utf-8') as f:
-            f.write("="*80 + "\n")
-            f.write("RAPPORT DÉTAILLÉ DES BLOCS\n")
-            f.write("="*80 + "\n\n")
-            
-            # Statistiques
-            stats = self.blocs_info['statistiques']
-            f.write("📊 STATISTIQUES:\n")
-            f.write(f"  Définitions de blocs: {stats['definitions']['total']}\n")
-            f.write(f"  Instances de blocs: {stats['instances']['total']}\n")
-            f.write(f"  Blocs dynamiques: {stats['instances']['dynamiques']}\n\n")
-            
-            # Définitions de blocs
-            f.write("="*80 + "\n")
-            f.write("🔲 DÉFINITIONS DE BLOCS\n")
-            f.write("="*80 + "\n\n")
-            
-            for bloc_def in self.blocs_info['definitions_blocs']:
-                f.write(f"Bloc: {bloc_def['nom']}\n")
-                f.write(f"  Dynamique: {bloc_def['est_dynamique']}\n")
-                f.write(f"  XRef: {bloc_def['est_xref']}\n")
-                f.write(f"  Nombre d'entités: {bloc_def['nombre_entites']}\n")
-                f.write(f"  Nombre d'attributs: {bloc_def['nombre_attributs']}\n")
-                
-                if bloc_def['attributs']:
-                    f.write(f"  Attributs:\n")
-                    for attr in bloc_def['attributs']:
-                        f.write(f"    - {attr.get('tag', 'N/A')}: {attr.get('prompt', 'N/A')}\n")
-                
-                if bloc_def['types_entites']:
-                    f.write(f"  Types d'entités:\n")
-                    for type_ent, count in bloc_def['types_entites'].items():
-                        f.write(f"    - {type_ent}: {count}\n")
-                
-                f.write("\n")
-            
-            # Blocs dynamiques
-            f.write("="*80 + "\n")
-            f.write("🔄 BLOCS DYNAMIQUES\n")
-            f.write("="*80 + "\n\n")
-            
-            for bloc_dyn in self.blocs_info['blocs_dynamiques']:
-                f.write(f"Bloc: {bloc_dyn['nom_effectif']}\n")
-                f.write(f"  Nom original: {bloc_dyn['nom']}\n")
-                f.write(f"  Position: X={bloc_dyn['position']['x']:.2f}, Y={bloc_dyn['position']['y']:.2f}, Z={bloc_dyn['position']['z']:.2f}\n")
-                f.write(f"  Rotation: {bloc_dyn['rotation_degres']:.2f}°\n")
-                f.write(f"  Calque: {bloc_dyn['calque']}\n")
-                f.write(f"  Propriétés dynamiques:\n")
-                
-                for prop in bloc_dyn['proprietes_dynamiques']:
-                    f.write(f"    • {prop['nom']}: {prop['valeur']}")
-                    if prop.get('valeurs_autorisees'):
-                        f.write(f" (Valeurs: {prop['valeurs_autorisees']})")
-                    f.write("\n")
-                
-                if bloc_dyn['attributs']:
-                    f.write(f"  Attributs:\n")
-                    for attr in bloc_dyn['attributs']:
-                        f.write(f"    • {attr['tag']}: {attr['valeur']}\n")
-                
-                f.write("\n")
-            
-            # Top blocs
-            f.write("="*80 + "\n")
-            f.write("🏆 TOP 10 DES BLOCS LES PLUS UTILISÉS\n")
-            f.write("="*80 + "\n\n")
-            
-            for i, bloc in enumerate(stats['top_10_blocs_utilises'][:10], 1):
-                f.write(f"{i}. {bloc['nom']}: {bloc['nombre']} instances\n")
+        rapports = []
+        if 'txt' in formats:
+            rapports.append(RapportTexte(fichier_sortie))
+        if 'csv' in formats:
+            rapports.append(RapportCSV(base))
+        if 'html' in formats:
+            rapports.append(RapportHTML(f"{base}.html"))
+        fichiers = generer_rapports(enregistrements_blocs_info(self.blocs_info), rapports)
         
-        print(f"📄 Rapport des blocs sauvegardé dans: {os.path.abspath(fichier_sortie)}")
-        return fichier_sortie
-
+        for fichier in fichiers:
+            print(f"📄 Rapport des blocs sauvegardé dans: {os.path.abspath(fichier)}")
+        return fichiers[0] if fichiers else None
 
 if __name__ == "__main__":
+    # Mode lot: python ReadBlocDWG.py <fichiers|dossiers|motifs> [-j N] [-o dossier]
+    if len(sys.argv) > 1:
+        from extraction_lot import main
+        sys.exit(main())
+    
     # ====================================================================
     # METTEZ VOTRE CHEMIN ICI
     # ====================================================================
@@ -579,4 +1326,9 @@ if __name__ == "__main__":
         
         print(f"\n✅ Extraction des blocs terminée!")
         print(f"   - JSON: {fichier_json}")
-        print(f"   - Rapport: {fichier_txt}")
\ No newline at end of file
+        print(f"   - Rapport: {fichier_txt}")
+    
+    # Quitter AutoCAD s'il a été démarré pour l'extraction
+    terminer = getattr(extracteur.backend, 'terminer', None)
+    if terminer is not None:
+        terminer()
\ No newline at end of file
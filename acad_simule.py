@@ -0,0 +1,522 @@
+"""
+Modèle objet AutoCAD simulé (sans AutoCAD) qui compte les appels COM
+Chaque accès à un membre d'un objet simulé se comporte comme un objet
+`win32com.client.Dispatch` en liaison tardive: une recherche du DISPID
+(GetIDsOfNames) puis une invocation (Invoke). L'attribut `_oleobj_`
+expose ces deux appels pour l'accès direct par DISPID.
+"""
+
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from itertools import count
+
+from acces_com import DISPATCH_METHOD
+
+# DISPID attribués à la volée, partagés par tous les objets simulés
+_DISPIDS = {}
+_NOMS = {}
+_HANDLES = count(0x100)
+
+
+def _dispid(nom):
+    if nom not in _DISPIDS:
+        _DISPIDS[nom] = len(_DISPIDS) + 1
+        _NOMS[_DISPIDS[nom]] = nom
+    return _DISPIDS[nom]
+
+
+class ErreurCOMSimulee(Exception):
+    """Équivalent de pywintypes.com_error pour le modèle simulé"""
+
+
+class CompteurAppels:
+    """Compte les appels traversant la frontière COM
+    et simule leur latence (en secondes par appel)"""
+
+    def __init__(self, latence=0.0):
+        self.latence = latence
+        self.recherches = 0
+        self.invocations = 0
+        self.par_membre = Counter()
+
+    def attendre(self):
+        """Attente active: time.sleep est trop imprécis sous la milliseconde"""
+        if self.latence:
+            fin = time.perf_counter() + self.latence
+            while time.perf_counter() < fin:
+                pass
+
+    @property
+    def total(self):
+        return self.recherches + self.invocations
+
+    def remettre_a_zero(self):
+        self.recherches = 0
+        self.invocations = 0
+        self.par_membre.clear()
+
+
+class OleSimule:
+    """Équivalent de PyIDispatch: GetIDsOfNames et Invoke"""
+
+    def __init__(self, objet):
+        self._objet = objet
+
+    def GetIDsOfNames(self, nom):
+        compteur = self._objet._compteur
+        compteur.recherches += 1
+        compteur.attendre()
+        if nom not in self._objet._membres:
+            raise ErreurCOMSimulee(f"Nom inconnu: {nom}")
+        return _dispid(nom)
+
+    def Invoke(self, dispid, lcid, drapeaux, resultat_voulu, *args):
+        nom = _NOMS[dispid]
+        compteur = self._objet._compteur
+        compteur.invocations += 1
+        compteur.par_membre[nom] += 1
+        compteur.attendre()
+        blocage = self._objet.__dict__.get('_blocages', {}).get(nom)
+        if blocage is not None:
+            blocage[0].attendre(blocage[1])
+        membre = self._objet._membres[nom]
+        if drapeaux == DISPATCH_METHOD:
+            return membre(*args)
+        return membre
+
+
+class ObjetCOMSimule:
+    """Objet COM en liaison tardive: chaque accès coûte une recherche et une invocation"""
+
+    def __init__(self, compteur, **membres):
+        self.__dict__['_compteur'] = compteur
+        self.__dict__['_membres'] = membres
+        self.__dict__['_oleobj_'] = OleSimule(self)
+
+    def __getattr__(self, nom):
+        if nom.startswith('__'):
+            raise AttributeError(nom)
+        ole = self.__dict__['_oleobj_']
+        try:
+            dispid = ole.GetIDsOfNames(nom)
+        except ErreurCOMSimulee:
+            raise AttributeError(nom)
+        if callable(self._membres[nom]):
+            return lambda *args: ole.Invoke(dispid, 0, DISPATCH_METHOD, True, *args)
+        return ole.Invoke(dispid, 0, 0, True)
+
+    def __setattr__(self, nom, valeur):
+        self._compteur.invocations += 1
+        self._membres[nom] = valeur
+
+
+class CollectionSimulee(ObjetCOMSimule):
+    """Collection COM (Blocks, bloc, ModelSpace, ...) avec Count, Item et itération"""
+
+    def __init__(self, compteur, elements, **membres):
+        elements = list(elements)
+        super().__init__(compteur, Count=len(elements), Item=elements.__getitem__, **membres)
+        self.__dict__['_elements'] = elements
+
+    def __iter__(self):
+        # _NewEnum puis un appel Next par élément
+        self._compteur.invocations += 1
+        for element in self._elements:
+            self._compteur.invocations += 1
+            self._compteur.attendre()
+            yield element
+
+
+class BlocageSimule:
+    """Appels COM sans réponse (boîte de dialogue modale, AutoCAD figé)
+    liberer() simule l'arrêt du processus: les appels bloqués échouent"""
+
+    def __init__(self):
+        self._libere = threading.Event()
+        self.appels_bloques = 0
+
+    def attendre(self, duree):
+        self.appels_bloques += 1
+        if self._libere.wait(duree):
+            raise ErreurCOMSimulee("Le serveur RPC n'est pas disponible")
+
+    def liberer(self):
+        self._libere.set()
+
+
+def bloquer(objet, nom, blocage, duree=3600.0):
+    """Le membre `nom` de l'objet simulé ne répond qu'après `duree` s"""
+    objet.__dict__.setdefault('_blocages', {})[nom] = (blocage, duree)
+
+
+def point(x=0.0, y=0.0, z=0.0):
+    return (float(x), float(y), float(z))
+
+
+def entite_simulee(compteur, object_name, calque='0', handle=None, **proprietes):
+    """Entité AutoCAD simulée avec les propriétés communes à toutes les entités"""
+    return ObjetCOMSimule(
+        compteur,
+        ObjectName=object_name,
+        Layer=calque,
+        Color=256,
+        Linetype='ByLayer',
+        Lineweight=-1,
+        Visible=True,
+        Handle=handle if handle is not None else format(next(_HANDLES), 'X'),
+        **proprietes
+    )
+
+
+def reference_simulee(compteur, nom, position, rotation=0.0, echelle=(1.0, 1.0, 1.0),
+                      calque='0', handle=None, attributs=(), nom_effectif=None,
+                      proprietes_dynamiques=()):
+    """Référence de bloc (AcDbBlockReference) simulée"""
+    attributs = tuple(attributs)
+    proprietes_dynamiques = tuple(proprietes_dynamiques)
+    return entite_simulee(
+        compteur, 'AcDbBlockReference', calque, handle,
+        Name=nom,
+        EffectiveName=nom_effectif or nom,
+        IsDynamicBlock=nom_effectif is not None,
+        InsertionPoint=point(*position),
+        Rotation=rotation,
+        XScaleFactor=echelle[0],
+        YScaleFactor=echelle[1],
+        ZScaleFactor=echelle[2],
+        GetAttributes=lambda: attributs,
+        GetDynamicBlockProperties=lambda: proprietes_dynamiques
+    )
+
+
+def attribut_simule(compteur, tag, valeur, position=(0.0, 0.0, 0.0), hauteur=2.5):
+    """Attribut (AcDbAttribute) d'une référence de bloc"""
+    return entite_simulee(
+        compteur, 'AcDbAttribute',
+        TagString=tag,
+        TextString=valeur,
+        Invisible=False,
+        Height=hauteur,
+        InsertionPoint=point(*position)
+    )
+
+
+def propriete_dynamique_simulee(compteur, nom, valeur, valeurs_autorisees=(), unite=0):
+    """Propriété de bloc dynamique (AcadDynamicBlockReferenceProperty)"""
+    return ObjetCOMSimule(
+        compteur,
+        PropertyName=nom,
+        Value=valeur,
+        ReadOnly=False,
+        UnitsType=unite,
+        Description=f"Paramètre {nom}",
+        AllowedValues=tuple(valeurs_autorisees)
+    )
+
+
+def bloc_simule(compteur, nom, entites, origine=(0.0, 0.0, 0.0), dynamique=False, xref=False):
+    """Définition de bloc (AcadBlock) simulée"""
+    return CollectionSimulee(
+        compteur, entites,
+        ObjectName='AcDbBlockTableRecord',
+        Name=nom,
+        IsXRef=xref,
+        IsLayout=nom.lower().startswith(('*model_space', '*paper_space')),
+        IsDynamicBlock=dynamique,
+        Origin=point(*origine)
+    )
+
+
+# Type DXF des ObjectName simulés (code de groupe 0 des filtres de sélection)
+TYPES_DXF = {
+    'AcDbBlockReference': 'INSERT',
+    'AcDbLine': 'LINE',
+    'AcDbCircle': 'CIRCLE',
+    'AcDbArc': 'ARC',
+    'AcDbPolyline': 'LWPOLYLINE',
+    'AcDbText': 'TEXT',
+    'AcDbMText': 'MTEXT',
+}
+
+
+def _motif_autocad(motif):
+    """Motif générique AutoCAD (virgules, *, ?, #, @, accent grave) -> expression régulière"""
+    parties, courant, echappe = [], '', False
+    for c in motif:
+        if echappe:
+            courant += re.escape(c)
+            echappe = False
+        elif c == '`':
+            echappe = True
+        elif c == ',':
+            parties.append(courant)
+            courant = ''
+        else:
+            courant += {'*': '.*', '?': '.', '#': '[0-9]', '@': '[A-Za-z]'}.get(c, re.escape(c))
+    parties.append(courant)
+    return re.compile('^(?:' + '|'.join(parties) + ')$', re.IGNORECASE)
+
+
+class JeuSelectionSimule(CollectionSimulee):
+    """AcadSelectionSet simulé: Select filtre les entités des espaces
+    (codes 0, 2, 8, 410) sans les faire traverser la frontière COM"""
+
+    def __init__(self, compteur, document, nom):
+        super().__init__(compteur, [], Name=nom, Select=self._selectionner, Delete=self._supprimer)
+        self.__dict__['_document'] = document
+
+    def _selectionner(self, mode, point1, point2, codes, valeurs):
+        document = self._document
+        espaces = (('Model', document._membres['ModelSpace']),
+                   (document._membres['PaperSpace']._membres['Layout']._membres['Name'],
+                    document._membres['PaperSpace']))
+        filtres = [(code, _motif_autocad(str(valeur))) for code, valeur in zip(codes, valeurs)]
+        elements = []
+        for presentation, espace in espaces:
+            for entite in espace._elements:
+                champs = {
+                    0: TYPES_DXF.get(entite._membres['ObjectName'], ''),
+                    2: entite._membres.get('Name', ''),
+                    8: entite._membres['Layer'],
+                    410: presentation,
+                }
+                if all(motif.match(champs.get(code, '')) for code, motif in filtres):
+                    elements.append(entite)
+        self.__dict__['_elements'] = elements
+        self._membres.update(Count=len(elements), Item=elements.__getitem__)
+
+    def _supprimer(self):
+        self._document._membres['SelectionSets']._jeux.pop(self._membres['Name'], None)
+
+
+class SelectionsSimulees(ObjetCOMSimule):
+    """Collection SelectionSets d'un document simulé"""
+
+    def __init__(self, compteur, document):
+        super().__init__(compteur, Add=self._ajouter, Item=self._element)
+        self.__dict__['_document'] = document
+        self.__dict__['_jeux'] = {}
+
+    def _ajouter(self, nom):
+        if nom in self._jeux:
+            raise ErreurCOMSimulee(f"Le jeu de sélection {nom} existe déjà")
+        jeu = self._jeux[nom] = JeuSelectionSimule(self._compteur, self._document, nom)
+        return jeu
+
+    def _element(self, nom):
+        try:
+            return self._jeux[nom]
+        except KeyError:
+            raise ErreurCOMSimulee(f"Jeu de sélection inconnu: {nom}")
+
+
+def document_simule(compteur, blocs, nom='Dessin simulé.dwg'):
+    """Document AutoCAD simulé; les espaces sont les blocs *Model_Space et *Paper_Space"""
+    par_nom = {b._membres['Name'].lower(): b for b in blocs}
+    model = par_nom.get('*model_space') or bloc_simule(compteur, '*Model_Space', [])
+    papier = par_nom.get('*paper_space') or bloc_simule(compteur, '*Paper_Space', [])
+    model._membres['Layout'] = ObjetCOMSimule(compteur, Name='Model')
+    papier._membres['Layout'] = ObjetCOMSimule(compteur, Name='Présentation1')
+    document = ObjetCOMSimule(
+        compteur,
+        Name=nom,
+        FullName=nom,
+        Blocks=CollectionSimulee(compteur, blocs),
+        ModelSpace=model,
+        PaperSpace=papier,
+        Close=lambda *args: None
+    )
+    document._membres['SelectionSets'] = SelectionsSimulees(compteur, document)
+    return document
+
+
+class ApplicationSimulee(ObjetCOMSimule):
+    """Application AutoCAD simulée: Documents.Open retourne le document fourni
+    Après chaque ouverture, l'application reste occupée `duree_chargement` s:
+    GetAcadState().IsQuiescent est faux et l'accès au document est rejeté"""
+
+    def __init__(self, compteur, document, duree_chargement=0.0):
+        self.__dict__['duree_chargement'] = duree_chargement
+        self.__dict__['_occupee_jusqua'] = 0.0
+        self.__dict__['ouvertures'] = []
+        self.__dict__['fermetures'] = 0
+        self.__dict__['quittee'] = False
+        documents = ObjetCOMSimule(compteur, Open=self._ouvrir, Count=1)
+        super().__init__(compteur, Documents=documents, Visible=True, Update=lambda: None,
+                         GetAcadState=self._etat, Quit=self._quitter)
+        self.__dict__['_document'] = _DocumentEnChargement(self, document)
+
+    def _occupee(self):
+        return time.monotonic() < self._occupee_jusqua
+
+    def _ouvrir(self, chemin, *args):
+        self.ouvertures.append(chemin)
+        self.__dict__['_occupee_jusqua'] = time.monotonic() + self.duree_chargement
+        return self._document
+
+    def _fermer(self, *args):
+        self.__dict__['fermetures'] += 1
+
+    def _etat(self):
+        return ObjetCOMSimule(self._compteur, IsQuiescent=not self._occupee())
+
+    def _quitter(self):
+        self.__dict__['quittee'] = True
+
+    @property
+    def documents_ouverts(self):
+        return len(self.ouvertures) - self.fermetures
+
+
+class _DocumentEnChargement:
+    """Document simulé qui rejette les appels tant que l'application est occupée"""
+
+    def __init__(self, application, document):
+        self.__dict__['_application'] = application
+        self.__dict__['_document'] = document
+        self.__dict__['_oleobj_'] = document.__dict__['_oleobj_']
+
+    def __getattr__(self, nom):
+        if nom.startswith('__'):
+            raise AttributeError(nom)
+        if self._application._occupee():
+            raise ErreurCOMSimulee("Appel rejeté par l'appelé (AutoCAD occupé)")
+        if nom == 'Close':
+            return self._application._fermer
+        return getattr(self._document, nom)
+
+
+class BackendSimule:
+    """Backend retournant directement un document simulé (ni fichier ni attente)"""
+
+    nom = 'simule'
+
+    def __init__(self, document, blocage=None):
+        self.document = document
+        self.blocage = blocage
+
+    def ouvrir(self, chemin):
+        return self.document
+
+    def interrompre(self):
+        if self.blocage is not None:
+            self.blocage.liberer()
+
+
+def _geometrie_simulee(compteur, rng, calque):
+    """Entité géométrique simple tirée au hasard"""
+    x, y = rng.uniform(0, 100), rng.uniform(0, 100)
+    genre = rng.randrange(4)
+    if genre == 0:
+        x2, y2 = x + rng.uniform(-5, 5), y + rng.uniform(-5, 5)
+        return entite_simulee(compteur, 'AcDbLine', calque,
+                              StartPoint=point(x, y), EndPoint=point(x2, y2),
+                              Length=math.hypot(x2 - x, y2 - y))
+    if genre == 1:
+        return entite_simulee(compteur, 'AcDbCircle', calque,
+                              Center=point(x, y), Radius=rng.uniform(0.1, 2))
+    if genre == 2:
+        return entite_simulee(compteur, 'AcDbArc', calque,
+                              Center=point(x, y), Radius=rng.uniform(0.1, 2),
+                              StartAngle=0.0, EndAngle=rng.uniform(0.1, 2 * math.pi))
+    return entite_simulee(compteur, 'AcDbPolyline', calque,
+                          Coordinates=(x, y, x + 1, y, x + 1, y + 1), Closed=False)
+
+
+def generer_dessin(compteur, definitions=50, instances=1000, imbrication=1,
+                   entites_par_bloc=8, entites_libres=None, part_dynamiques=0.1,
+                   attributs_par_bloc=1, graine=0):
+    """Génère un dessin synthétique
+    - `definitions` blocs utilisateur de `entites_par_bloc` entités chacun
+    - `imbrication` niveaux de blocs imbriqués (un bloc de niveau n
+      référence deux blocs de niveau n-1)
+    - `instances` références de blocs dans l'espace objet, mêlées à
+      `entites_libres` entités géométriques (3 par instance par défaut)
+    """
+    rng = random.Random(graine)
+    calques = [f"Calque_{i}" for i in range(12)]
+    if entites_libres is None:
+        entites_libres = 3 * instances
+
+    blocs_utilisateur = []
+    niveaux = {}
+    for d in range(definitions):
+        nom = f"Bloc_{d:04d}"
+        niveau = d % (imbrication + 1)
+        dynamique = rng.random() < part_dynamiques
+        entites = [_geometrie_simulee(compteur, rng, rng.choice(calques))
+                   for _ in range(entites_par_bloc)]
+        for a in range(attributs_par_bloc):
+            entites.append(entite_simulee(
+                compteur, 'AcDbAttributeDefinition', '0',
+                TagString=f"ATTR{a}", PromptString=f"Valeur {a}", TextString='',
+                Constant=False, Invisible=False, Preset=False, Verify=False
+            ))
+        if niveau > 0 and niveaux.get(niveau - 1):
+            for _ in range(2):
+                enfant = rng.choice(niveaux[niveau - 1])
+                entites.append(reference_simulee(compteur, enfant, (rng.uniform(0, 5), rng.uniform(0, 5), 0)))
+        niveaux.setdefault(niveau, []).append(nom)
+        blocs_utilisateur.append((nom, dynamique, attributs_par_bloc,
+                                  bloc_simule(compteur, nom, entites, dynamique=dynamique)))
+
+    model = []
+    for i in range(instances):
+        nom, dynamique, nb_attributs, _ = rng.choice(blocs_utilisateur)
+        attributs = [attribut_simule(compteur, f"ATTR{a}", str(i)) for a in range(nb_attributs)]
+        proprietes = []
+        if dynamique:
+            proprietes = [
+                propriete_dynamique_simulee(compteur, 'Largeur', rng.choice((0.8, 0.9, 1.0)), (0.8, 0.9, 1.0)),
+                propriete_dynamique_simulee(compteur, 'Visibilité', 'Ouvert', ('Ouvert', 'Fermé'))
+            ]
+        model.append(reference_simulee(
+            compteur, nom, (rng.uniform(0, 1000), rng.uniform(0, 1000), 0.0),
+            rotation=rng.uniform(0, 2 * math.pi), calque=rng.choice(calques),
+            attributs=attributs, nom_effectif=nom if dynamique else None,
+            proprietes_dynamiques=proprietes
+        ))
+    model.extend(_geometrie_simulee(compteur, rng, rng.choice(calques)) for _ in range(entites_libres))
+    rng.shuffle(model)
+
+    blocs = [bloc_simule(compteur, '*Model_Space', model), bloc_simule(compteur, '*Paper_Space', [])]
+    blocs.extend(bloc for _, _, _, bloc in blocs_utilisateur)
+    return document_simule(compteur, blocs)
+
+
+def nombre_entites(document):
+    """Nombre total d'entités des blocs du document (sans compter d'appels)"""
+    return sum(len(bloc._elements) for bloc in document._membres['Blocks']._elements)
+
+
+if __name__ == "__main__":
+    # Comparaison du nombre d'appels COM: motif hasattr contre accesseur avec plans
+    from acces_com import AccesseurCOM, PlanProprietes
+
+    compteur = CompteurAppels()
+    references = [
+        reference_simulee(compteur, 'Porte', (i, 0.0, 0.0),
+                          attributs=[attribut_simule(compteur, 'NUM', str(i))])
+        for i in range(100)
+    ]
+    champs = ('Color', 'Linetype', 'Lineweight', 'Visible', 'Handle', 'Thickness')
+
+    compteur.remettre_a_zero()
+    for entity in references:
+        for nom in champs:
+            getattr(entity, nom) if hasattr(entity, nom) else None
+    appels_hasattr = compteur.total
+
+    compteur.remettre_a_zero()
+    acces = AccesseurCOM()
+    plan = PlanProprietes(optionnels=[(nom.lower(), nom) for nom in champs])
+    for entity in references:
+        acces.lire_plan(entity, 'AcDbBlockReference', plan)
+    appels_plan = compteur.total
+
+    print(f"Motif hasattr: {appels_hasattr} appels COM")
+    print(f"Accesseur:     {appels_plan} appels COM")
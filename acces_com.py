@@ -0,0 +1,178 @@
+"""
+Accès aux propriétés des objets AutoCAD
+- les DISPID sont mis en cache par type COM (ObjectName)
+- les propriétés absentes d'un type sont apprises puis plus jamais demandées
+- chaque champ est lu en une seule tentative, selon un plan par type
+  (au lieu du motif `entity.X if hasattr(entity, 'X') else None`
+  qui coûte deux recherches et deux invocations par propriété)
+Les objets qui ne sont pas des objets COM (backend DXF) sont lus par getattr.
+Avec une instrumentation (voir instrumentation), chaque appel est chronométré
+et les erreurs ignorées sont comptées.
+"""
+
+import time
+
+try:
+    import pythoncom
+    import win32com.client
+    DISPATCH_METHOD = pythoncom.DISPATCH_METHOD
+    DISPATCH_PROPERTYGET = pythoncom.DISPATCH_PROPERTYGET
+    TYPE_IDISPATCH = pythoncom.TypeIIDs[pythoncom.IID_IDispatch]
+except ImportError:
+    pythoncom = None
+    DISPATCH_METHOD = 1
+    DISPATCH_PROPERTYGET = 2
+    TYPE_IDISPATCH = None
+
+# Clé de type utilisée pour les membres communs à tous les objets AutoCAD
+TYPE_OBJET = 'AcadObject'
+
+
+class ProprieteNonSupportee(AttributeError):
+    """Propriété absente pour ce type d'objet"""
+
+
+class PlanProprietes:
+    """Champs à lire pour un type d'objet: (champ, propriété COM)
+    Un champ obligatoire illisible fait échouer toute la lecture,
+    un champ optionnel illisible vaut None."""
+
+    def __init__(self, obligatoires=(), optionnels=()):
+        self.obligatoires = tuple(obligatoires)
+        self.optionnels = tuple(optionnels)
+
+
+def _envelopper(valeur):
+    """Enveloppe les IDispatch bruts retournés par Invoke"""
+    if TYPE_IDISPATCH is None:
+        return valeur
+    if isinstance(valeur, TYPE_IDISPATCH):
+        return win32com.client.Dispatch(valeur)
+    if isinstance(valeur, tuple) and valeur and isinstance(valeur[0], TYPE_IDISPATCH):
+        return tuple(win32com.client.Dispatch(v) for v in valeur)
+    return valeur
+
+
+def _ole(obj):
+    """IDispatch de l'objet COM, ou None pour un objet Python"""
+    try:
+        return obj.__dict__.get('_oleobj_')
+    except AttributeError:
+        return None
+
+
+class AccesseurCOM:
+    """Lecture des propriétés avec cache des DISPID et des propriétés absentes"""
+
+    def __init__(self):
+        self._dispids = {}
+        self._non_supportees = set()
+        # Surveillance des délais (surveillance.Surveillant), prévenue avant chaque appel
+        self.surveillant = None
+        # Mesure des appels (instrumentation.Instrumentation), None: sans mesure
+        self.instrumentation = None
+
+    def _invoquer(self, oleobj, cle_type, nom, drapeaux, args):
+        if self.instrumentation is None:
+            return self._invoquer_com(oleobj, cle_type, nom, drapeaux, args)
+        debut = time.perf_counter()
+        try:
+            return self._invoquer_com(oleobj, cle_type, nom, drapeaux, args)
+        finally:
+            self.instrumentation.appel(cle_type, nom, time.perf_counter() - debut)
+
+    def _attribut(self, obj, cle_type, nom):
+        """getattr d'un objet Python (backend DXF), mesuré comme un appel"""
+        if self.instrumentation is None:
+            return getattr(obj, nom)
+        debut = time.perf_counter()
+        try:
+            return getattr(obj, nom)
+        finally:
+            self.instrumentation.appel(cle_type, nom, time.perf_counter() - debut)
+
+    def _ignorer(self, site, erreur):
+        if self.instrumentation is not None:
+            self.instrumentation.exception(site, erreur)
+
+    def _invoquer_com(self, oleobj, cle_type, nom, drapeaux, args):
+        if self.surveillant is not None:
+            self.surveillant.signe(nom)
+        cle = (cle_type, nom)
+        dispid = self._dispids.get(cle)
+        if dispid is None:
+            if cle in self._non_supportees:
+                raise ProprieteNonSupportee(nom)
+            try:
+                dispid = oleobj.GetIDsOfNames(nom)
+            except Exception:
+                self._non_supportees.add(cle)
+                raise ProprieteNonSupportee(nom)
+            self._dispids[cle] = dispid
+
+        return _envelopper(oleobj.Invoke(dispid, 0, drapeaux, True, *args))
+
+    def lire(self, obj, cle_type, nom, defaut=None):
+        """Lit une propriété en une seule tentative, défaut si illisible"""
+        oleobj = _ole(obj)
+        try:
+            if oleobj is None:
+                # Objet Python (backend DXF): simple getattr
+                return self._attribut(obj, cle_type, nom)
+            return self._invoquer(oleobj, cle_type, nom, DISPATCH_PROPERTYGET, ())
+        except Exception as e:
+            self._ignorer('acces_com.lire', e)
+            return defaut
+
+    def lire_obligatoire(self, obj, cle_type, nom):
+        """Lit une propriété et propage l'erreur si elle est illisible"""
+        oleobj = _ole(obj)
+        if oleobj is None:
+            return self._attribut(obj, cle_type, nom)
+        return self._invoquer(oleobj, cle_type, nom, DISPATCH_PROPERTYGET, ())
+
+    def appeler(self, obj, cle_type, nom, *args):
+        """Appelle une méthode de l'objet"""
+        oleobj = _ole(obj)
+        if oleobj is None:
+            return self._attribut(obj, cle_type, nom)(*args)
+        return self._invoquer(oleobj, cle_type, nom, DISPATCH_METHOD, args)
+
+    def type_objet(self, obj):
+        """ObjectName de l'objet"""
+        return self.lire_obligatoire(obj, TYPE_OBJET, 'ObjectName')
+
+    def lire_plan(self, obj, cle_type, plan):
+        """Lit tous les champs d'un plan et retourne un dictionnaire"""
+        valeurs = {}
+        oleobj = _ole(obj)
+        if oleobj is None and self.instrumentation is None:
+            for champ, nom in plan.obligatoires:
+                valeurs[champ] = getattr(obj, nom)
+            for champ, nom in plan.optionnels:
+                valeurs[champ] = getattr(obj, nom, None)
+            return valeurs
+        if oleobj is None:
+            for champ, nom in plan.obligatoires:
+                valeurs[champ] = self._attribut(obj, cle_type, nom)
+            for champ, nom in plan.optionnels:
+                try:
+                    valeurs[champ] = self._attribut(obj, cle_type, nom)
+                except AttributeError as e:
+                    self._ignorer('acces_com.lire_plan', e)
+                    valeurs[champ] = None
+            return valeurs
+
+        for champ, nom in plan.obligatoires:
+            valeurs[champ] = self._invoquer(oleobj, cle_type, nom, DISPATCH_PROPERTYGET, ())
+        for champ, nom in plan.optionnels:
+            try:
+                valeurs[champ] = self._invoquer(oleobj, cle_type, nom, DISPATCH_PROPERTYGET, ())
+            except Exception as e:
+                self._ignorer('acces_com.lire_plan', e)
+                valeurs[champ] = None
+        return valeurs
+
+    def est_supportee(self, cle_type, nom):
+        """False si la propriété est connue comme absente pour ce type"""
+        return (cle_type, nom) not in self._non_supportees
@@ -0,0 +1,67 @@
+"""
+Backends d'ouverture des dessins pour ExtracteurBlocs
+- BackendAutoCAD: pilote AutoCAD par COM (Windows, nécessite pywin32)
+- BackendDXF: lecteur DXF en pur Python, sans AutoCAD
+"""
+
+import os
+
+from lecteur_dxf import charger_dxf
+from session_autocad import SessionAutoCAD
+
+
+class BackendAutoCAD:
+    """Ouvre les fichiers DWG dans AutoCAD via COM
+    L'application est gardée ouverte d'un dessin à l'autre (SessionAutoCAD)"""
+
+    nom = 'autocad'
+
+    def __init__(self, application=None, nouvelle_instance=False, session=None):
+        self.session = session if session is not None else \
+            SessionAutoCAD(application, nouvelle_instance=nouvelle_instance)
+
+    @property
+    def acad(self):
+        return self.session.acad
+
+    def ouvrir(self, chemin):
+        """Ouvre le dessin et retourne le document AutoCAD une fois chargé"""
+        if not os.path.exists(chemin):
+            raise FileNotFoundError(f"Le fichier n'existe pas: {chemin}")
+
+        print("⏳ Chargement du document en cours...")
+        return self.session.ouvrir(chemin)
+
+    def fermer(self, doc):
+        """Ferme le document; l'application reste ouverte pour le dessin suivant"""
+        self.session.fermer_document(doc)
+
+    def interrompre(self):
+        """Débloque un appel COM sans réponse en arrêtant AutoCAD"""
+        return self.session.forcer_arret()
+
+    def terminer(self):
+        """Ferme la session AutoCAD"""
+        self.session.fermer()
+
+
+class BackendDXF:
+    """Lit les fichiers DXF sans AutoCAD"""
+
+    nom = 'dxf'
+
+    def ouvrir(self, chemin):
+        """Charge le fichier DXF et retourne un document compatible COM"""
+        if not os.path.exists(chemin):
+            raise FileNotFoundError(f"Le fichier n'existe pas: {chemin}")
+        return charger_dxf(chemin)
+
+    def fermer(self, doc):
+        doc.Close()
+
+
+def choisir_backend(chemin):
+    """Choisit le backend selon l'extension du fichier"""
+    if chemin.lower().endswith('.dxf'):
+        return BackendDXF()
+    return BackendAutoCAD()
@@ -0,0 +1,118 @@
+"""
+Banc d'essai de ExtracteurBlocs sur un modèle AutoCAD simulé
+Mesure pour extraire_tout, sauvegarder_json et sauvegarder_rapport:
+entités/s, appels COM par entité et pic mémoire
+Usage: python bench_blocs.py --definitions 200 --instances 5000 --latence 20
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from acad_simule import CompteurAppels, BackendSimule, generer_dessin, nombre_entites
+from ReadBlocDWG import ExtracteurBlocs
+
+
+def mesurer(compteur, fonction, args, memoire=False):
+    """Exécute une phase et retourne (durée s, appels COM, pic mémoire octets)
+    tracemalloc ralentit l'exécution: la mémoire est mesurée à part"""
+    compteur.remettre_a_zero()
+    if memoire:
+        tracemalloc.start()
+    debut = time.perf_counter()
+    with open(os.devnull, 'w', encoding='utf-8') as muet, contextlib.redirect_stdout(muet):
+        fonction(*args)
+    duree = time.perf_counter() - debut
+    pic = None
+    if memoire:
+        _, pic = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return duree, compteur.total, pic
+
+
+def executer_scenario(definitions, instances, imbrication, latence_us, repetitions=1, graine=0):
+    """Mesure les trois phases sur un dessin synthétique"""
+    compteur = CompteurAppels(latence=latence_us / 1e6)
+    document = generer_dessin(compteur, definitions=definitions, instances=instances,
+                              imbrication=imbrication, graine=graine)
+    entites = nombre_entites(document)
+
+    resultats = {}
+    with tempfile.TemporaryDirectory() as dossier:
+        # Meilleur temps sur les répétitions, puis un passage pour la mémoire
+        for repetition in range(repetitions + 1):
+            memoire = repetition == repetitions
+            extracteur = ExtracteurBlocs('simule.dwg', backend=BackendSimule(document))
+            phases = [
+                ('extraire_tout', extracteur.extraire_tout, ()),
+                ('sauvegarder_json', extracteur.sauvegarder_json, (os.path.join(dossier, 'blocs.json'),)),
+                ('sauvegarder_rapport', extracteur.sauvegarder_rapport, (os.path.join(dossier, 'rapport.txt'),)),
+            ]
+            for nom, fonction, args in phases:
+                duree, appels, pic = mesurer(compteur, fonction, args, memoire)
+                if memoire:
+                    resultats[nom]['pic_memoire_mo'] = pic / 1e6
+                    continue
+                meilleur = resultats.get(nom)
+                if meilleur is None or duree < meilleur['duree_s']:
+                    resultats[nom] = {
+                        'duree_s': duree,
+                        'entites_par_s': entites / duree if duree else None,
+                        'appels_com': appels,
+                        'appels_com_par_entite': appels / entites if entites else 0
+                    }
+
+    return {
+        'scenario': {
+            'definitions': definitions,
+            'instances': instances,
+            'imbrication': imbrication,
+            'latence_us': latence_us,
+            'entites': entites
+        },
+        'phases': resultats
+    }
+
+
+def afficher(resultat):
+    scenario = resultat['scenario']
+    print(f"\n📐 {scenario['definitions']} définitions, {scenario['instances']} instances, "
+          f"imbrication {scenario['imbrication']}, latence {scenario['latence_us']} µs "
+          f"({scenario['entites']} entités)")
+    print(f"  {'Phase':<22}{'Durée (s)':>12}{'Entités/s':>14}{'COM/entité':>12}{'Pic (Mo)':>11}")
+    for nom, mesure in resultat['phases'].items():
+        print(f"  {nom:<22}{mesure['duree_s']:>12.3f}{mesure['entites_par_s']:>14.0f}"
+              f"{mesure['appels_com_par_entite']:>12.2f}{mesure['pic_memoire_mo']:>11.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai de l'extraction des blocs")
+    parser.add_argument('--definitions', type=int, nargs='+', default=[50])
+    parser.add_argument('--instances', type=int, nargs='+', default=[1000])
+    parser.add_argument('--imbrication', type=int, default=1)
+    parser.add_argument('--latence', type=float, default=0.0, help="latence par appel COM en µs")
+    parser.add_argument('--repetitions', type=int, default=3)
+    parser.add_argument('--sortie', help="fichier JSON où enregistrer les mesures")
+    args = parser.parse_args(argv)
+
+    resultats = []
+    for definitions in args.definitions:
+        for instances in args.instances:
+            resultat = executer_scenario(definitions, instances, args.imbrication,
+                                         args.latence, args.repetitions)
+            afficher(resultat)
+            resultats.append(resultat)
+
+    if args.sortie:
+        with open(args.sortie, 'w', encoding='utf-8') as f:
+            json.dump({'date': datetime.now().isoformat(), 'resultats': resultats}, f, indent=2)
+        print(f"\n💾 Mesures enregistrées dans: {os.path.abspath(args.sortie)}")
+
+
+if __name__ == "__main__":
+    main()
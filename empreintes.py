@@ -0,0 +1,146 @@
+"""
+Empreintes géométriques des définitions de blocs et déduplication des corps
+L'empreinte d'une définition est un condensé (blake2b) de son corps:
+entités contenues et définitions d'attributs, plus l'origine du bloc
+- le nom et le handle de la définition n'y entrent pas
+- les réels sont arrondis à DECIMALES décimales (écarts de calcul tolérés)
+- l'ordre des entités est sans effet
+- une référence imbriquée compte par l'empreinte du bloc référencé, pas
+  par son nom (deux A$C… identiques référençant deux *U… identiques)
+Les définitions de même empreinte partagent un corps: la première garde
+le sien ('nombre_doublons'), les suivantes y renvoient ('corps': nom de la
+première) et, dans les sorties, n'ont plus d'entités ni d'attributs.
+En mémoire, les doublons partagent les listes de la première définition
+(les références imbriquées d'un corps partagé nomment donc les blocs de
+la première; 'references_imbriquees' reste propre à chaque définition).
+Les définitions sans corps (xrefs, blocs vides) et les présentations
+n'ont pas d'empreinte.
+"""
+
+import hashlib
+import json
+
+DECIMALES = 6
+CHAMPS_IGNORES = ('handle',)
+
+
+def _canonique(valeur, decimales):
+    """Valeur JSON avec les réels arrondis (et -0.0 ramené à 0.0)"""
+    if isinstance(valeur, float):
+        return round(valeur, decimales) + 0.0
+    if isinstance(valeur, dict):
+        return {cle: _canonique(v, decimales) for cle, v in valeur.items()}
+    if isinstance(valeur, (list, tuple)):
+        return [_canonique(v, decimales) for v in valeur]
+    return valeur
+
+
+def _en_dict(entite):
+    return entite.en_dict() if hasattr(entite, 'en_dict') else entite
+
+
+def a_un_corps(bloc_def):
+    """Définition dédupliquable: ni présentation ni corps vide"""
+    return not bloc_def.get('est_layout') and bool(bloc_def['entites_contenues'] or bloc_def['attributs'])
+
+
+class EmpreintesBlocs:
+    """Empreintes des définitions, mémorisées par nom"""
+
+    def __init__(self, definitions, decimales=DECIMALES):
+        self.definitions = {bloc_def['nom']: bloc_def for bloc_def in definitions}
+        self.decimales = decimales
+        self._empreintes = {}
+
+    def _entite(self, entite, en_cours):
+        donnees = {cle: v for cle, v in _en_dict(entite).items() if cle not in CHAMPS_IGNORES}
+        if donnees.get('type') == "AcDbBlockReference" and 'nom_bloc' in donnees:
+            nom_enfant = donnees['nom_bloc']
+            if nom_enfant not in en_cours:
+                empreinte = self.empreinte(nom_enfant, en_cours)
+                if empreinte is not None:
+                    donnees['nom_bloc'] = '#' + empreinte
+        return json.dumps(_canonique(donnees, self.decimales), sort_keys=True, ensure_ascii=False)
+
+    def empreinte(self, nom, en_cours=None):
+        """Empreinte hexadécimale du corps de la définition (None sans corps)"""
+        if nom in self._empreintes:
+            return self._empreintes[nom]
+        bloc_def = self.definitions.get(nom)
+        if bloc_def is None or not a_un_corps(bloc_def):
+            return None
+
+        en_cours = en_cours if en_cours is not None else set()
+        en_cours.add(nom)
+        entites = sorted(self._entite(e, en_cours) for e in bloc_def['entites_contenues'])
+        attributs = sorted(self._entite(a, en_cours) for a in bloc_def['attributs'])
+        en_cours.discard(nom)
+
+        condense = hashlib.blake2b(digest_size=16)
+        origine = _canonique(bloc_def.get('origine'), self.decimales)
+        condense.update(json.dumps(origine, sort_keys=True).encode('utf-8'))
+        for partie in (entites, attributs):
+            condense.update(b'\x1e')
+            for ligne in partie:
+                condense.update(ligne.encode('utf-8'))
+                condense.update(b'\x1f')
+        empreinte = condense.hexdigest()
+        self._empreintes[nom] = empreinte
+        return empreinte
+
+
+def dedupliquer(definitions, decimales=DECIMALES):
+    """Empreinte de chaque définition et partage des corps identiques
+    (modifie les définitions); renvoie le résumé de la déduplication"""
+    definitions = list(definitions)
+    empreintes = EmpreintesBlocs(definitions, decimales)
+    premieres = {}
+    doublons = entites_partagees = 0
+    for bloc_def in definitions:
+        for cle in ('empreinte', 'corps', 'nombre_doublons'):
+            bloc_def.pop(cle, None)
+    for bloc_def in definitions:
+        empreinte = empreintes.empreinte(bloc_def['nom'])
+        if empreinte is None:
+            continue
+        bloc_def['empreinte'] = empreinte
+        premiere = premieres.setdefault(empreinte, bloc_def)
+        if premiere is bloc_def:
+            continue
+        premiere['nombre_doublons'] = premiere.get('nombre_doublons', 0) + 1
+        bloc_def['corps'] = premiere['nom']
+        bloc_def['entites_contenues'] = premiere['entites_contenues']
+        bloc_def['attributs'] = premiere['attributs']
+        doublons += 1
+        entites_partagees += len(premiere['entites_contenues']) + len(premiere['attributs'])
+    return {
+        'corps_uniques': len(premieres),
+        'definitions_dupliquees': doublons,
+        'entites_non_repetees': entites_partagees,
+        'decimales': decimales
+    }
+
+
+def definition_compacte(bloc_def):
+    """Définition telle qu'écrite dans les sorties: un doublon n'a plus de corps"""
+    if bloc_def.get('corps') is None:
+        return bloc_def
+    return dict(bloc_def, entites_contenues=[], attributs=[])
+
+
+class ResolveurCorps:
+    """Rétablit, à la relecture d'une sortie dédupliquée, le corps des
+    doublons; seuls les corps partagés (nombre_doublons) sont gardés"""
+
+    def __init__(self):
+        self.corps = {}
+
+    def resoudre(self, bloc_def):
+        nom_corps = bloc_def.get('corps')
+        if nom_corps is not None:
+            corps = self.corps.get(nom_corps)
+            if corps is not None and not bloc_def['entites_contenues'] and not bloc_def['attributs']:
+                bloc_def['entites_contenues'], bloc_def['attributs'] = corps
+        elif bloc_def.get('nombre_doublons'):
+            self.corps[bloc_def['nom']] = (bloc_def['entites_contenues'], bloc_def['attributs'])
+        return bloc_def
@@ -0,0 +1,240 @@
+"""
+Emprises (boîtes englobantes) des définitions et des instances de blocs
+- emprise locale d'une définition: calculée une fois depuis la géométrie
+  extraite (lignes, cercles, arcs, polylignes, points, splines, cotes,
+  textes) et les références imbriquées, mémorisée par définition; une
+  définition en double (voir empreintes) reprend celle de son corps
+- emprise d'une instance dans le repère du dessin: boîte locale
+  transformée (origine du bloc, échelles, rotation autour de Z, position),
+  calculée pour toutes les instances à la fois avec numpy
+Les boîtes sont des tuples (xmin, ymin, zmin, xmax, ymax, zmax).
+Les définitions sans géométrie relevée (profil sans géométrie, hachures
+seules) n'ont pas d'emprise. Le calcul vectorisé nécessite numpy; sans
+numpy, les instances sont transformées une à une.
+"""
+
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _boite(points):
+    """Boîte englobante d'une liste de points (x, y, z), None si vide"""
+    if not points:
+        return None
+    xs, ys, zs = zip(*points)
+    return (min(xs), min(ys), min(zs), max(xs), max(ys), max(zs))
+
+
+def union_boites(boites):
+    """Boîte englobant toutes les boîtes (None ignorées)"""
+    boites = [b for b in boites if b is not None]
+    if not boites:
+        return None
+    return (min(b[0] for b in boites), min(b[1] for b in boites), min(b[2] for b in boites),
+            max(b[3] for b in boites), max(b[4] for b in boites), max(b[5] for b in boites))
+
+
+def _points_a_plat(coordonnees, dimension, z=0.0):
+    """(x, y[, z], ...) -> [(x, y, z), ...]"""
+    if dimension == 2:
+        return [(coordonnees[i], coordonnees[i + 1], z) for i in range(0, len(coordonnees) - 1, 2)]
+    return [tuple(coordonnees[i:i + 3]) for i in range(0, len(coordonnees) - 2, 3)]
+
+
+def _points_arc(centre, rayon, debut, fin):
+    """Extrémités de l'arc et points cardinaux compris dans son balayage"""
+    cx, cy, cz = centre
+    balayage = (fin - debut) % (2 * math.pi)
+    angles = [debut, debut + balayage]
+    for k in range(4):
+        cardinal = k * math.pi / 2
+        if (cardinal - debut) % (2 * math.pi) <= balayage:
+            angles.append(cardinal)
+    return [(cx + rayon * math.cos(a), cy + rayon * math.sin(a), cz) for a in angles]
+
+
+def points_entite(entite):
+    """Points caractéristiques d'une entité extraite (dictionnaire ou enregistrement)"""
+    obj_type = entite['type']
+    if obj_type == "AcDbLine" and 'debut' in entite:
+        return [tuple(entite['debut']), tuple(entite['fin'])]
+    if obj_type == "AcDbCircle" and 'centre' in entite:
+        (cx, cy, cz), r = entite['centre'], entite['rayon']
+        return [(cx - r, cy - r, cz), (cx + r, cy + r, cz)]
+    if obj_type == "AcDbArc" and 'centre' in entite:
+        return _points_arc(entite['centre'], entite['rayon'], entite['angle_debut'], entite['angle_fin'])
+    if 'sommets' in entite:
+        return _points_a_plat(entite['sommets'], entite['dimension'], entite.get('elevation') or 0.0)
+    if 'points_controle' in entite:
+        return _points_a_plat(entite['points_controle'] or entite.get('points_ajustement') or (), 3)
+    points = []
+    for cle in ('position', 'insertion', 'point_1', 'point_2', 'position_texte'):
+        if entite.get(cle) is not None and obj_type != "AcDbBlockReference":
+            points.append(tuple(entite[cle]))
+    return points
+
+
+def transformer_boite(boite, origine, position, rotation, echelle):
+    """Boîte locale d'un bloc -> boîte dans le repère de la référence
+    (p' = position + R(rotation) . S(echelle) . (p - origine))"""
+    ox, oy, oz = origine
+    sx, sy, sz = echelle
+    cos, sin = math.cos(rotation), math.sin(rotation)
+    xs, ys = [], []
+    for x in (boite[0] - ox, boite[3] - ox):
+        for y in (boite[1] - oy, boite[4] - oy):
+            x_e, y_e = x * sx, y * sy
+            xs.append(position[0] + x_e * cos - y_e * sin)
+            ys.append(position[1] + x_e * sin + y_e * cos)
+    z1 = position[2] + (boite[2] - oz) * sz
+    z2 = position[2] + (boite[5] - oz) * sz
+    return (min(xs), min(ys), min(z1, z2), max(xs), max(ys), max(z1, z2))
+
+
+def _xyz(valeur):
+    """Point {'x', 'y', 'z'} ou [x, y, z] -> (x, y, z)"""
+    if isinstance(valeur, dict):
+        return (valeur['x'], valeur['y'], valeur['z'])
+    return tuple(valeur)
+
+
+class EmprisesBlocs:
+    """Emprises locales des définitions (mémorisées) et emprises des instances"""
+
+    def __init__(self, definitions):
+        self.definitions = {bloc_def['nom']: bloc_def for bloc_def in definitions}
+        self._locales = {}
+
+    def _origine(self, nom):
+        origine = self.definitions[nom].get('origine')
+        return _xyz(origine) if origine else (0.0, 0.0, 0.0)
+
+    def emprise_locale(self, nom, en_cours=None):
+        """Boîte de la définition dans son propre repère (None sans géométrie)"""
+        if nom in self._locales:
+            return self._locales[nom]
+        bloc_def = self.definitions.get(nom)
+        if bloc_def is None:
+            return None
+        corps = bloc_def.get('corps')
+        if corps is not None and corps in self.definitions and corps not in (en_cours or ()):
+            boite = self._locales[nom] = self.emprise_locale(corps, en_cours)
+            return boite
+
+        en_cours = en_cours if en_cours is not None else set()
+        en_cours.add(nom)
+        boites = []
+        for entite in bloc_def['entites_contenues']:
+            if entite['type'] == "AcDbBlockReference" and 'nom_bloc' in entite:
+                # Référence imbriquée: emprise du bloc référencé transformée
+                nom_enfant = entite['nom_bloc']
+                if nom_enfant not in self.definitions:
+                    nom_enfant = entite.get('nom_effectif') or nom_enfant
+                if nom_enfant in en_cours:
+                    continue
+                enfant = self.emprise_locale(nom_enfant, en_cours)
+                if enfant is not None:
+                    boites.append(transformer_boite(enfant, self._origine(nom_enfant), entite['insertion'],
+                                                    entite['rotation'], entite['echelle']))
+            else:
+                boites.append(_boite(points_entite(entite)))
+        en_cours.discard(nom)
+
+        boite = union_boites(boites)
+        self._locales[nom] = boite
+        return boite
+
+    def _definition_instance(self, instance):
+        nom = _champ(instance, 'nom_bloc')
+        if nom not in self.definitions:
+            nom = _champ(instance, 'nom_effectif') or nom
+        return nom
+
+    def _boite_relative(self, nom, boites):
+        """Boîte locale moins l'origine du bloc, mémorisée dans boites"""
+        if nom not in boites:
+            boite = self.emprise_locale(nom)
+            if boite is not None:
+                ox, oy, oz = self._origine(nom)
+                boite = (boite[0] - ox, boite[1] - oy, boite[2] - oz,
+                         boite[3] - ox, boite[4] - oy, boite[5] - oz)
+            boites[nom] = boite
+        return boites[nom]
+
+    def emprises_instances(self, instances):
+        """Emprise de chaque instance dans le repère du dessin (None sans géométrie)"""
+        instances = list(instances)
+        if np is None:
+            boites = {}
+            resultat = []
+            for instance in instances:
+                boite = self._boite_relative(self._definition_instance(instance), boites)
+                resultat.append(None if boite is None else transformer_boite(
+                    boite, (0.0, 0.0, 0.0), *_transformation(instance)))
+            return resultat
+        return self._emprises_numpy(instances)
+
+    def _emprises_numpy(self, instances):
+        # Une boîte par définition, indexée par instance
+        boites, index = {}, {}
+        lignes, indices, transformations = [], [], []
+        for i, instance in enumerate(instances):
+            nom = self._definition_instance(instance)
+            boite = self._boite_relative(nom, boites)
+            if boite is None:
+                continue
+            lignes.append(i)
+            indices.append(index.setdefault(nom, len(index)))
+            position, rotation, echelle = _transformation(instance)
+            transformations.extend(position)
+            transformations.append(rotation)
+            transformations.extend(echelle)
+
+        resultat = [None] * len(instances)
+        if not lignes:
+            return resultat
+
+        uniques = np.array([boites[nom] for nom in index], dtype=float)
+        b = uniques[np.array(indices, dtype=np.intp)]
+        t = np.array(transformations, dtype=float).reshape(-1, 7)
+        px, py, pz, rotation, sx, sy, sz = t.T
+        cos, sin = np.cos(rotation), np.sin(rotation)
+
+        # Quatre coins de la boîte dans le plan XY, mis à l'échelle puis tournés
+        x = np.stack([b[:, 0], b[:, 3], b[:, 0], b[:, 3]], axis=1) * sx[:, None]
+        y = np.stack([b[:, 1], b[:, 1], b[:, 4], b[:, 4]], axis=1) * sy[:, None]
+        xs = px[:, None] + x * cos[:, None] - y * sin[:, None]
+        ys = py[:, None] + x * sin[:, None] + y * cos[:, None]
+        zs = pz[:, None] + b[:, [2, 5]] * sz[:, None]
+
+        emprises = np.column_stack([xs.min(axis=1), ys.min(axis=1), zs.min(axis=1),
+                                    xs.max(axis=1), ys.max(axis=1), zs.max(axis=1)])
+        for i, emprise in zip(lignes, emprises.tolist()):
+            resultat[i] = tuple(emprise)
+        return resultat
+
+
+def _champ(instance, cle):
+    """Champ d'une instance (enregistrement compact ou dictionnaire)"""
+    valeur = getattr(instance, cle, None)
+    return valeur if valeur is not None else instance.get(cle)
+
+
+def _transformation(instance):
+    """Position, rotation et échelles (x, y, z) d'une instance"""
+    insertion = getattr(instance, 'insertion', None)
+    if insertion is not None:
+        return insertion, instance.rotation, instance.echelles
+    return _xyz(instance['position']), instance['rotation'], _xyz(instance['echelle'])
+
+
+def emprise_en_dict(boite):
+    """Boîte -> {'min': {'x', 'y', 'z'}, 'max': {...}} (format des sorties JSON)"""
+    return {
+        'min': {'x': boite[0], 'y': boite[1], 'z': boite[2]},
+        'max': {'x': boite[3], 'y': boite[4], 'z': boite[5]}
+    }
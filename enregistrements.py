@@ -0,0 +1,326 @@
+"""
+Enregistrements compacts des entités et des instances extraites
+Les entités des définitions et les instances sont les enregistrements les
+plus nombreux: ils sont gardés en mémoire dans des classes à __slots__
+(pas de dictionnaire par objet), les points dans des array('d') et les
+chaînes répétées (calques, types, noms de blocs) sont internées.
+Le schéma JSON des sorties n'est produit qu'à l'écriture (en_dict, en_json);
+la lecture par clé (instance['calque'], entite.get('tag')) reste possible.
+"""
+
+import sys
+from array import array
+
+
+def interner(valeur):
+    """Chaîne internée (une seule copie par valeur distincte)"""
+    return sys.intern(valeur) if type(valeur) is str else valeur
+
+
+def _point(valeurs):
+    return array('d', valeurs)
+
+
+def _xyz(point):
+    return {'x': point[0], 'y': point[1], 'z': point[2]}
+
+
+def _plat(valeur):
+    """Valeur d'un champ au format JSON"""
+    if isinstance(valeur, array):
+        return valeur.tolist()
+    if isinstance(valeur, Enregistrement):
+        return valeur.en_dict()
+    if isinstance(valeur, list):
+        return [_plat(v) for v in valeur]
+    return valeur
+
+
+def en_json(valeur):
+    """Fonction `default` de json.dump pour les enregistrements compacts"""
+    if isinstance(valeur, Enregistrement):
+        return valeur.en_dict()
+    if isinstance(valeur, array):
+        return valeur.tolist()
+    return str(valeur)
+
+
+class Enregistrement:
+    """Champs en __slots__, lus par clé comme un dictionnaire
+    CHAMPS: clés du schéma JSON, dans l'ordre; un champ non renseigné est absent
+    CALCULES: champs produits à la lecture (points en x/y/z, valeurs dérivées)"""
+
+    __slots__ = ()
+    CHAMPS = ()
+    CALCULES = {}
+
+    def __getitem__(self, cle):
+        calcul = self.CALCULES.get(cle)
+        try:
+            if calcul is not None:
+                return calcul(self)
+            if cle not in self.CHAMPS:
+                raise KeyError(cle)
+            return _plat(getattr(self, cle))
+        except AttributeError:
+            raise KeyError(cle)
+
+    def get(self, cle, defaut=None):
+        try:
+            return self[cle]
+        except KeyError:
+            return defaut
+
+    def __contains__(self, cle):
+        try:
+            self[cle]
+        except KeyError:
+            return False
+        return True
+
+    def keys(self):
+        return [cle for cle in self.CHAMPS if cle in self]
+
+    def items(self):
+        return [(cle, self[cle]) for cle in self.keys()]
+
+    def en_dict(self):
+        """Enregistrement au format du schéma JSON"""
+        donnees = {}
+        for cle in self.CHAMPS:
+            calcul = self.CALCULES.get(cle)
+            try:
+                donnees[cle] = calcul(self) if calcul is not None else _plat(getattr(self, cle))
+            except AttributeError:
+                pass
+        return donnees
+
+    def __eq__(self, autre):
+        if isinstance(autre, (Enregistrement, dict)):
+            return self.en_dict() == (autre.en_dict() if isinstance(autre, Enregistrement) else autre)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.en_dict()!r})"
+
+
+# Entités des définitions de blocs
+
+class Entite(Enregistrement):
+    """Entité d'une définition de bloc (type et calque)"""
+
+    __slots__ = ('type', 'calque')
+    CHAMPS = ('type', 'calque')
+    POINTS = ()
+
+    def __init__(self, type, calque):
+        self.type = interner(type)
+        self.calque = interner(calque)
+
+
+class Ligne(Entite):
+    __slots__ = ('debut', 'fin', 'longueur')
+    CHAMPS = Entite.CHAMPS + __slots__
+    POINTS = ('debut', 'fin')
+
+
+class Cercle(Entite):
+    __slots__ = ('centre', 'rayon')
+    CHAMPS = Entite.CHAMPS + __slots__
+    POINTS = ('centre',)
+
+
+class Arc(Entite):
+    __slots__ = ('centre', 'rayon', 'angle_debut', 'angle_fin')
+    CHAMPS = Entite.CHAMPS + __slots__
+    POINTS = ('centre',)
+
+
+class Texte(Entite):
+    __slots__ = ('texte', 'hauteur', 'insertion')
+    CHAMPS = Entite.CHAMPS + __slots__
+    POINTS = ('insertion',)
+
+
+class Polyligne(Entite):
+    """Sommets à plat (x, y pour AcDbPolyline, x, y, z sinon)"""
+    __slots__ = ('dimension', 'sommets', 'ferme', 'elevation')
+    CHAMPS = Entite.CHAMPS + __slots__
+    POINTS = ('sommets',)
+
+
+class Point(Entite):
+    __slots__ = ('position',)
+    CHAMPS = Entite.CHAMPS + __slots__
+    POINTS = ('position',)
+
+
+class Cote(Entite):
+    __slots__ = ('mesure', 'texte', 'position_texte', 'point_1', 'point_2')
+    CHAMPS = Entite.CHAMPS + __slots__
+    POINTS = ('position_texte', 'point_1', 'point_2')
+
+
+class Spline(Entite):
+    """Points de contrôle et d'ajustement à plat (x, y, z, ...)"""
+    __slots__ = ('degre', 'ferme', 'points_controle', 'points_ajustement')
+    CHAMPS = Entite.CHAMPS + __slots__
+    POINTS = ('points_controle', 'points_ajustement')
+
+
+class ReferenceImbriquee(Entite):
+    """Référence de bloc contenue dans une définition"""
+    __slots__ = ('nom_bloc', 'nom_effectif', 'insertion', 'rotation', 'echelle')
+    CHAMPS = Entite.CHAMPS + __slots__
+    POINTS = ('insertion', 'echelle')
+
+
+class Hachure(Entite):
+    __slots__ = ('motif', 'aire', 'nombre_boucles')
+    CHAMPS = Entite.CHAMPS + __slots__
+
+
+class DefinitionAttribut(Entite):
+    __slots__ = ('tag', 'prompt', 'valeur_defaut', 'constant', 'invisible', 'preset', 'verification')
+    CHAMPS = Entite.CHAMPS + __slots__
+
+
+# Classe de l'enregistrement par type d'entité (ObjectName)
+CLASSES_ENTITES = {
+    "AcDbAttributeDefinition": DefinitionAttribut,
+    "AcDbLine": Ligne,
+    "AcDbCircle": Cercle,
+    "AcDbArc": Arc,
+    "AcDbText": Texte,
+    "AcDbMText": Texte,
+    "AcDbPolyline": Polyligne,
+    "AcDb2dPolyline": Polyligne,
+    "AcDb3dPolyline": Polyligne,
+    "AcDbPoint": Point,
+    "AcDbSpline": Spline,
+    "AcDbHatch": Hachure,
+    "AcDbBlockReference": ReferenceImbriquee,
+}
+
+# Cotes: une même géométrie pour tous les types
+TYPES_COTES = (
+    "AcDbRotatedDimension",
+    "AcDbAlignedDimension",
+    "AcDb2LineAngularDimension",
+    "AcDb3PointAngularDimension",
+    "AcDbDiametricDimension",
+    "AcDbRadialDimension",
+    "AcDbRadialDimensionLarge",
+    "AcDbOrdinateDimension",
+    "AcDbArcDimension",
+)
+CLASSES_ENTITES.update((obj_type, Cote) for obj_type in TYPES_COTES)
+
+
+def nouvelle_entite(obj_type, calque):
+    """Enregistrement vide d'une entité de ce type"""
+    return CLASSES_ENTITES.get(obj_type, Entite)(obj_type, calque)
+
+
+def entite_depuis_dict(donnees):
+    """Entité relue d'une sortie JSON (le dictionnaire si son schéma est inconnu)"""
+    entite = nouvelle_entite(donnees.get('type'), donnees.get('calque'))
+    try:
+        for cle, valeur in donnees.items():
+            if cle not in ('type', 'calque'):
+                if cle in entite.POINTS and valeur is not None:
+                    valeur = _point(valeur)
+                setattr(entite, cle, valeur)
+    except (AttributeError, TypeError):
+        return donnees
+    return entite
+
+
+# Instances
+
+class AttributInstance(Enregistrement):
+    """Attribut d'une instance de bloc"""
+
+    __slots__ = ('tag', 'valeur', 'invisible', 'hauteur', 'insertion')
+    CHAMPS = ('tag', 'valeur', 'invisible', 'hauteur', 'position')
+    CALCULES = {'position': lambda a: _xyz(a.insertion)}
+
+    def __init__(self, tag, valeur, invisible, hauteur, insertion):
+        self.tag = interner(tag)
+        self.valeur = valeur
+        self.invisible = invisible
+        self.hauteur = hauteur
+        self.insertion = _point(insertion)
+
+
+class Instance(Enregistrement):
+    """Instance (référence) de bloc d'un espace objet ou papier"""
+
+    __slots__ = ('nom_bloc', 'espace', 'est_dynamique', 'insertion', 'rotation', 'echelles',
+                 'calque', 'couleur', 'type_ligne', 'epaisseur_ligne', 'visible', 'attributs',
+                 'handle', 'nom_effectif', 'emprise')
+    CHAMPS = ('nom_bloc', 'espace', 'est_dynamique', 'position', 'rotation', 'rotation_degres',
+              'echelle', 'calque', 'couleur', 'type_ligne', 'epaisseur_ligne', 'visible',
+              'attributs', 'handle', 'nombre_attributs', 'nom_effectif', 'emprise')
+    CALCULES = {
+        'position': lambda i: _xyz(i.insertion),
+        'rotation_degres': lambda i: i.rotation * 180 / 3.14159265359,
+        'echelle': lambda i: _xyz(i.echelles),
+        'nombre_attributs': lambda i: len(i.attributs),
+        # Boîte dans le repère du dessin: array('d') xmin, ymin, zmin, xmax, ymax, zmax
+        'emprise': lambda i: {'min': _xyz(i.emprise), 'max': _xyz(i.emprise[3:])},
+    }
+
+    def __init__(self, v, espace):
+        """v: champs lus par PLAN_INSTANCE"""
+        self.nom_bloc = interner(v['nom_bloc'])
+        self.espace = interner(espace)
+        self.est_dynamique = v['est_dynamique']
+        self.insertion = _point(v['insertion'][:3])
+        self.rotation = v['rotation']
+        self.echelles = _point((v['echelle_x'], v['echelle_y'], v['echelle_z']))
+        self.calque = interner(v['calque'])
+        self.couleur = v['couleur']
+        self.type_ligne = interner(v['type_ligne'])
+        self.epaisseur_ligne = v['epaisseur_ligne']
+        self.visible = v['visible']
+        self.attributs = []
+        self.handle = v['handle']
+
+    @classmethod
+    def depuis_dict(cls, donnees):
+        """Instance relue d'une sortie JSON"""
+        position, echelle = donnees['position'], donnees['echelle']
+        v = dict(donnees, insertion=(position['x'], position['y'], position['z']),
+                 echelle_x=echelle['x'], echelle_y=echelle['y'], echelle_z=echelle['z'])
+        instance = cls(v, donnees['espace'])
+        for a in donnees['attributs']:
+            p = a['position']
+            instance.attributs.append(AttributInstance(a['tag'], a['valeur'], a['invisible'], a['hauteur'],
+                                                       (p['x'], p['y'], p['z'])))
+        if 'nom_effectif' in donnees:
+            instance.nom_effectif = donnees['nom_effectif']
+        if donnees.get('emprise'):
+            mini, maxi = donnees['emprise']['min'], donnees['emprise']['max']
+            instance.emprise = _point((mini['x'], mini['y'], mini['z'], maxi['x'], maxi['y'], maxi['z']))
+        return instance
+
+
+def restaurer(categorie, donnees):
+    """Enregistrement compact d'un enregistrement relu au format JSON
+    (point de reprise, index incrémental)
+    Comme à l'extraction, les définitions d'attributs d'une définition de
+    bloc sont les mêmes objets dans 'attributs' et 'entites_contenues'"""
+    if categorie == 'instances_blocs':
+        return Instance.depuis_dict(donnees)
+    if categorie == 'definitions_blocs':
+        entites = [entite_depuis_dict(e) for e in donnees['entites_contenues']]
+        attributs = [e for e in entites if e['type'] == "AcDbAttributeDefinition"]
+        if len(attributs) != len(donnees['attributs']):
+            # Entités écrites à part (sortie en flux): attributs relus seuls
+            attributs = [entite_depuis_dict(a) for a in donnees['attributs']]
+        donnees['entites_contenues'] = entites
+        donnees['attributs'] = attributs
+    return donnees
@@ -0,0 +1,241 @@
+"""
+Export en colonnes typées des instances et de la géométrie des blocs
+Un dossier par export, un fichier .npy par colonne (lisible en mémoire
+projetée avec numpy.load(mmap_mode='r')):
+  instances/      nom_bloc, nom_effectif, calque, espace (codes), x, y, z, rotation,
+                  echelle_x, echelle_y, echelle_z, est_dynamique, handle,
+                  xmin, ymin, zmin, xmax, ymax, zmax (emprise, NaN si absente)
+  entites/        bloc, type, calque (codes)
+  lignes/         bloc, x1, y1, z1, x2, y2, z2, longueur
+  cercles/        bloc, cx, cy, cz, rayon
+  arcs/           bloc, cx, cy, cz, rayon, angle_debut, angle_fin
+  polylignes/     bloc, premier, nombre, ferme (sommets[premier:premier + nombre])
+  sommets/        x, y, z des polylignes, à la suite
+  points/         bloc, x, y, z
+  dictionnaires.json  valeurs des colonnes codées (noms de blocs, calques,
+                  espaces, types) et noms des définitions
+Nécessite: pip install numpy
+"""
+
+import json
+import os
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from empreintes import ResolveurCorps
+from sorties import lire_ndjson
+
+# Type numpy de chaque code de array
+TYPES_NUMPY = {'d': 'float64', 'i': 'int32', 'b': 'int8', 'q': 'int64', 'Q': 'uint64'}
+
+COLONNES = {
+    'instances': [
+        ('nom_bloc', 'i'), ('nom_effectif', 'i'), ('calque', 'i'), ('espace', 'i'),
+        ('x', 'd'), ('y', 'd'), ('z', 'd'), ('rotation', 'd'),
+        ('echelle_x', 'd'), ('echelle_y', 'd'), ('echelle_z', 'd'),
+        ('est_dynamique', 'b'), ('handle', 'Q'),
+        ('xmin', 'd'), ('ymin', 'd'), ('zmin', 'd'), ('xmax', 'd'), ('ymax', 'd'), ('zmax', 'd')
+    ],
+    'entites': [('bloc', 'i'), ('type', 'i'), ('calque', 'i')],
+    'lignes': [
+        ('bloc', 'i'), ('x1', 'd'), ('y1', 'd'), ('z1', 'd'),
+        ('x2', 'd'), ('y2', 'd'), ('z2', 'd'), ('longueur', 'd')
+    ],
+    'cercles': [('bloc', 'i'), ('cx', 'd'), ('cy', 'd'), ('cz', 'd'), ('rayon', 'd')],
+    'arcs': [
+        ('bloc', 'i'), ('cx', 'd'), ('cy', 'd'), ('cz', 'd'), ('rayon', 'd'),
+        ('angle_debut', 'd'), ('angle_fin', 'd')
+    ],
+    'polylignes': [('bloc', 'i'), ('premier', 'q'), ('nombre', 'i'), ('ferme', 'b')],
+    'sommets': [('x', 'd'), ('y', 'd'), ('z', 'd')],
+    'points': [('bloc', 'i'), ('x', 'd'), ('y', 'd'), ('z', 'd')],
+}
+
+SANS_EMPRISE = {'x': float('nan'), 'y': float('nan'), 'z': float('nan')}
+
+TYPES_POLYLIGNES = ("AcDbPolyline", "AcDb2dPolyline", "AcDb3dPolyline")
+
+
+def _verifier_numpy():
+    if np is None:
+        raise ImportError("numpy est nécessaire pour l'export en colonnes (pip install numpy)")
+
+
+class Dictionnaire:
+    """Encodage par dictionnaire: chaque valeur distincte reçoit un code entier"""
+
+    def __init__(self):
+        self.codes = {}
+        self.valeurs = []
+
+    def code(self, valeur):
+        if valeur is None:
+            return -1
+        code = self.codes.get(valeur)
+        if code is None:
+            code = self.codes[valeur] = len(self.valeurs)
+            self.valeurs.append(valeur)
+        return code
+
+
+def _handle(handle):
+    """Handle hexadécimal AutoCAD (64 bits non signés) -> entier (0 si absent)"""
+    try:
+        valeur = int(handle, 16)
+    except (TypeError, ValueError):
+        return 0
+    return valeur if valeur < 1 << 64 else 0
+
+
+class ConstructeurColonnes:
+    """Accumule les enregistrements dans des tableaux typés (array)"""
+
+    def __init__(self):
+        self.tables = {
+            table: {nom: array(code) for nom, code in colonnes}
+            for table, colonnes in COLONNES.items()
+        }
+        self.noms_blocs = Dictionnaire()
+        self.calques = Dictionnaire()
+        self.espaces = Dictionnaire()
+        self.types = Dictionnaire()
+        self.definitions = []
+
+    def _ajouter(self, table, **valeurs):
+        colonnes = self.tables[table]
+        for nom, valeur in valeurs.items():
+            colonnes[nom].append(valeur)
+
+    def ajouter_instance(self, instance):
+        position = instance['position']
+        echelle = instance['echelle']
+        emprise = instance.get('emprise')
+        mini, maxi = (emprise['min'], emprise['max']) if emprise else (SANS_EMPRISE, SANS_EMPRISE)
+        self._ajouter(
+            'instances',
+            nom_bloc=self.noms_blocs.code(instance['nom_bloc']),
+            nom_effectif=self.noms_blocs.code(instance.get('nom_effectif') or instance['nom_bloc']),
+            calque=self.calques.code(instance['calque']),
+            espace=self.espaces.code(instance['espace']),
+            x=position['x'], y=position['y'], z=position['z'],
+            rotation=instance['rotation'],
+            echelle_x=echelle['x'], echelle_y=echelle['y'], echelle_z=echelle['z'],
+            est_dynamique=1 if instance['est_dynamique'] else 0,
+            handle=_handle(instance.get('handle')),
+            xmin=mini['x'], ymin=mini['y'], zmin=mini['z'],
+            xmax=maxi['x'], ymax=maxi['y'], zmax=maxi['z']
+        )
+
+    def ajouter_definition(self, bloc_def):
+        bloc = len(self.definitions)
+        self.definitions.append(bloc_def['nom'])
+
+        for entite in bloc_def['entites_contenues']:
+            obj_type = entite['type']
+            self._ajouter('entites', bloc=bloc, type=self.types.code(obj_type),
+                          calque=self.calques.code(entite.get('calque')))
+
+            if obj_type == "AcDbLine" and 'debut' in entite:
+                debut, fin = entite['debut'], entite['fin']
+                self._ajouter('lignes', bloc=bloc,
+                              x1=debut[0], y1=debut[1], z1=debut[2],
+                              x2=fin[0], y2=fin[1], z2=fin[2],
+                              longueur=entite['longueur'])
+            elif obj_type == "AcDbCircle" and 'centre' in entite:
+                centre = entite['centre']
+                self._ajouter('cercles', bloc=bloc, cx=centre[0], cy=centre[1], cz=centre[2],
+                              rayon=entite['rayon'])
+            elif obj_type == "AcDbArc" and 'centre' in entite:
+                centre = entite['centre']
+                self._ajouter('arcs', bloc=bloc, cx=centre[0], cy=centre[1], cz=centre[2],
+                              rayon=entite['rayon'], angle_debut=entite['angle_debut'],
+                              angle_fin=entite['angle_fin'])
+            elif obj_type in TYPES_POLYLIGNES and 'sommets' in entite:
+                self.ajouter_polyligne(bloc, entite)
+            elif obj_type == "AcDbPoint" and 'position' in entite:
+                position = entite['position']
+                self._ajouter('points', bloc=bloc, x=position[0], y=position[1], z=position[2])
+
+    def ajouter_polyligne(self, bloc, entite):
+        """Sommets à la suite dans la table sommets, repérés par (premier, nombre)"""
+        sommets, dimension = entite['sommets'], entite['dimension']
+        colonnes = self.tables['sommets']
+        nombre = len(sommets) // dimension
+        self._ajouter('polylignes', bloc=bloc, premier=len(colonnes['x']), nombre=nombre,
+                      ferme=1 if entite.get('ferme') else 0)
+        colonnes['x'].extend(sommets[0::dimension])
+        colonnes['y'].extend(sommets[1::dimension])
+        if dimension == 3:
+            colonnes['z'].extend(sommets[2::dimension])
+        else:
+            colonnes['z'].extend([entite.get('elevation') or 0.0] * nombre)
+
+    def ajouter(self, categorie, enregistrement):
+        if categorie == 'instances_blocs':
+            self.ajouter_instance(enregistrement)
+        elif categorie == 'definitions_blocs':
+            self.ajouter_definition(enregistrement)
+
+    def ecrire(self, dossier):
+        """Écrit un fichier .npy par colonne et les dictionnaires"""
+        _verifier_numpy()
+        for table, colonnes in self.tables.items():
+            dossier_table = os.path.join(dossier, table)
+            os.makedirs(dossier_table, exist_ok=True)
+            for nom, valeurs in colonnes.items():
+                tableau = np.frombuffer(valeurs, dtype=TYPES_NUMPY[valeurs.typecode]) if valeurs \
+                    else np.empty(0, dtype=TYPES_NUMPY[valeurs.typecode])
+                np.save(os.path.join(dossier_table, f"{nom}.npy"), tableau)
+
+        with open(os.path.join(dossier, 'dictionnaires.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'nom_bloc': self.noms_blocs.valeurs,
+                'calque': self.calques.valeurs,
+                'espace': self.espaces.valeurs,
+                'type': self.types.valeurs,
+                'definitions': self.definitions
+            }, f, ensure_ascii=False, indent=2)
+        return dossier
+
+
+def exporter_colonnes(blocs_info, dossier):
+    """Exporte en colonnes les informations extraites en mémoire"""
+    constructeur = ConstructeurColonnes()
+    for bloc_def in blocs_info['definitions_blocs']:
+        constructeur.ajouter_definition(bloc_def)
+    for instance in blocs_info['instances_blocs']:
+        constructeur.ajouter_instance(instance)
+    return constructeur.ecrire(dossier)
+
+
+def exporter_colonnes_ndjson(chemin_ndjson, dossier):
+    """Exporte en colonnes une sortie NDJSON, lue ligne par ligne
+    (le corps des définitions en double est rétabli depuis la première)"""
+    constructeur = ConstructeurColonnes()
+    resolveur = ResolveurCorps()
+    for categorie, donnees in lire_ndjson(chemin_ndjson):
+        if categorie == 'definitions_blocs':
+            donnees = resolveur.resoudre(donnees)
+        constructeur.ajouter(categorie, donnees)
+    return constructeur.ecrire(dossier)
+
+
+def charger_colonnes(dossier, mmap=True):
+    """Charge un export en colonnes: ({table: {colonne: tableau}}, dictionnaires)
+    Avec mmap, les colonnes sont projetées en mémoire et non lues
+    (les colonnes absentes d'un export plus ancien sont ignorées)"""
+    _verifier_numpy()
+    tables = {}
+    for table, colonnes in COLONNES.items():
+        chemins = {nom: os.path.join(dossier, table, f"{nom}.npy") for nom, _ in colonnes}
+        tables[table] = {
+            nom: np.load(chemin, mmap_mode='r' if mmap else None)
+            for nom, chemin in chemins.items() if os.path.exists(chemin)
+        }
+    with open(os.path.join(dossier, 'dictionnaires.json'), encoding='utf-8') as f:
+        dictionnaires = json.load(f)
+    return tables, dictionnaires
@@ -0,0 +1,313 @@
+"""
+Extraction des blocs de plusieurs dessins en parallèle
+Usage: python ReadBlocDWG.py <fichiers|dossiers|motifs> [-j N] [-o dossier] [--ndjson] [--colonnes] [--profile]
+                              [--xrefs [dossier_cache]]
+Chaque processus de travail garde sa propre session (une instance AutoCAD
+pour les DWG); les fichiers DXF sont lus sans AutoCAD et le débit croît
+avec le nombre de cœurs.
+Avec --xrefs, les dessins référencés sont extraits une fois par contenu
+dans un cache partagé par tous les processus (défaut: <sortie>/xrefs).
+Écrit les sorties de chaque fichier et un résumé fusionné (resume_lot.json)
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from multiprocessing.util import Finalize
+
+from backends import BackendAutoCAD, BackendDXF
+from export_colonnes import exporter_colonnes_ndjson
+from instrumentation import Instrumentation
+from profils import PROFILS
+from rapport_blocs import FORMATS, rapports_sortie
+from xrefs import CacheXrefs
+
+EXTENSIONS = ('.dwg', '.dxf')
+
+# Session du processus de travail (une par processus)
+_session = None
+# Cache des xrefs du processus de travail, par dossier de cache
+_caches_xrefs = {}
+
+
+def lister_fichiers(sources, recursif=False):
+    """Développe fichiers, dossiers et motifs glob en une liste de dessins"""
+    fichiers = []
+    for source in sources:
+        if os.path.isdir(source):
+            motif = os.path.join(source, '**', '*') if recursif else os.path.join(source, '*')
+            candidats = glob.glob(motif, recursive=recursif)
+        elif glob.has_magic(source):
+            candidats = glob.glob(source, recursive=True)
+        else:
+            candidats = [source]
+        fichiers.extend(sorted(c for c in candidats if c.lower().endswith(EXTENSIONS)))
+
+    # Sans doublons, dans l'ordre
+    return list(dict.fromkeys(os.path.abspath(f) for f in fichiers))
+
+
+def noms_de_sortie(fichiers):
+    """Nom de base unique par fichier (deux dessins de même nom dans des dossiers différents)"""
+    noms = {}
+    vus = {}
+    for chemin in fichiers:
+        nom = os.path.splitext(os.path.basename(chemin))[0]
+        vus[nom] = vus.get(nom, 0) + 1
+        noms[chemin] = nom if vus[nom] == 1 else f"{nom}_{vus[nom]}"
+    return noms
+
+
+def _initialiser_travailleur():
+    """Prépare la session COM du processus de travail"""
+    global _session
+    try:
+        import pythoncom
+        pythoncom.CoInitialize()
+    except ImportError:
+        pass
+    # Une instance AutoCAD propre au processus, démarrée au premier DWG
+    # et gardée ouverte pour les suivants; quittée à la fin du processus
+    _session = BackendAutoCAD(nouvelle_instance=True)
+    Finalize(_session, _session.terminer, exitpriority=10)
+
+
+def _terminer_travailleur():
+    global _session
+    if _session is not None:
+        _session.terminer()
+        _session = None
+
+
+def _backend_pour(chemin):
+    if chemin.lower().endswith('.dxf'):
+        return BackendDXF()
+    if _session is None:
+        _initialiser_travailleur()
+    return _session
+
+
+def _cache_xrefs(options):
+    """Cache des xrefs du processus: le dossier est partagé par tout le lot,
+    les empreintes et résumés déjà lus restent en mémoire d'un dessin à l'autre"""
+    if not options.get('xrefs'):
+        return None
+    cle = (options['xrefs'], tuple(options.get('dossiers_xrefs') or ()))
+    if cle not in _caches_xrefs:
+        _caches_xrefs[cle] = CacheXrefs(*cle)
+    return _caches_xrefs[cle]
+
+
+def extraire_fichier(chemin, nom_base, dossier_sortie, options):
+    """Extrait un dessin et écrit ses sorties; retourne le résumé du fichier"""
+    from ReadBlocDWG import ExtracteurBlocs
+
+    resume = {'chemin': chemin, 'statut': 'echec', 'erreur': None, 'sorties': {}}
+    debut = time.perf_counter()
+    extracteur = None
+    base = os.path.join(dossier_sortie, nom_base)
+    try:
+        instrumentation = Instrumentation(options.get('cprofile', False)) if options.get('profile') else None
+        extracteur = ExtracteurBlocs(chemin, backend=_backend_pour(chemin), delais=options.get('delais'),
+                                     filtre_references=options.get('filtre_references'),
+                                     profil=options.get('profil'), instrumentation=instrumentation,
+                                     xrefs=_cache_xrefs(options))
+
+        with open(os.devnull, 'w', encoding='utf-8') as muet, contextlib.redirect_stdout(muet):
+            if options.get('ndjson'):
+                resume['sorties']['ndjson'] = f"{base}_blocs.ndjson"
+                ok = extracteur.extraire_tout(sortie_ndjson=resume['sorties']['ndjson'])
+            else:
+                ok = extracteur.extraire_tout()
+
+            if not ok:
+                raise RuntimeError(extracteur.erreur or "extraction du dessin impossible")
+
+            if options.get('ndjson'):
+                if options.get('colonnes'):
+                    resume['sorties']['colonnes'] = exporter_colonnes_ndjson(
+                        resume['sorties']['ndjson'], f"{base}_colonnes")
+                if options.get('rapport', True):
+                    # Rapports relus en flux depuis la sortie NDJSON
+                    resume['sorties']['rapport'] = rapports_sortie(
+                        resume['sorties']['ndjson'], options.get('formats_rapport', ('txt',)))[0]
+            else:
+                resume['sorties']['json'] = extracteur.sauvegarder_json(f"{base}_blocs.json")
+                if options.get('rapport', True):
+                    resume['sorties']['rapport'] = extracteur.sauvegarder_rapport(
+                        f"{base}_rapport_blocs.txt", options.get('formats_rapport', ('txt',)))
+                if options.get('colonnes'):
+                    resume['sorties']['colonnes'] = extracteur.sauvegarder_colonnes(f"{base}_colonnes")
+
+        resume['statut'] = 'ok'
+        resume['statistiques'] = extracteur.blocs_info['statistiques']
+        if 'xrefs' in extracteur.blocs_info:
+            resume['xrefs'] = extracteur.blocs_info['xrefs']
+    except Exception as e:
+        resume['erreur'] = f"{type(e).__name__}: {e}"
+
+    if extracteur is not None and 'surveillance' in extracteur.blocs_info:
+        resume['surveillance'] = extracteur.blocs_info['surveillance']
+
+    # Mesures écrites même après un échec: elles aident à le comprendre
+    if extracteur is not None and extracteur.instrumentation is not None:
+        with open(os.devnull, 'w', encoding='utf-8') as muet, contextlib.redirect_stdout(muet):
+            resume['sorties']['metriques'] = extracteur.sauvegarder_metriques(f"{base}_metriques.json")
+
+    resume['duree_s'] = round(time.perf_counter() - debut, 3)
+    return resume
+
+
+def fusionner(resumes, duree_mur):
+    """Résumé fusionné du lot"""
+    reussis = [r for r in resumes if r['statut'] == 'ok']
+    utilisation = {}
+    totaux = {'definitions': 0, 'instances': 0, 'instances_dynamiques': 0}
+    for r in reussis:
+        stats = r['statistiques']
+        totaux['definitions'] += stats['definitions']['total']
+        totaux['instances'] += stats['instances']['total']
+        totaux['instances_dynamiques'] += stats['instances']['dynamiques']
+        for bloc in stats['top_10_blocs_utilises']:
+            utilisation[bloc['nom']] = utilisation.get(bloc['nom'], 0) + bloc['nombre']
+
+    top_blocs = sorted(utilisation.items(), key=lambda x: x[1], reverse=True)[:10]
+    resume_lot = {
+        'date': datetime.now().isoformat(),
+        'totaux': {
+            'fichiers': len(resumes),
+            'reussis': len(reussis),
+            'echecs': len(resumes) - len(reussis),
+            'duree_mur_s': round(duree_mur, 3),
+            'duree_cumulee_s': round(sum(r['duree_s'] for r in resumes), 3),
+            **totaux
+        },
+        # Cumul des top 10 de chaque fichier (approximation du top 10 global)
+        'top_10_blocs_utilises': [{'nom': nom, 'nombre': n} for nom, n in top_blocs],
+        'fichiers': resumes
+    }
+
+    xrefs = [xref for r in reussis for xref in r.get('xrefs', ())]
+    if any('xrefs' in r for r in reussis):
+        resolues = [xref for xref in xrefs if xref['statut'] == 'resolue']
+        resume_lot['totaux']['xrefs'] = {
+            'references': len(xrefs),
+            'resolues': len(resolues),
+            'depuis_cache': sum(xref['depuis_cache'] for xref in resolues),
+            'dessins_distincts': len({xref['empreinte'] for xref in resolues}),
+            'non_resolues': len(xrefs) - len(resolues)
+        }
+    return resume_lot
+
+
+def extraire_lot(fichiers, dossier_sortie, processus=None, options=None):
+    """Extrait tous les fichiers sur un pool de processus et écrit resume_lot.json"""
+    options = options or {}
+    os.makedirs(dossier_sortie, exist_ok=True)
+    noms = noms_de_sortie(fichiers)
+    processus = processus or os.cpu_count() or 1
+
+    debut = time.perf_counter()
+    resumes = []
+
+    def afficher(resume):
+        symbole = "✓" if resume['statut'] == 'ok' else "❌"
+        detail = resume['erreur'] or f"{resume['statistiques']['instances']['total']} instances"
+        print(f"  {symbole} [{len(resumes)}/{len(fichiers)}] {os.path.basename(resume['chemin'])} "
+              f"({resume['duree_s']:.2f} s) - {detail}")
+
+    if processus == 1:
+        try:
+            for chemin in fichiers:
+                resumes.append(extraire_fichier(chemin, noms[chemin], dossier_sortie, options))
+                afficher(resumes[-1])
+        finally:
+            _terminer_travailleur()
+    else:
+        with ProcessPoolExecutor(max_workers=processus, initializer=_initialiser_travailleur) as pool:
+            taches = [pool.submit(extraire_fichier, chemin, noms[chemin], dossier_sortie, options)
+                      for chemin in fichiers]
+            for tache in as_completed(taches):
+                resumes.append(tache.result())
+                afficher(resumes[-1])
+
+    # Ordre des fichiers d'entrée dans le résumé
+    ordre = {chemin: i for i, chemin in enumerate(fichiers)}
+    resumes.sort(key=lambda r: ordre[r['chemin']])
+
+    resume_lot = fusionner(resumes, time.perf_counter() - debut)
+    chemin_resume = os.path.join(dossier_sortie, 'resume_lot.json')
+    with open(chemin_resume, 'w', encoding='utf-8') as f:
+        json.dump(resume_lot, f, indent=2, ensure_ascii=False, default=str)
+    resume_lot['fichier_resume'] = chemin_resume
+    return resume_lot
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extraction des blocs de plusieurs dessins (DWG/DXF)")
+    parser.add_argument('sources', nargs='+', help="fichiers, dossiers ou motifs glob")
+    parser.add_argument('-o', '--sortie', default='sorties_blocs', help="dossier des sorties")
+    parser.add_argument('-j', '--processus', type=int, default=None,
+                        help="nombre de processus (défaut: nombre de cœurs)")
+    parser.add_argument('-r', '--recursif', action='store_true', help="parcourir les sous-dossiers")
+    parser.add_argument('--ndjson', action='store_true', help="sortie NDJSON en flux")
+    parser.add_argument('--colonnes', action='store_true', help="export en colonnes .npy")
+    parser.add_argument('--sans-rapport', action='store_true', help="ne pas écrire les rapports")
+    parser.add_argument('--rapports', nargs='+', choices=FORMATS, default=['txt'], help="formats des rapports")
+    parser.add_argument('--profile', action='store_true',
+                        help="mesurer phases, appels COM et exceptions ignorées (<dessin>_metriques.json)")
+    parser.add_argument('--cprofile', action='store_true',
+                        help="avec --profile, écrire aussi le profil cProfile (<dessin>_profil.prof)")
+    parser.add_argument('--delai-appel', type=float, help="délai max d'un appel COM (s)")
+    parser.add_argument('--delai-document', type=float, help="délai max d'extraction d'un dessin (s)")
+    parser.add_argument('--calques', nargs='+', help="ne relever que les références de ces calques")
+    parser.add_argument('--noms', nargs='+', help="ne relever que les références de ces blocs")
+    parser.add_argument('--profil', choices=sorted(PROFILS), default='complet',
+                        help="définitions développées et géométries relevées")
+    parser.add_argument('--xrefs', nargs='?', const='', default=None, metavar='DOSSIER',
+                        help="extraire les dessins référencés (xrefs), une fois par contenu, "
+                             "dans ce cache partagé (défaut: <sortie>/xrefs)")
+    parser.add_argument('--chemins-xrefs', nargs='+', default=[], metavar='DOSSIER',
+                        help="dossiers où chercher les fichiers des xrefs")
+    args = parser.parse_args(argv)
+
+    fichiers = lister_fichiers(args.sources, args.recursif)
+    if not fichiers:
+        print("❌ Aucun fichier DWG/DXF trouvé")
+        return 1
+
+    processus = args.processus or min(len(fichiers), os.cpu_count() or 1)
+    print(f"🗂️  {len(fichiers)} dessins à extraire sur {processus} processus\n")
+    options = {'ndjson': args.ndjson, 'colonnes': args.colonnes, 'rapport': not args.sans_rapport,
+               'formats_rapport': tuple(args.rapports), 'profil': args.profil,
+               'profile': args.profile or args.cprofile, 'cprofile': args.cprofile}
+    if args.delai_appel is not None or args.delai_document is not None:
+        delais = {}
+        if args.delai_appel is not None:
+            delais['appel'] = args.delai_appel
+        if args.delai_document is not None:
+            delais['phases'] = {'extraction': args.delai_document}
+        options['delais'] = delais
+    if args.calques or args.noms:
+        options['filtre_references'] = {'calques': args.calques, 'noms': args.noms}
+    if args.xrefs is not None:
+        options['xrefs'] = os.path.abspath(args.xrefs or os.path.join(args.sortie, 'xrefs'))
+        options['dossiers_xrefs'] = [os.path.abspath(d) for d in args.chemins_xrefs]
+    resume = extraire_lot(fichiers, args.sortie, processus, options)
+
+    totaux = resume['totaux']
+    print(f"\n✅ {totaux['reussis']}/{totaux['fichiers']} dessins extraits en {totaux['duree_mur_s']:.2f} s "
+          f"(cumul {totaux['duree_cumulee_s']:.2f} s)")
+    if 'xrefs' in totaux:
+        xrefs = totaux['xrefs']
+        print(f"🔗 {xrefs['resolues']}/{xrefs['references']} xrefs résolues: {xrefs['dessins_distincts']} "
+              f"dessins distincts, {xrefs['depuis_cache']} reprises du cache")
+    if totaux['echecs']:
+        print(f"❌ {totaux['echecs']} échecs, voir {resume['fichier_resume']}")
+    print(f"📄 Résumé du lot: {os.path.abspath(resume['fichier_resume'])}")
+    return 0 if totaux['echecs'] == 0 else 2
@@ -0,0 +1,76 @@
+"""
+Hiérarchie des blocs imbriqués
+Chaque définition référence d'autres blocs (références imbriquées, par nom
+effectif): le graphe bloc -> blocs référencés est un graphe orienté sans
+cycle (DAG). Les comptes aplatis d'une définition (tous les blocs qu'elle
+contient, à toute profondeur, multipliés par leurs occurrences) sont
+calculés une fois par définition et mémorisés.
+"""
+
+
+class HierarchieBlocs:
+    """Graphe des références imbriquées: {bloc: {bloc référencé: nombre}}"""
+
+    def __init__(self, references=None):
+        self.references = references if references is not None else {}
+        self._aplatis = {}
+        self._profondeurs = {}
+
+    def ajouter_definition(self, nom, references):
+        """Références imbriquées d'une définition: {nom effectif: nombre}"""
+        self.references[nom] = dict(references)
+        self._aplatis.clear()
+        self._profondeurs.clear()
+
+    def enfants(self, nom):
+        return self.references.get(nom, {})
+
+    def aplatir(self, nom):
+        """Blocs contenus dans la définition, à toute profondeur: {nom: nombre}
+        (un bloc qui se référence lui-même, dessin corrompu, n'est pas suivi)"""
+        return self._aplatir(nom, set())
+
+    def _aplatir(self, nom, en_cours):
+        aplati = self._aplatis.get(nom)
+        if aplati is not None:
+            return aplati
+
+        en_cours.add(nom)
+        aplati = {}
+        for enfant, nombre in self.enfants(nom).items():
+            if enfant in en_cours:
+                continue
+            aplati[enfant] = aplati.get(enfant, 0) + nombre
+            for descendant, n in self._aplatir(enfant, en_cours).items():
+                aplati[descendant] = aplati.get(descendant, 0) + nombre * n
+        en_cours.discard(nom)
+
+        self._aplatis[nom] = aplati
+        return aplati
+
+    def feuilles(self, nom):
+        """Blocs sans référence imbriquée contenus dans la définition"""
+        return {bloc: nombre for bloc, nombre in self.aplatir(nom).items() if not self.enfants(bloc)}
+
+    def profondeur(self, nom):
+        """Nombre de niveaux d'imbrication sous la définition"""
+        return self._profondeur(nom, set())
+
+    def _profondeur(self, nom, en_cours):
+        profondeur = self._profondeurs.get(nom)
+        if profondeur is None:
+            en_cours.add(nom)
+            profondeur = max((self._profondeur(enfant, en_cours) + 1
+                              for enfant in self.enfants(nom) if enfant not in en_cours), default=0)
+            en_cours.discard(nom)
+            self._profondeurs[nom] = profondeur
+        return profondeur
+
+    def utilisation_effective(self, instances):
+        """Utilisation de chaque bloc en comptant les blocs imbriqués
+        instances: {nom effectif: nombre d'instances dans les espaces}"""
+        utilisation = dict(instances)
+        for nom, nombre in instances.items():
+            for descendant, n in self.aplatir(nom).items():
+                utilisation[descendant] = utilisation.get(descendant, 0) + nombre * n
+        return utilisation
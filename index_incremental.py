@@ -0,0 +1,431 @@
+"""
+Index local (SQLite) pour la ré-extraction incrémentale d'un dessin
+Chaque enregistrement est indexé (handle des instances, nom des
+définitions) avec:
+  - un jeton de modification: empreinte de quelques marqueurs lus à peu de
+    frais
+      instance: nom, insertion, rotation, échelles, calque et valeurs des
+      attributs (une propriété dynamique modifiée donne à la référence un
+      nouveau bloc anonyme *U, donc un autre nom)
+      définition: nombre d'entités, origine, chemin d'une xref, handles de
+      la première et de la dernière entité (l'éditeur de blocs recrée les
+      entités, donc de nouveaux handles)
+  - l'enregistrement extrait (JSON) et son empreinte de contenu
+À la ré-extraction, seuls les enregistrements dont le jeton a changé sont
+relus en entier et sérialisés. Un fichier inchangé n'est pas rouvert.
+Un bloc dont la lecture échoue en partie (erreur COM passagère) n'efface
+rien: seuls sont supprimés les enregistrements des espaces et de la table
+des blocs parcourus sans erreur; une définition incomplète garde son
+enregistrement, et le fichier sera relu à l'exécution suivante.
+Les références sont parcourues comme par l'extraction complète (jeu de
+sélection avec selection_serveur, filtre des références).
+Un dessin est indexé par chemin et par réglages (filtre des références,
+profil, valeurs autorisées, complet): d'autres réglages ne réutilisent pas
+ses enregistrements, le fichier est relu en entier.
+Ces jetons ne voient pas une couleur, un type ou une épaisseur de ligne
+changés, ni une entité de définition modifiée sur place: complet=True lit
+les jetons complets (toutes les propriétés de l'instance et ses valeurs
+dynamiques) et relit toutes les définitions.
+COM n'offre pas de marqueur de modification par entité: le jeton d'une
+instance coûte encore une douzaine d'appels (contre une quarantaine pour
+l'extraire). Sur le modèle simulé (3000 instances, 9000 autres entités,
+50 définitions), une ré-extraction après 1 % de modifications fait 49 %
+des appels COM d'une extraction complète (parcours des autres entités
+compris), 30 % avec selection_serveur, 63 % avec complet=True.
+Les définitions des présentations (*Model_Space, *Paper_Space) ne sont
+pas indexées: leurs entités sont celles des espaces.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+
+from acces_com import PlanProprietes
+from enregistrements import en_json, restaurer
+from parcours import ParcoursEntites, ContexteParcours, espace_du_bloc
+from profils import empreinte_reglages
+from selection import source_references
+
+CATEGORIES = ('definitions_blocs', 'instances_blocs', 'blocs_dynamiques')
+
+# Propriétés lues pour le jeton de modification d'une instance
+PLAN_JETON = PlanProprietes(
+    obligatoires=[
+        ('nom_bloc', 'Name'),
+        ('insertion', 'InsertionPoint'),
+        ('rotation', 'Rotation'),
+        ('echelle_x', 'XScaleFactor'),
+        ('echelle_y', 'YScaleFactor'),
+        ('echelle_z', 'ZScaleFactor'),
+        ('calque', 'Layer')
+    ]
+)
+
+# Jeton complet: propriétés d'affichage en plus, et valeurs dynamiques
+PLAN_JETON_COMPLET = PlanProprietes(
+    obligatoires=PLAN_JETON.obligatoires,
+    optionnels=[
+        ('est_dynamique', 'IsDynamicBlock'),
+        ('couleur', 'Color'),
+        ('type_ligne', 'Linetype'),
+        ('epaisseur_ligne', 'Lineweight'),
+        ('visible', 'Visible')
+    ]
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dessins (
+    dessin TEXT PRIMARY KEY,
+    empreinte_fichier TEXT,
+    date TEXT,
+    reglages TEXT
+);
+CREATE TABLE IF NOT EXISTS enregistrements (
+    dessin TEXT NOT NULL,
+    categorie TEXT NOT NULL,
+    cle TEXT NOT NULL,
+    ordre INTEGER,
+    jeton TEXT,
+    empreinte TEXT,
+    donnees TEXT,
+    PRIMARY KEY (dessin, categorie, cle)
+);
+"""
+
+
+def _empreinte(texte):
+    return hashlib.blake2b(texte.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def empreinte_fichier(chemin, taille_bloc=1 << 20):
+    """Empreinte du contenu d'un fichier"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(chemin, 'rb') as f:
+        for bloc in iter(lambda: f.read(taille_bloc), b''):
+            h.update(bloc)
+    return h.hexdigest()
+
+
+def _serialiser(enregistrement):
+    return json.dumps(enregistrement, ensure_ascii=False, sort_keys=True, default=en_json)
+
+
+def jeton_instance(acces, entity, complet=False, ignorer=None):
+    """Jeton de modification d'une référence de bloc
+    ignorer(site, erreur): exception ignorée (voir ExtracteurBlocs._ignorer)"""
+    obj_type = "AcDbBlockReference"
+    plan = PLAN_JETON_COMPLET if complet else PLAN_JETON
+    v = acces.lire_plan(entity, obj_type, plan)
+    valeurs = [v[champ] for champ, _ in plan.obligatoires + plan.optionnels]
+    try:
+        for attr in acces.appeler(entity, obj_type, 'GetAttributes'):
+            valeurs.append(acces.lire(attr, "AcDbAttribute", 'TextString'))
+    except Exception as e:
+        if ignorer is not None:
+            ignorer('incremental.jeton_attributs', e)
+    if complet and v['est_dynamique']:
+        try:
+            for prop in acces.appeler(entity, obj_type, 'GetDynamicBlockProperties'):
+                valeurs.append(acces.lire(prop, "AcadDynamicBlockReferenceProperty", 'Value'))
+        except Exception as e:
+            if ignorer is not None:
+                ignorer('incremental.jeton_dynamique', e)
+    return _empreinte(repr(valeurs))
+
+
+def jeton_definition(acces, bloc):
+    """Jeton de modification d'une définition de bloc"""
+    obj_type = "AcDbBlockTableRecord"
+    nombre = acces.lire_obligatoire(bloc, obj_type, 'Count')
+    valeurs = [nombre, acces.lire(bloc, obj_type, 'Origin')]
+    if acces.lire(bloc, obj_type, 'IsXRef', False):
+        valeurs.append(acces.lire(bloc, obj_type, 'Path'))
+    for j in {0, nombre - 1} if nombre else ():
+        entite = bloc.Item(j)
+        valeurs.append(acces.lire(entite, acces.type_objet(entite), 'Handle'))
+    return _empreinte(repr(valeurs))
+
+
+def reglages_extraction(extracteur, complet=False):
+    """Réglages dont dépendent les enregistrements extraits"""
+    filtre = extracteur.filtre
+    return {
+        'calques': sorted(filtre.calques) if filtre is not None and filtre.calques else None,
+        'noms': sorted(filtre.noms) if filtre is not None and filtre.noms else None,
+        'profil': extracteur.profil,
+        'valeurs_autorisees': extracteur.valeurs_autorisees,
+        'complet': complet,
+    }
+
+
+def cle_dessin(chemin, reglages):
+    """Clé d'un dessin dans l'index: chemin et empreinte des réglages"""
+    return f"{chemin}|{empreinte_reglages(reglages)}"
+
+
+def _resume_vide():
+    resume = {categorie: {'ajoutes': [], 'modifies': [], 'supprimes': [], 'inchanges': 0}
+              for categorie in CATEGORIES}
+    # Blocs parcourus incomplètement (None: bloc dont le nom n'a pu être lu)
+    resume['blocs_incomplets'] = []
+    return resume
+
+
+class IndexIncremental:
+    """Index SQLite des enregistrements extraits, par dessin"""
+
+    def __init__(self, chemin_index):
+        self.chemin_index = chemin_index
+        self.connexion = sqlite3.connect(chemin_index)
+        self.connexion.executescript(SCHEMA)
+        # Index créé avant l'indexation par réglages
+        colonnes = {ligne[1] for ligne in self.connexion.execute("PRAGMA table_info(dessins)")}
+        if 'reglages' not in colonnes:
+            with self.connexion:
+                self.connexion.execute("ALTER TABLE dessins ADD COLUMN reglages TEXT")
+
+    def empreinte_enregistree(self, dessin):
+        ligne = self.connexion.execute(
+            "SELECT empreinte_fichier FROM dessins WHERE dessin = ?", (dessin,)).fetchone()
+        return ligne[0] if ligne else None
+
+    def jetons(self, dessin, categorie):
+        """{cle: (jeton, empreinte)} des enregistrements indexés"""
+        return {cle: (jeton, empreinte) for cle, jeton, empreinte in self.connexion.execute(
+            "SELECT cle, jeton, empreinte FROM enregistrements WHERE dessin = ? AND categorie = ?",
+            (dessin, categorie))}
+
+    def enregistrement(self, dessin, categorie, cle):
+        """Enregistrement indexé (None s'il est absent)"""
+        ligne = self.connexion.execute(
+            "SELECT donnees FROM enregistrements WHERE dessin = ? AND categorie = ? AND cle = ?",
+            (dessin, categorie, cle)).fetchone()
+        return json.loads(ligne[0]) if ligne else None
+
+    def enregistrements(self, dessin, categorie):
+        """Enregistrements indexés, dans l'ordre du dessin"""
+        for (donnees,) in self.connexion.execute(
+                "SELECT donnees FROM enregistrements WHERE dessin = ? AND categorie = ? ORDER BY ordre",
+                (dessin, categorie)):
+            yield json.loads(donnees)
+
+    def mettre_a_jour(self, dessin, empreinte_fichier, ecritures, ordres, suppressions, reglages=None):
+        """Applique une ré-extraction en une transaction
+        - reglages: réglages de l'extraction (voir reglages_extraction)
+        - ecritures: (categorie, cle, ordre, jeton, empreinte, donnees) ajoutés ou modifiés
+        - ordres: (ordre, categorie, cle) des enregistrements inchangés
+        - suppressions: (categorie, cle)"""
+        with self.connexion:
+            self.connexion.executemany(
+                "INSERT OR REPLACE INTO enregistrements VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((dessin, *ligne) for ligne in ecritures))
+            self.connexion.executemany(
+                "UPDATE enregistrements SET ordre = ? WHERE dessin = ? AND categorie = ? AND cle = ?",
+                ((ordre, dessin, categorie, cle) for ordre, categorie, cle in ordres))
+            self.connexion.executemany(
+                "DELETE FROM enregistrements WHERE dessin = ? AND categorie = ? AND cle = ?",
+                ((dessin, categorie, cle) for categorie, cle in suppressions))
+            self.connexion.execute(
+                "INSERT OR REPLACE INTO dessins (dessin, empreinte_fichier, date, reglages) "
+                "VALUES (?, ?, datetime('now'), ?)",
+                (dessin, empreinte_fichier, _serialiser(reglages)))
+
+    def fermer(self):
+        self.connexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+
+class ExtractionIncrementale:
+    """Ré-extraction d'un dessin ouvert par un ExtracteurBlocs,
+    limitée aux enregistrements ajoutés, modifiés ou supprimés"""
+
+    def __init__(self, extracteur, index, dessin, complet=False):
+        self.extracteur = extracteur
+        self.index = index
+        self.complet = complet
+        self.reglages = reglages_extraction(extracteur, complet)
+        # Clé du dessin dans l'index (chemin et réglages)
+        self.dessin = cle_dessin(dessin, self.reglages)
+        self.resume = _resume_vide()
+        self._ecritures = []
+        self._ordres = []
+        self._vus = {categorie: set() for categorie in CATEGORIES}
+        self._ordre = 0
+        self._anciens = None
+        # Espaces parcourus sans erreur, table des blocs lue sans erreur
+        self._espaces_complets = set()
+        self._table_complete = True
+
+    def _garder(self, categorie, cle):
+        """Enregistrement inchangé: seul son rang dans le dessin est mis à jour"""
+        self._ordre += 1
+        self._vus[categorie].add(cle)
+        self._ordres.append((self._ordre, categorie, cle))
+        self.resume[categorie]['inchanges'] += 1
+
+    def _ecrire(self, categorie, cle, jeton, enregistrement, anciens):
+        """Enregistrement relu: sérialisé et comparé à l'index par empreinte
+        (même contenu sous un autre jeton: inchangé, le jeton est mis à jour)"""
+        donnees = _serialiser(enregistrement)
+        empreinte = _empreinte(donnees)
+        ancien = anciens[categorie].get(cle)
+        if ancien is not None and ancien[1] == empreinte:
+            if ancien[0] == jeton:
+                self._garder(categorie, cle)
+                return
+            self.resume[categorie]['inchanges'] += 1
+        else:
+            self.resume[categorie]['ajoutes' if ancien is None else 'modifies'].append(cle)
+        self._ordre += 1
+        self._vus[categorie].add(cle)
+        self._ecritures.append((categorie, cle, self._ordre, jeton, empreinte, donnees))
+
+    def _incomplet(self, nom):
+        """Bloc parcouru incomplètement: rien n'en est supprimé, une
+        définition garde son enregistrement indexé"""
+        self.resume['blocs_incomplets'].append(nom)
+        if nom is None:
+            self._table_complete = False
+        elif nom in self._anciens['definitions_blocs'] and nom not in self._vus['definitions_blocs']:
+            self._garder('definitions_blocs', nom)
+
+    def _supprimable(self, categorie, cle):
+        """Enregistrement absent d'un parcours complet de son bloc"""
+        if categorie == 'definitions_blocs':
+            return self._table_complete
+        if self._espaces_complets >= {'ModelSpace', 'PaperSpace'}:
+            return True
+        donnees = self.index.enregistrement(self.dessin, categorie, cle)
+        return donnees is not None and donnees.get('espace') in self._espaces_complets
+
+    def _definition(self, parcours, ctx, anciens):
+        """Définition relue seulement si son jeton a changé"""
+        extracteur = self.extracteur
+        jeton = None if self.complet else jeton_definition(extracteur.acces, ctx.bloc)
+        ancien = anciens['definitions_blocs'].get(ctx.nom)
+        if jeton is not None and ancien is not None and ancien[0] == jeton:
+            self._garder('definitions_blocs', ctx.nom)
+            return
+        definitions = extracteur.blocs_info['definitions_blocs']
+        nombre = len(definitions)
+        extracteur._parcourir_definition(parcours, ctx)
+        if ctx.erreurs:
+            self._incomplet(ctx.nom)
+            return
+        for bloc_def in definitions[nombre:]:
+            self._ecrire('definitions_blocs', bloc_def['nom'], jeton, bloc_def, anciens)
+
+    def executer(self, empreinte):
+        extracteur = self.extracteur
+        acces = extracteur.acces
+        anciens = {categorie: self.index.jetons(self.dessin, categorie) for categorie in CATEGORIES}
+        self._anciens = anciens
+
+        # Définitions des blocs (hors présentations): relues si leur jeton a changé
+        parcours_definitions = extracteur._creer_parcours(definitions=True)
+
+        # Instances des espaces: relues en entier seulement si leur jeton a changé
+        def visiter_reference(entity, obj_type, ctx):
+            if extracteur.filtre is not None and not extracteur.filtre.retenir(acces, entity, ctx.selection):
+                return
+            handle = acces.lire(entity, obj_type, 'Handle')
+            cle = handle or f"~{ctx.espace}:{self._ordre}"
+            jeton = jeton_instance(acces, entity, self.complet, extracteur._ignorer)
+
+            ancien = anciens['instances_blocs'].get(cle)
+            if ancien is not None and ancien[0] == jeton:
+                self._garder('instances_blocs', cle)
+                if cle in anciens['blocs_dynamiques']:
+                    self._garder('blocs_dynamiques', cle)
+                return
+
+            # Lecture échouée (erreur déjà comptée par l'extracteur): espace incomplet
+            instance = extracteur._extraire_info_instance(entity, ctx.espace)
+            if not instance:
+                ctx.erreurs += 1
+                return
+            self._ecrire('instances_blocs', cle, jeton, instance, anciens)
+            if instance['est_dynamique']:
+                bloc_dyn = extracteur._extraire_info_bloc_dynamique(entity, ctx.espace, instance)
+                if bloc_dyn:
+                    self._ecrire('blocs_dynamiques', cle, jeton, bloc_dyn, anciens)
+                else:
+                    ctx.erreurs += 1
+
+        parcours_references = ParcoursEntites(acces)
+        parcours_references.enregistrer(visiter_reference, "AcDbBlockReference")
+
+        blocs = extracteur.doc.Blocks
+        for index in range(blocs.Count):
+            nom = None
+            try:
+                bloc = blocs.Item(index)
+                nom = acces.lire_obligatoire(bloc, "AcDbBlockTableRecord", 'Name')
+                if acces.lire_obligatoire(bloc, "AcDbBlockTableRecord", 'IsLayout'):
+                    espace = espace_du_bloc(nom)
+                    if espace is not None:
+                        with source_references(extracteur.doc, espace, extracteur.filtre,
+                                               extracteur.selection_serveur) as (source, par_selection):
+                            ctx = ContexteParcours(source, index, nom, espace)
+                            ctx.selection = par_selection
+                            parcours_references.parcourir_bloc(ctx)
+                        if ctx.erreurs:
+                            self._incomplet(nom)
+                        else:
+                            self._espaces_complets.add(espace)
+                else:
+                    self._definition(parcours_definitions, ContexteParcours(bloc, index, nom), anciens)
+            except Exception as e:
+                extracteur._ignorer('incremental.bloc', e)
+                self._incomplet(nom)
+
+        suppressions = []
+        for categorie in CATEGORIES:
+            for cle in anciens[categorie].keys() - self._vus[categorie]:
+                if self._supprimable(categorie, cle):
+                    suppressions.append((categorie, cle))
+                    self.resume[categorie]['supprimes'].append(cle)
+
+        # Parcours incomplet: l'empreinte du fichier n'est pas enregistrée,
+        # l'exécution suivante le relira
+        if self.resume['blocs_incomplets']:
+            empreinte = None
+        self.index.mettre_a_jour(self.dessin, empreinte, self._ecritures, self._ordres, suppressions,
+                                 self.reglages)
+        return self.resume
+
+
+def extraire_incremental(extracteur, chemin_index, complet=False):
+    """Met à jour l'index du dessin de l'extracteur et recharge blocs_info
+    depuis l'index; retourne le résumé des changements
+    complet: jetons complets et définitions toutes relues"""
+    debut = time.perf_counter()
+    chemin = extracteur.chemin_dwg
+    dessin = cle_dessin(chemin, reglages_extraction(extracteur, complet))
+    with IndexIncremental(chemin_index) as index:
+        empreinte = empreinte_fichier(chemin)
+        if index.empreinte_enregistree(dessin) == empreinte:
+            # Fichier inchangé, mêmes réglages: rien à relire
+            resume = _resume_vide()
+            for categorie in CATEGORIES:
+                resume[categorie]['inchanges'] = len(index.jetons(dessin, categorie))
+        else:
+            if not extracteur.ouvrir_fichier():
+                return None
+            try:
+                resume = ExtractionIncrementale(extracteur, index, chemin, complet).executer(empreinte)
+            finally:
+                extracteur.fermer_fichier()
+
+        for categorie in CATEGORIES:
+            extracteur.blocs_info[categorie] = [restaurer(categorie, donnees)
+                                                for donnees in index.enregistrements(dessin, categorie)]
+
+    resume['duree_s'] = round(time.perf_counter() - debut, 3)
+    return resume
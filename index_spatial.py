@@ -0,0 +1,272 @@
+"""
+Index spatial des instances de blocs extraites (grille uniforme)
+Chaque instance est rangée dans les cellules couvertes par son emprise
+(voir emprises), ou par son point d'insertion si elle n'en a pas; une
+emprise de plus de GRANDE_EMPRISE cellules (cadre, cartouche) est gardée
+à part et examinée par chaque requête.
+Requêtes, dans le plan XY d'un espace (ModelSpace par défaut):
+  fenetre(xmin, ymin, xmax, ymax)   instances dont l'emprise touche la fenêtre
+  dans_polygone(polygone)           instances dont le point d'insertion (ou
+                                    toute l'emprise) est dans le polygone
+  plus_proches(x, y, k)             k instances les plus proches du point
+Un index se construit depuis les instances en mémoire, une sortie
+*_blocs.json / NDJSON ou un export en colonnes (charger_index).
+"""
+
+import heapq
+import math
+import os
+
+from sorties import lire_sortie
+
+# Nombre de cellules au-delà duquel une emprise n'est pas rangée dans la grille
+GRANDE_EMPRISE = 64
+
+
+def _point_dans_polygone(x, y, polygone):
+    """Test pair-impair (polygone: [(x, y), ...], fermé implicitement)"""
+    dedans = False
+    x1, y1 = polygone[-1]
+    for x2, y2 in polygone:
+        if (y1 > y) != (y2 > y) and x < (x2 - x1) * (y - y1) / (y2 - y1) + x1:
+            dedans = not dedans
+        x1, y1 = x2, y2
+    return dedans
+
+
+def _distance_boite(x, y, boite):
+    """Distance du point à la boîte (0 si le point est dedans)"""
+    dx = max(boite[0] - x, 0.0, x - boite[2])
+    dy = max(boite[1] - y, 0.0, y - boite[3])
+    return math.hypot(dx, dy)
+
+
+class IndexSpatial:
+    """Grille uniforme: {(i, j): [identifiants]}, plus la liste des grandes
+    emprises (identifiants hors grille)
+    boites: (xmin, ymin, xmax, ymax) par identifiant, positions: (x, y)
+    element(identifiant): enregistrement renvoyé par les requêtes"""
+
+    def __init__(self, boites, positions, element=None, taille_cellule=None):
+        self.boites = boites
+        self.positions = positions
+        self.element = element if element is not None else (lambda identifiant: identifiant)
+        self.taille = taille_cellule or self._taille_cellule()
+        self.cellules = {}
+        self.grandes = []
+        for identifiant, boite in enumerate(boites):
+            i0, j0, i1, j1 = self._cellules_fenetre(*boite)
+            if (i1 - i0 + 1) * (j1 - j0 + 1) > GRANDE_EMPRISE:
+                self.grandes.append(identifiant)
+                continue
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    self.cellules.setdefault((i, j), []).append(identifiant)
+        if self.cellules:
+            self._limites = (min(i for i, _ in self.cellules), min(j for _, j in self.cellules),
+                             max(i for i, _ in self.cellules), max(j for _, j in self.cellules))
+
+    def __len__(self):
+        return len(self.boites)
+
+    def _taille_cellule(self):
+        """Environ une instance par cellule, et pas moins que l'emprise médiane
+        La densité est mesurée entre le 1er et le 99e centile des centres: une
+        instance isolée loin du dessin ne grossit pas les cellules"""
+        if not self.boites:
+            return 1.0
+        n = len(self.boites)
+        xs = sorted((b[0] + b[2]) / 2 for b in self.boites)
+        ys = sorted((b[1] + b[3]) / 2 for b in self.boites)
+        bas, haut = n // 100, n - 1 - n // 100
+        densite = math.sqrt((xs[haut] - xs[bas]) * (ys[haut] - ys[bas]) / (haut - bas + 1))
+        dimensions = sorted(max(b[2] - b[0], b[3] - b[1]) for b in self.boites)
+        taille = max(densite, dimensions[n // 2])
+        return taille if taille > 0 else max(xs[-1] - xs[0], ys[-1] - ys[0], dimensions[-1], 1.0)
+
+    def _cellules_fenetre(self, xmin, ymin, xmax, ymax):
+        t = self.taille
+        return math.floor(xmin / t), math.floor(ymin / t), math.floor(xmax / t), math.floor(ymax / t)
+
+    def _candidats(self, xmin, ymin, xmax, ymax):
+        """Identifiants rangés dans les cellules touchées par la fenêtre,
+        plus les grandes emprises"""
+        candidats = set(self.grandes)
+        if not self.cellules:
+            return candidats
+        i0, j0, i1, j1 = self._cellules_fenetre(xmin, ymin, xmax, ymax)
+        li0, lj0, li1, lj1 = self._limites
+        for i in range(max(i0, li0), min(i1, li1) + 1):
+            for j in range(max(j0, lj0), min(j1, lj1) + 1):
+                cellule = self.cellules.get((i, j))
+                if cellule:
+                    candidats.update(cellule)
+        return candidats
+
+    def _retenus(self, identifiants, filtre):
+        elements = [self.element(identifiant) for identifiant in sorted(identifiants)]
+        return elements if filtre is None else [e for e in elements if filtre(e)]
+
+    def fenetre(self, xmin, ymin, xmax, ymax, entierement=False, filtre=None):
+        """Instances dont l'emprise touche la fenêtre (entierement: est dans la fenêtre)"""
+        trouves = []
+        for identifiant in self._candidats(xmin, ymin, xmax, ymax):
+            b = self.boites[identifiant]
+            if entierement:
+                if xmin <= b[0] and b[2] <= xmax and ymin <= b[1] and b[3] <= ymax:
+                    trouves.append(identifiant)
+            elif b[0] <= xmax and xmin <= b[2] and b[1] <= ymax and ymin <= b[3]:
+                trouves.append(identifiant)
+        return self._retenus(trouves, filtre)
+
+    def dans_polygone(self, polygone, entierement=False, filtre=None):
+        """Instances dont le point d'insertion est dans le polygone
+        (entierement: les quatre coins de l'emprise)"""
+        polygone = [tuple(p[:2]) for p in polygone]
+        xs = [p[0] for p in polygone]
+        ys = [p[1] for p in polygone]
+        trouves = []
+        for identifiant in self._candidats(min(xs), min(ys), max(xs), max(ys)):
+            if entierement:
+                b = self.boites[identifiant]
+                coins = ((b[0], b[1]), (b[2], b[1]), (b[2], b[3]), (b[0], b[3]))
+                if all(_point_dans_polygone(x, y, polygone) for x, y in coins):
+                    trouves.append(identifiant)
+            elif _point_dans_polygone(*self.positions[identifiant], polygone):
+                trouves.append(identifiant)
+        return self._retenus(trouves, filtre)
+
+    def plus_proches(self, x, y, k=1, filtre=None):
+        """k instances les plus proches du point (distance à l'emprise),
+        de la plus proche à la plus lointaine: [(distance, instance), ...]"""
+        if not self.boites or k <= 0:
+            return []
+        meilleurs = []  # tas (-distance, identifiant) des k plus proches
+        vus = set()
+
+        def examiner(identifiant):
+            if identifiant in vus:
+                return
+            vus.add(identifiant)
+            if filtre is not None and not filtre(self.element(identifiant)):
+                return
+            distance = _distance_boite(x, y, self.boites[identifiant])
+            if len(meilleurs) < k:
+                heapq.heappush(meilleurs, (-distance, identifiant))
+            elif distance < -meilleurs[0][0]:
+                heapq.heapreplace(meilleurs, (-distance, identifiant))
+
+        for identifiant in self.grandes:
+            examiner(identifiant)
+
+        if self.cellules:
+            t = self.taille
+            ci, cj = math.floor(x / t), math.floor(y / t)
+            li0, lj0, li1, lj1 = self._limites
+            # Anneaux de cellules autour du point, limités à la grille
+            rayon_min = max(li0 - ci, ci - li1, lj0 - cj, cj - lj1, 0)
+            rayon_max = max(ci - li0, li1 - ci, cj - lj0, lj1 - cj, 0)
+            for rayon in range(rayon_min, rayon_max + 1):
+                if (2 * rayon + 1) ** 2 > len(self.cellules):
+                    # Plus de cellules parcourues que de cellules occupées (instances
+                    # isolées loin des autres): cellules occupées restantes, par anneau
+                    self._cellules_eloignees(ci, cj, rayon, k, meilleurs, examiner)
+                    break
+                for i in range(max(ci - rayon, li0), min(ci + rayon, li1) + 1):
+                    if i in (ci - rayon, ci + rayon):
+                        colonnes = range(max(cj - rayon, lj0), min(cj + rayon, lj1) + 1)
+                    else:
+                        colonnes = (cj - rayon, cj + rayon)
+                    for j in colonnes:
+                        for identifiant in self.cellules.get((i, j), ()):
+                            examiner(identifiant)
+                # Les cellules au-delà de l'anneau sont à plus de rayon * taille du point
+                if len(meilleurs) == k and -meilleurs[0][0] <= rayon * t:
+                    break
+
+        return [(-d, self.element(identifiant)) for d, identifiant in sorted(meilleurs, reverse=True)]
+
+    def _cellules_eloignees(self, ci, cj, rayon_min, k, meilleurs, examiner):
+        """Suite de plus_proches: cellules occupées à partir de l'anneau rayon_min"""
+        restantes = []
+        for i, j in self.cellules:
+            rayon = max(abs(i - ci), abs(j - cj))
+            if rayon >= rayon_min:
+                restantes.append((rayon, i, j))
+        restantes.sort()
+        for rayon, i, j in restantes:
+            # Une cellule de l'anneau rayon est à plus de (rayon - 1) * taille du point
+            if len(meilleurs) == k and -meilleurs[0][0] <= (rayon - 1) * self.taille:
+                break
+            for identifiant in self.cellules[(i, j)]:
+                examiner(identifiant)
+
+    @classmethod
+    def depuis_instances(cls, instances, espace='ModelSpace', taille_cellule=None):
+        """Index des instances d'un espace (None: tous les espaces)"""
+        retenues, boites, positions = [], [], []
+        for instance in instances:
+            if espace is not None and instance['espace'] != espace:
+                continue
+            position = instance['position']
+            x, y = position['x'], position['y']
+            emprise = instance.get('emprise')
+            if emprise:
+                boites.append((emprise['min']['x'], emprise['min']['y'], emprise['max']['x'], emprise['max']['y']))
+            else:
+                boites.append((x, y, x, y))
+            positions.append((x, y))
+            retenues.append(instance)
+        return cls(boites, positions, retenues.__getitem__, taille_cellule)
+
+    @classmethod
+    def depuis_colonnes(cls, tables, dictionnaires, espace='ModelSpace', taille_cellule=None):
+        """Index d'un export en colonnes (voir export_colonnes.charger_colonnes)
+        Les requêtes renvoient {'ligne', 'nom_bloc', 'calque', 'espace', 'position', 'handle'}"""
+        colonnes = tables['instances']
+        codes_espaces = colonnes['espace'].tolist()
+        x, y, z = colonnes['x'].tolist(), colonnes['y'].tolist(), colonnes['z'].tolist()
+        if 'xmin' in colonnes:
+            emprises = list(zip(colonnes['xmin'].tolist(), colonnes['ymin'].tolist(),
+                                colonnes['xmax'].tolist(), colonnes['ymax'].tolist()))
+        else:
+            emprises = [(math.nan,) * 4] * len(x)
+
+        code_espace = dictionnaires['espace'].index(espace) if espace in dictionnaires['espace'] else -2
+        lignes, boites, positions = [], [], []
+        for ligne, code in enumerate(codes_espaces):
+            if espace is not None and code != code_espace:
+                continue
+            emprise = emprises[ligne]
+            # Colonnes d'emprise à NaN: instance sans emprise
+            boites.append(emprise if emprise[0] == emprise[0] else (x[ligne], y[ligne], x[ligne], y[ligne]))
+            positions.append((x[ligne], y[ligne]))
+            lignes.append(ligne)
+
+        noms, calques, espaces = dictionnaires['nom_bloc'], dictionnaires['calque'], dictionnaires['espace']
+
+        def element(identifiant):
+            ligne = lignes[identifiant]
+            handle = int(colonnes['handle'][ligne])
+            return {
+                'ligne': ligne,
+                'nom_bloc': noms[colonnes['nom_bloc'][ligne]],
+                'calque': calques[colonnes['calque'][ligne]] if colonnes['calque'][ligne] >= 0 else None,
+                'espace': espaces[codes_espaces[ligne]],
+                'position': {'x': x[ligne], 'y': y[ligne], 'z': z[ligne]},
+                'handle': format(handle, 'X') if handle else None
+            }
+
+        return cls(boites, positions, element, taille_cellule)
+
+
+def charger_index(chemin, espace='ModelSpace', taille_cellule=None):
+    """Index spatial d'une sortie sauvegardée: *_blocs.json, *.ndjson
+    ou dossier d'export en colonnes"""
+    if os.path.isdir(chemin):
+        from export_colonnes import charger_colonnes
+        tables, dictionnaires = charger_colonnes(chemin)
+        return IndexSpatial.depuis_colonnes(tables, dictionnaires, espace, taille_cellule)
+
+    instances = (donnees for categorie, donnees in lire_sortie(chemin) if categorie == 'instances_blocs')
+    return IndexSpatial.depuis_instances(instances, espace, taille_cellule)
@@ -0,0 +1,136 @@
+"""
+Instrumentation de l'extraction (option --profile)
+- durée de chaque phase (ouvrir_fichier, extraire_*, calculer_*, sauvegarder_*)
+  et nombre d'appels COM faits pendant la phase
+- appels COM: nombre, durée et histogramme des latences par propriété et
+  par type d'objet (ObjectName); avec le backend DXF, les lectures d'attributs
+- exceptions ignorées, comptées par site et par type
+- profil cProfile facultatif de l'extraction (fichier .prof, pstats/snakeviz)
+Les métriques sont écrites en JSON à côté des sorties (sauvegarder).
+Sans instrumentation (None), les sites instrumentés ne font qu'un test.
+"""
+
+import bisect
+import contextlib
+import cProfile
+import functools
+import json
+import time
+
+# Bornes supérieures des classes de latence (µs)
+BORNES_US = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 100000, 1000000)
+
+
+def _classe(indice):
+    return f"≤{BORNES_US[indice]}" if indice < len(BORNES_US) else f">{BORNES_US[-1]}"
+
+
+class Instrumentation:
+    """Mesures d'une extraction"""
+
+    def __init__(self, profilage=False):
+        self.phases = {}
+        # {(type, propriété): [nombre, durée, [effectif par classe de latence]]}
+        self.appels = {}
+        self.total_appels = 0
+        self.exceptions = {}
+        self.profileur = cProfile.Profile() if profilage else None
+
+    def appel(self, cle_type, nom, duree):
+        """Appel COM (ou lecture d'attribut) de durée en secondes"""
+        self.total_appels += 1
+        mesure = self.appels.get((cle_type, nom))
+        if mesure is None:
+            mesure = self.appels[(cle_type, nom)] = [0, 0.0, [0] * (len(BORNES_US) + 1)]
+        mesure[0] += 1
+        mesure[1] += duree
+        mesure[2][bisect.bisect_left(BORNES_US, duree * 1e6)] += 1
+
+    def exception(self, site, erreur):
+        """Exception ignorée au site nommé"""
+        par_type = self.exceptions.setdefault(site, {})
+        nom = type(erreur).__name__
+        par_type[nom] = par_type.get(nom, 0) + 1
+
+    @contextlib.contextmanager
+    def phase(self, nom):
+        """Durée et appels COM d'une phase (les phases imbriquées sont comptées chacune)"""
+        debut, appels = time.perf_counter(), self.total_appels
+        try:
+            yield
+        finally:
+            mesure = self.phases.setdefault(nom, {'appels': 0, 'duree_s': 0.0, 'appels_com': 0})
+            mesure['appels'] += 1
+            mesure['duree_s'] += time.perf_counter() - debut
+            mesure['appels_com'] += self.total_appels - appels
+
+    @contextlib.contextmanager
+    def profil(self):
+        """Profil cProfile du bloc (sans effet si le profilage n'est pas demandé)"""
+        if self.profileur is None:
+            yield
+            return
+        self.profileur.enable()
+        try:
+            yield
+        finally:
+            self.profileur.disable()
+
+    @staticmethod
+    def _resume(mesures):
+        nombre = sum(m[0] for m in mesures)
+        duree = sum(m[1] for m in mesures)
+        classes = [sum(effectifs) for effectifs in zip(*(m[2] for m in mesures))]
+        return {
+            'nombre': nombre,
+            'duree_s': round(duree, 6),
+            'moyenne_us': round(duree / nombre * 1e6, 3) if nombre else 0.0,
+            'histogramme_us': {_classe(i): n for i, n in enumerate(classes) if n}
+        }
+
+    def _regrouper(self, indice):
+        groupes = {}
+        for cle, mesure in self.appels.items():
+            groupes.setdefault(cle[indice], []).append(mesure)
+        resumes = {nom: self._resume(mesures) for nom, mesures in groupes.items()}
+        return dict(sorted(resumes.items(), key=lambda x: x[1]['duree_s'], reverse=True))
+
+    def metriques(self):
+        """Métriques au format JSON"""
+        return {
+            'phases': {nom: dict(m, duree_s=round(m['duree_s'], 6)) for nom, m in self.phases.items()},
+            'appels_com': {
+                'total': self.total_appels,
+                'duree_s': round(sum(m[1] for m in self.appels.values()), 6),
+                'par_type': self._regrouper(0),
+                'par_propriete': self._regrouper(1)
+            },
+            'exceptions_ignorees': {
+                site: dict(sorted(par_type.items(), key=lambda x: x[1], reverse=True))
+                for site, par_type in sorted(self.exceptions.items())
+            }
+        }
+
+    def sauvegarder(self, fichier_metriques, fichier_profil=None):
+        """Écrit les métriques (JSON) et, si demandé, le profil cProfile;
+        renvoie les fichiers écrits"""
+        metriques = self.metriques()
+        fichiers = [fichier_metriques]
+        if self.profileur is not None and fichier_profil:
+            self.profileur.dump_stats(fichier_profil)
+            metriques['profil_cprofile'] = fichier_profil
+            fichiers.append(fichier_profil)
+        with open(fichier_metriques, 'w', encoding='utf-8') as f:
+            json.dump(metriques, f, indent=2, ensure_ascii=False)
+        return fichiers
+
+
+def mesurer_phase(methode):
+    """Décorateur: la méthode est une phase de self.instrumentation"""
+    @functools.wraps(methode)
+    def mesuree(self, *args, **kwargs):
+        if self.instrumentation is None:
+            return methode(self, *args, **kwargs)
+        with self.instrumentation.phase(methode.__name__):
+            return methode(self, *args, **kwargs)
+    return mesuree
@@ -0,0 +1,508 @@
+"""
+Lecteur DXF en pur Python (sans AutoCAD)
+Lit un fichier DXF ASCII en un seul passage et expose un modèle objet qui
+imite l'interface COM d'AutoCAD utilisée par ExtracteurBlocs
+(Blocks, ModelSpace, PaperSpace, ObjectName, InsertionPoint, ...)
+Les tags sont lus en flux, mais toutes les entités du dessin (blocs et
+section ENTITIES) restent en mémoire le temps de l'extraction: la mémoire
+croît avec la taille du fichier.
+"""
+
+import math
+import os
+
+# Correspondance type DXF -> ObjectName AutoCAD
+OBJECT_NAMES = {
+    'LINE': 'AcDbLine',
+    'CIRCLE': 'AcDbCircle',
+    'ARC': 'AcDbArc',
+    'ELLIPSE': 'AcDbEllipse',
+    'TEXT': 'AcDbText',
+    'MTEXT': 'AcDbMText',
+    'INSERT': 'AcDbBlockReference',
+    'ATTDEF': 'AcDbAttributeDefinition',
+    'ATTRIB': 'AcDbAttribute',
+    'LWPOLYLINE': 'AcDbPolyline',
+    'POINT': 'AcDbPoint',
+    'SPLINE': 'AcDbSpline',
+    'HATCH': 'AcDbHatch',
+    'SOLID': 'AcDbSolid',
+    'TRACE': 'AcDbTrace',
+    '3DFACE': 'AcDbFace',
+    'LEADER': 'AcDbLeader',
+    'MULTILEADER': 'AcDbMLeader',
+    'MLEADER': 'AcDbMLeader',
+    'VIEWPORT': 'AcDbViewport',
+    'XLINE': 'AcDbXline',
+    'RAY': 'AcDbRay',
+    'WIPEOUT': 'AcDbWipeout',
+    'IMAGE': 'AcDbRasterImage',
+    'REGION': 'AcDbRegion',
+    '3DSOLID': 'AcDb3dSolid',
+    'ACAD_TABLE': 'AcDbTable',
+}
+
+# POLYLINE selon ses drapeaux (code 70): maillages, sinon 3D (bit 8) ou 2D
+def _object_name_polyligne(drapeaux):
+    if drapeaux & 64:
+        return 'AcDbPolyFaceMesh'
+    if drapeaux & 16:
+        return 'AcDbPolygonMesh'
+    return 'AcDb3dPolyline' if drapeaux & 8 else 'AcDb2dPolyline'
+
+
+# Type de cote DXF (code 70 & 7) -> ObjectName AutoCAD
+OBJECT_NAMES_COTES = {
+    0: 'AcDbRotatedDimension',
+    1: 'AcDbAlignedDimension',
+    2: 'AcDb2LineAngularDimension',
+    3: 'AcDbDiametricDimension',
+    4: 'AcDbRadialDimension',
+    5: 'AcDb3PointAngularDimension',
+    6: 'AcDbOrdinateDimension',
+}
+
+# Noms des blocs de présentation dans les DXF R12
+NOMS_LAYOUTS_R12 = {
+    '$MODEL_SPACE': '*Model_Space',
+    '$PAPER_SPACE': '*Paper_Space',
+}
+
+XDATA_BLOC_DYNAMIQUE = 'AcDbDynamicBlockGUID'
+XDATA_REPRESENTATION_DYNAMIQUE = 'AcDbBlockRepBTag'
+
+
+def _decoder(ligne):
+    """Décode une ligne DXF (UTF-8 depuis R2007, ANSI avant)"""
+    try:
+        return ligne.decode('utf-8')
+    except UnicodeDecodeError:
+        return ligne.decode('cp1252', errors='replace')
+
+
+def lire_tags(chemin_dxf):
+    """Lit en flux les paires (code de groupe, valeur) d'un fichier DXF ASCII"""
+    with open(chemin_dxf, 'rb') as f:
+        if f.read(18) == b'AutoCAD Binary DXF':
+            raise ValueError(f"DXF binaire non supporté: {chemin_dxf}")
+        f.seek(0)
+
+        lignes = iter(f)
+        for ligne_code in lignes:
+            ligne_code = ligne_code.strip()
+            if not ligne_code:
+                # Lignes vides laissées en fin de fichier par certains logiciels
+                continue
+            ligne_valeur = next(lignes, None)
+            if ligne_valeur is None:
+                break
+            code, valeur = int(ligne_code), _decoder(ligne_valeur).rstrip('\r\n')
+            if code == 0 and valeur.strip() == 'EOF':
+                return
+            yield code, valeur
+
+
+def lire_enregistrements(tags):
+    """Regroupe les tags en enregistrements commençant chacun par un code 0"""
+    type_courant = None
+    tags_courants = []
+    for code, valeur in tags:
+        if code == 0:
+            if type_courant is not None:
+                yield type_courant, tags_courants
+            type_courant = valeur.strip()
+            tags_courants = []
+        else:
+            tags_courants.append((code, valeur))
+    if type_courant is not None:
+        yield type_courant, tags_courants
+
+
+def _premiers(tags):
+    """Première valeur de chaque code de groupe, hors objet incorporé (code 101)"""
+    valeurs = {}
+    for code, valeur in tags:
+        if code == 101:
+            break
+        if code not in valeurs:
+            valeurs[code] = valeur
+    return valeurs
+
+
+def _xdata(tags):
+    """Regroupe les données étendues par application (code 1001)"""
+    applications = {}
+    courante = None
+    for code, valeur in tags:
+        if code == 1001:
+            courante = applications.setdefault(valeur.strip(), [])
+        elif courante is not None and code >= 1000:
+            courante.append((code, valeur.strip()))
+    return applications
+
+
+def _reel(valeurs, code, defaut=0.0):
+    try:
+        return float(valeurs[code])
+    except (KeyError, ValueError):
+        return defaut
+
+
+def _entier(valeurs, code, defaut=0):
+    try:
+        return int(valeurs[code])
+    except (KeyError, ValueError):
+        return defaut
+
+
+def _point(valeurs, code):
+    return (_reel(valeurs, code), _reel(valeurs, code + 10), _reel(valeurs, code + 20))
+
+
+def _coordonnees(tags, code, dimension=3):
+    """Coordonnées à plat (x, y[, z], x, y[, z], ...) des points répétés d'un
+    code de groupe (code, code + 10, code + 20), comme la propriété Coordinates"""
+    codes = (code, code + 10, code + 20)[:dimension]
+    coordonnees = []
+    for c, valeur in tags:
+        if c == 101:
+            break
+        if c in codes:
+            if c == code:
+                coordonnees.extend([0.0] * dimension)
+            if coordonnees:
+                try:
+                    coordonnees[len(coordonnees) - dimension + codes.index(c)] = float(valeur)
+                except ValueError:
+                    pass
+    return tuple(coordonnees)
+
+
+class EntiteDXF:
+    """Entité DXF présentée avec les noms de propriétés COM d'AutoCAD"""
+
+    def __init__(self, type_dxf, object_name, valeurs):
+        self.type_dxf = type_dxf
+        self.ObjectName = object_name
+        self.Layer = valeurs.get(8, '0').strip()
+        self.Color = _entier(valeurs, 62, 256)
+        self.Linetype = valeurs.get(6, 'ByLayer').strip()
+        self.Lineweight = _entier(valeurs, 370, -1)
+        self.Visible = _entier(valeurs, 60) != 1
+        if 5 in valeurs:
+            self.Handle = valeurs[5].strip()
+        self.espace_papier = _entier(valeurs, 67) == 1
+
+
+class ReferenceBlocDXF(EntiteDXF):
+    """Insertion de bloc (INSERT) avec ses attributs (ATTRIB)"""
+
+    def __init__(self, type_dxf, object_name, valeurs, document):
+        super().__init__(type_dxf, object_name, valeurs)
+        self._document = document
+        self._attributs = []
+        self.Name = valeurs.get(2, '').strip()
+        self.InsertionPoint = _point(valeurs, 10)
+        self.XScaleFactor = _reel(valeurs, 41, 1.0)
+        self.YScaleFactor = _reel(valeurs, 42, 1.0)
+        self.ZScaleFactor = _reel(valeurs, 43, 1.0)
+        self.Rotation = math.radians(_reel(valeurs, 50))
+
+    @property
+    def IsDynamicBlock(self):
+        return self._document._nom_dynamique(self.Name) is not None
+
+    @property
+    def EffectiveName(self):
+        return self._document._nom_dynamique(self.Name) or self.Name
+
+    def GetAttributes(self):
+        return tuple(self._attributs)
+
+    def GetDynamicBlockProperties(self):
+        # Les paramètres dynamiques sont stockés dans la section OBJECTS
+        # sous une forme non documentée: non lus par ce lecteur
+        return ()
+
+
+def construire_entite(type_dxf, tags, document):
+    """Construit l'entité correspondant à un enregistrement DXF"""
+    valeurs = _premiers(tags)
+
+    if type_dxf == 'DIMENSION':
+        object_name = OBJECT_NAMES_COTES.get(_entier(valeurs, 70) & 7, 'AcDbDimension')
+    elif type_dxf == 'POLYLINE':
+        # Les DXF R12 n'ont pas de marqueur de sous-classe (code 100)
+        object_name = _object_name_polyligne(_entier(valeurs, 70))
+    else:
+        object_name = OBJECT_NAMES.get(type_dxf)
+    if object_name is None:
+        # Type inconnu: dernier marqueur de sous-classe, sinon nom déduit
+        marqueurs = [v.strip() for c, v in tags if c == 100 and v.strip() != 'AcDbEntity']
+        object_name = marqueurs[-1] if marqueurs else 'AcDb' + type_dxf.capitalize()
+
+    if type_dxf == 'INSERT':
+        return ReferenceBlocDXF(type_dxf, object_name, valeurs, document)
+
+    entite = EntiteDXF(type_dxf, object_name, valeurs)
+
+    if type_dxf == 'LINE':
+        entite.StartPoint = _point(valeurs, 10)
+        entite.EndPoint = _point(valeurs, 11)
+        entite.Length = math.dist(entite.StartPoint, entite.EndPoint)
+
+    elif type_dxf in ('CIRCLE', 'ARC'):
+        entite.Center = _point(valeurs, 10)
+        entite.Radius = _reel(valeurs, 40)
+        if type_dxf == 'ARC':
+            entite.StartAngle = math.radians(_reel(valeurs, 50))
+            entite.EndAngle = math.radians(_reel(valeurs, 51))
+
+    elif type_dxf == 'TEXT':
+        entite.TextString = valeurs.get(1, '')
+        entite.Height = _reel(valeurs, 40)
+        entite.InsertionPoint = _point(valeurs, 10)
+
+    elif type_dxf == 'MTEXT':
+        # Le texte long est découpé en morceaux de code 3 suivis du code 1
+        morceaux = [v for c, v in tags if c == 3]
+        entite.TextString = ''.join(morceaux) + valeurs.get(1, '')
+        entite.Height = _reel(valeurs, 40)
+        entite.InsertionPoint = _point(valeurs, 10)
+
+    elif type_dxf == 'LWPOLYLINE':
+        entite.Coordinates = _coordonnees(tags, 10, 2)
+        entite.Closed = bool(_entier(valeurs, 70) & 1)
+        entite.Elevation = _reel(valeurs, 38)
+
+    elif type_dxf == 'POLYLINE':
+        # Sommets (x, y, z) lus sur les VERTEX qui suivent (voir DocumentDXF._charger)
+        entite.Coordinates = []
+        entite.Closed = bool(_entier(valeurs, 70) & 1)
+        if object_name == 'AcDb2dPolyline':
+            entite.Elevation = _reel(valeurs, 30)
+
+    elif type_dxf == 'POINT':
+        entite.Coordinates = _point(valeurs, 10)
+
+    elif type_dxf == 'SPLINE':
+        entite.Degree = _entier(valeurs, 71)
+        entite.Closed = bool(_entier(valeurs, 70) & 1)
+        entite.ControlPoints = _coordonnees(tags, 10)
+        entite.FitPoints = _coordonnees(tags, 11)
+
+    elif type_dxf == 'HATCH':
+        entite.PatternName = valeurs.get(2, '').strip()
+        entite.NumberOfLoops = _entier(valeurs, 91)
+
+    elif type_dxf == 'DIMENSION':
+        entite.TextOverride = valeurs.get(1, '')
+        entite.TextPosition = _point(valeurs, 11)
+        if 13 in valeurs:
+            entite.ExtLine1Point = _point(valeurs, 13)
+            entite.ExtLine2Point = _point(valeurs, 14)
+        if 42 in valeurs:
+            entite.Measurement = _reel(valeurs, 42)
+        elif 13 in valeurs and object_name in ('AcDbRotatedDimension', 'AcDbAlignedDimension'):
+            # Mesure (code 42 facultatif) déduite des points des lignes d'attache
+            dx, dy, dz = (b - a for a, b in zip(entite.ExtLine1Point, entite.ExtLine2Point))
+            if object_name == 'AcDbRotatedDimension':
+                angle = math.radians(_reel(valeurs, 50))
+                entite.Measurement = abs(dx * math.cos(angle) + dy * math.sin(angle))
+            else:
+                entite.Measurement = math.sqrt(dx * dx + dy * dy + dz * dz)
+
+    elif type_dxf in ('ATTDEF', 'ATTRIB'):
+        drapeaux = _entier(valeurs, 70)
+        entite.TagString = valeurs.get(2, '').strip()
+        entite.TextString = valeurs.get(1, '')
+        entite.Height = _reel(valeurs, 40)
+        entite.InsertionPoint = _point(valeurs, 10)
+        entite.Invisible = bool(drapeaux & 1)
+        entite.Constant = bool(drapeaux & 2)
+        entite.Verify = bool(drapeaux & 4)
+        entite.Preset = bool(drapeaux & 8)
+        if type_dxf == 'ATTDEF':
+            entite.PromptString = valeurs.get(3, '')
+
+    return entite
+
+
+class BlocDXF:
+    """Définition de bloc (BLOCK ... ENDBLK) présentée comme un AcadBlock"""
+
+    def __init__(self, nom, document, valeurs=None):
+        valeurs = valeurs or {}
+        drapeaux = _entier(valeurs, 70)
+        self._document = document
+        self._entites = []
+        self.Name = nom
+        self.ObjectName = 'AcDbBlockTableRecord'
+        self.IsXRef = bool(drapeaux & 4)
+        self.IsLayout = nom.lower().startswith(('*model_space', '*paper_space'))
+        self.Origin = _point(valeurs, 10)
+        if self.IsXRef:
+            self.Path = valeurs.get(1, '').strip()
+
+    @property
+    def IsDynamicBlock(self):
+        return self.Name in self._document._blocs_dynamiques
+
+    @property
+    def Count(self):
+        return len(self._entites)
+
+    def Item(self, index):
+        return self._entites[index]
+
+    def __iter__(self):
+        return iter(self._entites)
+
+
+class CollectionBlocsDXF:
+    """Collection Blocks d'un document DXF"""
+
+    def __init__(self):
+        self._blocs = []
+        self._par_nom = {}
+
+    def _ajouter(self, bloc):
+        self._blocs.append(bloc)
+        self._par_nom[bloc.Name.lower()] = bloc
+
+    @property
+    def Count(self):
+        return len(self._blocs)
+
+    def Item(self, index):
+        if isinstance(index, str):
+            return self._par_nom[index.lower()]
+        return self._blocs[index]
+
+    def __iter__(self):
+        return iter(self._blocs)
+
+
+class DocumentDXF:
+    """Document DXF chargé en un seul passage sur le fichier"""
+
+    def __init__(self, chemin_dxf):
+        self.FullName = os.path.abspath(chemin_dxf)
+        self.Name = os.path.basename(chemin_dxf)
+        self.Path = os.path.dirname(self.FullName)
+        self.Blocks = CollectionBlocsDXF()
+
+        # Informations des BLOCK_RECORD pour résoudre les blocs dynamiques
+        self._blocs_dynamiques = set()
+        self._noms_par_handle = {}
+        self._representations = {}
+        self._cache_dynamiques = {}
+
+        self._charger(chemin_dxf)
+
+        self.ModelSpace = self._bloc_layout('*Model_Space')
+        self.PaperSpace = self._bloc_layout('*Paper_Space')
+
+    def _bloc_layout(self, nom):
+        try:
+            return self.Blocks.Item(nom)
+        except KeyError:
+            bloc = BlocDXF(nom, self)
+            self.Blocks._ajouter(bloc)
+            return bloc
+
+    def _charger(self, chemin_dxf):
+        section = None
+        bloc_courant = None
+        parent = None
+        entites_hors_blocs = []
+        nombre_sections = 0
+
+        for type_dxf, tags in lire_enregistrements(lire_tags(chemin_dxf)):
+            if type_dxf == 'SECTION':
+                section = _premiers(tags).get(2, '').strip()
+                nombre_sections += 1
+                continue
+            if type_dxf == 'ENDSEC':
+                section = None
+                continue
+
+            if section == 'TABLES':
+                if type_dxf == 'BLOCK_RECORD':
+                    self._lire_block_record(tags)
+                continue
+
+            if section not in ('BLOCKS', 'ENTITIES'):
+                continue
+
+            if type_dxf == 'BLOCK':
+                valeurs = _premiers(tags)
+                nom = valeurs.get(2, '').strip()
+                nom = NOMS_LAYOUTS_R12.get(nom.upper(), nom)
+                bloc_courant = BlocDXF(nom, self, valeurs)
+                self.Blocks._ajouter(bloc_courant)
+                continue
+            if type_dxf == 'ENDBLK':
+                bloc_courant = None
+                continue
+
+            # Entités secondaires rattachées à l'entité précédente
+            if type_dxf == 'SEQEND':
+                parent = None
+                continue
+            if type_dxf in ('ATTRIB', 'VERTEX'):
+                if type_dxf == 'ATTRIB' and isinstance(parent, ReferenceBlocDXF):
+                    parent._attributs.append(construire_entite(type_dxf, tags, self))
+                elif type_dxf == 'VERTEX' and parent is not None and parent.type_dxf == 'POLYLINE':
+                    valeurs = _premiers(tags)
+                    drapeaux = _entier(valeurs, 70)
+                    # Ni point de contrôle de lissage (16) ni face de maillage (128 sans 64)
+                    if not drapeaux & 16 and (not drapeaux & 128 or drapeaux & 64):
+                        parent.Coordinates.extend(_point(valeurs, 10))
+                continue
+
+            entite = construire_entite(type_dxf, tags, self)
+            parent = entite if type_dxf in ('INSERT', 'POLYLINE') else None
+
+            if section == 'BLOCKS' and bloc_courant is not None:
+                bloc_courant._entites.append(entite)
+            elif section == 'ENTITIES':
+                entites_hors_blocs.append(entite)
+
+        if nombre_sections == 0:
+            raise ValueError(f"Fichier DXF invalide (aucune section): {chemin_dxf}")
+
+        # La section ENTITIES contient l'espace objet et la présentation active
+        for entite in entites_hors_blocs:
+            nom = '*Paper_Space' if entite.espace_papier else '*Model_Space'
+            self._bloc_layout(nom)._entites.append(entite)
+
+    def _lire_block_record(self, tags):
+        valeurs = _premiers(tags)
+        nom = valeurs.get(2, '').strip()
+        self._noms_par_handle[valeurs.get(5, '').strip()] = nom
+
+        applications = _xdata(tags)
+        if XDATA_BLOC_DYNAMIQUE in applications:
+            self._blocs_dynamiques.add(nom)
+        for code, valeur in applications.get(XDATA_REPRESENTATION_DYNAMIQUE, ()):
+            if code == 1005:
+                self._representations[nom] = valeur
+
+    def _nom_dynamique(self, nom):
+        """Nom du bloc dynamique d'origine, ou None si le bloc n'est pas dynamique"""
+        if nom not in self._cache_dynamiques:
+            if nom in self._blocs_dynamiques:
+                resultat = nom
+            else:
+                resultat = self._noms_par_handle.get(self._representations.get(nom))
+            self._cache_dynamiques[nom] = resultat
+        return self._cache_dynamiques[nom]
+
+    def Close(self, sauvegarder=False):
+        pass
+
+
+def charger_dxf(chemin_dxf):
+    """Charge un fichier DXF et retourne un document compatible COM"""
+    return DocumentDXF(chemin_dxf)
@@ -0,0 +1,106 @@
+"""
+Moteur de parcours unique des entités d'un dessin
+Chaque entité est lue une seule fois (un seul appel à ObjectName) puis
+transmise aux gestionnaires enregistrés pour son type
+"""
+
+ESPACES_LAYOUT = {
+    '*model_space': 'ModelSpace',
+    '*paper_space': 'PaperSpace',
+}
+
+
+class ContexteParcours:
+    """État partagé par les gestionnaires pendant le parcours d'un bloc"""
+
+    def __init__(self, bloc, index=None, nom=None, espace=None):
+        self.bloc = bloc
+        self.index = index
+        self.nom = nom
+        self.espace = espace
+        self.bloc_def = None
+        self.types_entites = None
+        self.references_imbriquees = None
+        self.flux_entites = None
+        self.entite = None
+        # Entités issues d'un jeu de sélection filtré par AutoCAD
+        self.selection = False
+        # Entités dont la lecture a échoué (bloc parcouru incomplètement)
+        self.erreurs = 0
+
+
+class ParcoursEntites:
+    """Parcourt les blocs d'un document et distribue chaque entité
+    aux gestionnaires enregistrés par ObjectName
+    (ObjectName est lu par l'accesseur COM s'il est fourni)"""
+
+    def __init__(self, acces=None):
+        self.acces = acces
+        self._gestionnaires = []
+        self._table = {}
+        self._debut_bloc = []
+        self._fin_bloc = []
+        self._avant_entite = []
+
+    def enregistrer(self, gestionnaire, *object_names):
+        """Enregistre un gestionnaire(entity, obj_type, ctx) pour les types
+        donnés, ou pour toutes les entités si aucun type n'est précisé.
+        Les gestionnaires sont appelés dans l'ordre d'enregistrement."""
+        types = frozenset(object_names) if object_names else None
+        self._gestionnaires.append((types, gestionnaire))
+        self._table.clear()
+
+    def sur_bloc(self, debut=None, fin=None):
+        """Enregistre des fonctions appelées avant et après chaque bloc"""
+        if debut is not None:
+            self._debut_bloc.append(debut)
+        if fin is not None:
+            self._fin_bloc.append(fin)
+
+    def sur_entite(self, fonction):
+        """Enregistre une fonction(ctx, index) appelée avant chaque entité;
+        ses exceptions interrompent le parcours"""
+        self._avant_entite.append(fonction)
+
+    def _gestionnaires_pour(self, obj_type):
+        gestionnaires = self._table.get(obj_type)
+        if gestionnaires is None:
+            gestionnaires = [g for types, g in self._gestionnaires
+                             if types is None or obj_type in types]
+            self._table[obj_type] = gestionnaires
+        return gestionnaires
+
+    def parcourir_bloc(self, ctx):
+        """Distribue toutes les entités du bloc du contexte"""
+        for fonction in self._debut_bloc:
+            fonction(ctx)
+
+        bloc = ctx.bloc
+        type_objet = self.acces.type_objet if self.acces is not None else _object_name
+        for j in range(bloc.Count):
+            for fonction in self._avant_entite:
+                fonction(ctx, j)
+            try:
+                entity = bloc.Item(j)
+                obj_type = type_objet(entity)
+                ctx.entite = None
+                for gestionnaire in self._gestionnaires_pour(obj_type):
+                    gestionnaire(entity, obj_type, ctx)
+            except Exception as e:
+                ctx.erreurs += 1
+                if self.acces is not None and self.acces.instrumentation is not None:
+                    self.acces.instrumentation.exception('parcours.entite', e)
+                continue
+
+        for fonction in self._fin_bloc:
+            fonction(ctx)
+
+
+def _object_name(entity):
+    return entity.ObjectName
+
+
+def espace_du_bloc(nom):
+    """Espace ('ModelSpace' / 'PaperSpace') d'un bloc de présentation, sinon None.
+    Seul *Paper_Space correspond au PaperSpace actif du document."""
+    return ESPACES_LAYOUT.get(nom.lower()) if nom else None
@@ -0,0 +1,79 @@
+"""
+Profils d'extraction des définitions de blocs
+Un profil choisit les définitions dont les entités sont lues (développées)
+et les géométries relevées:
+  blocs_utilisateur  blocs nommés
+  presentations      *Model_Space, *Paper_Space* (leurs entités sont celles
+                     des espaces: les instances sont relevées sans les développer)
+  xrefs              blocs des références externes
+  anonymes           blocs anonymes (*U, *D, *X, ... et A$C...)
+  geometries         ObjectNames dont la géométrie est relevée (None: toutes);
+                     les définitions d'attributs sont toujours relevées
+Une définition non développée garde son en-tête (nom, origine, nombre
+d'entités, ...) avec des listes d'entités et d'attributs vides.
+"""
+
+import hashlib
+import json
+
+PROFILS = {
+    # Tout le dessin (comportement historique)
+    'complet': {
+        'blocs_utilisateur': True,
+        'presentations': True,
+        'xrefs': True,
+        'anonymes': True,
+        'geometries': None,
+    },
+    # Blocs seuls: le contenu des présentations n'est pas parcouru
+    'blocs': {
+        'presentations': False,
+    },
+    # Inventaire: en-têtes des définitions et attributs, sans géométrie
+    'inventaire': {
+        'presentations': False,
+        'anonymes': False,
+        'xrefs': False,
+        'geometries': (),
+    },
+}
+
+
+def profil_extraction(profil=None):
+    """Profil complet (nom de PROFILS ou dictionnaire) complété par 'complet'"""
+    if profil is None:
+        profil = 'complet'
+    if isinstance(profil, str):
+        try:
+            profil = PROFILS[profil]
+        except KeyError:
+            raise ValueError(f"Profil d'extraction inconnu: {profil} (profils: {', '.join(PROFILS)})")
+    resultat = dict(PROFILS['complet'])
+    resultat.update(profil)
+    return resultat
+
+
+def empreinte_reglages(reglages):
+    """Empreinte courte de réglages d'extraction (dictionnaire sérialisable,
+    ensembles compris): deux extractions aux mêmes réglages ont la même"""
+    texte = json.dumps(reglages, sort_keys=True, default=sorted)
+    return hashlib.blake2b(texte.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def categorie_bloc(nom):
+    """Catégorie d'une définition d'après son nom (sans appel COM)"""
+    nom = (nom or '').lower()
+    if nom.startswith('*model_space') or nom.startswith('*paper_space'):
+        return 'presentations'
+    if nom.startswith('*') or nom.startswith('a$c'):
+        return 'anonymes'
+    return 'blocs_utilisateur'
+
+
+def developper(profil, acces, bloc, nom):
+    """Vrai si les entités de la définition doivent être lues"""
+    if not profil[categorie_bloc(nom)]:
+        return False
+    if not profil['xrefs'] and acces.lire(bloc, "AcDbBlockTableRecord", 'IsXRef', False):
+        return False
+    return True
@@ -0,0 +1,384 @@
+"""
+Rapports des blocs: texte, CSV et HTML
+Les rapports sont écrits enregistrement par enregistrement, depuis les
+informations extraites en mémoire (ExtracteurBlocs.sauvegarder_rapport) ou
+hors ligne depuis une sortie sauvegardée (*_blocs.json ou NDJSON, lue en
+flux: le fichier n'est jamais chargé en entier), sans AutoCAD.
+Les statistiques et les valeurs autorisées par bloc arrivent en fin de
+sortie: les sections qui en dépendent sont gardées dans des fichiers
+temporaires et assemblées à la fin. Sans statistiques dans la sortie
+(extraction interrompue), elles sont recalculées au fil de la lecture.
+Usage: python rapport_blocs.py <sortie.json|sortie.ndjson> [--formats txt csv html] [-o dossier]
+"""
+
+import argparse
+import csv
+import html
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+
+from empreintes import ResolveurCorps
+from sorties import lire_sortie
+from statistiques import AccumulateurStatistiques
+
+FORMATS = ('txt', 'csv', 'html')
+
+# Taille des tampons d'écriture
+TAMPON = 1 << 20
+
+SEPARATEUR = "=" * 80 + "\n"
+
+
+def _section():
+    return tempfile.TemporaryFile('w+', encoding='utf-8', buffering=TAMPON)
+
+
+def _section_binaire():
+    return tempfile.TemporaryFile('w+b', buffering=TAMPON)
+
+
+def _relire(section):
+    """Enregistrements conservés par pickle.dump dans une section binaire"""
+    section.seek(0)
+    try:
+        while True:
+            yield pickle.load(section)
+    except EOFError:
+        section.close()
+
+
+def _recopier(section, f):
+    section.seek(0)
+    shutil.copyfileobj(section, f)
+    section.close()
+
+
+def _valeurs_par_bloc(proprietes_dynamiques):
+    """{nom effectif: {propriété: métadonnées}} des valeurs écrites par bloc"""
+    return {nom_effectif: {p['nom']: p for p in proprietes}
+            for nom_effectif, proprietes in (proprietes_dynamiques or {}).items()}
+
+
+def _valeurs_autorisees(prop, nom_effectif, par_bloc):
+    return prop.get('valeurs_autorisees') or \
+        par_bloc.get(nom_effectif, {}).get(prop['nom'], {}).get('valeurs_autorisees')
+
+
+class RapportTexte:
+    """Rapport texte détaillé (format historique de sauvegarder_rapport)"""
+
+    def __init__(self, fichier_sortie):
+        self.fichier_sortie = fichier_sortie
+        self._definitions = _section()
+        # Blocs dynamiques conservés tels quels: leurs valeurs autorisées peuvent être en fin de sortie
+        self._dynamiques = _section_binaire()
+
+    def definition(self, bloc_def):
+        f = self._definitions
+        f.write(f"Bloc: {bloc_def['nom']}\n")
+        f.write(f"  Dynamique: {bloc_def['est_dynamique']}\n")
+        f.write(f"  XRef: {bloc_def['est_xref']}\n")
+        f.write(f"  Nombre d'entités: {bloc_def['nombre_entites']}\n")
+        f.write(f"  Nombre d'attributs: {bloc_def['nombre_attributs']}\n")
+
+        if bloc_def['attributs']:
+            f.write(f"  Attributs:\n")
+            for attr in bloc_def['attributs']:
+                f.write(f"    - {attr.get('tag', 'N/A')}: {attr.get('prompt', 'N/A')}\n")
+
+        if bloc_def.get('references_imbriquees'):
+            f.write(f"  Blocs imbriqués:\n")
+            for nom, nombre in bloc_def['references_imbriquees'].items():
+                f.write(f"    - {nom}: {nombre}\n")
+
+        if bloc_def['types_entites']:
+            f.write(f"  Types d'entités:\n")
+            for type_ent, count in bloc_def['types_entites'].items():
+                f.write(f"    - {type_ent}: {count}\n")
+
+        f.write("\n")
+
+    def instance(self, instance):
+        pass
+
+    def bloc_dynamique(self, bloc_dyn):
+        pickle.dump(bloc_dyn, self._dynamiques, pickle.HIGHEST_PROTOCOL)
+
+    def _ecrire_dynamique(self, f, bloc_dyn, par_bloc):
+        f.write(f"Bloc: {bloc_dyn['nom_effectif']}\n")
+        f.write(f"  Nom original: {bloc_dyn['nom']}\n")
+        f.write(f"  Position: X={bloc_dyn['position']['x']:.2f}, Y={bloc_dyn['position']['y']:.2f}, Z={bloc_dyn['position']['z']:.2f}\n")
+        f.write(f"  Rotation: {bloc_dyn['rotation_degres']:.2f}°\n")
+        f.write(f"  Calque: {bloc_dyn['calque']}\n")
+        f.write(f"  Propriétés dynamiques:\n")
+
+        for prop in bloc_dyn['proprietes_dynamiques']:
+            f.write(f"    • {prop['nom']}: {prop['valeur']}")
+            valeurs = _valeurs_autorisees(prop, bloc_dyn['nom_effectif'], par_bloc)
+            if valeurs:
+                f.write(f" (Valeurs: {valeurs})")
+            f.write("\n")
+
+        if bloc_dyn['attributs']:
+            f.write(f"  Attributs:\n")
+            for attr in bloc_dyn['attributs']:
+                f.write(f"    • {attr['tag']}: {attr['valeur']}\n")
+
+        f.write("\n")
+
+    def terminer(self, stats, proprietes_dynamiques):
+        with open(self.fichier_sortie, 'w', encoding='utf-8', buffering=TAMPON) as f:
+            f.write(SEPARATEUR)
+            f.write("RAPPORT DÉTAILLÉ DES BLOCS\n")
+            f.write(SEPARATEUR + "\n")
+
+            # Statistiques
+            f.write("📊 STATISTIQUES:\n")
+            f.write(f"  Définitions de blocs: {stats['definitions']['total']}\n")
+            f.write(f"  Instances de blocs: {stats['instances']['total']}\n")
+            f.write(f"  Blocs dynamiques: {stats['instances']['dynamiques']}\n\n")
+
+            # Définitions de blocs
+            f.write(SEPARATEUR)
+            f.write("🔲 DÉFINITIONS DE BLOCS\n")
+            f.write(SEPARATEUR + "\n")
+            _recopier(self._definitions, f)
+
+            # Blocs dynamiques
+            f.write(SEPARATEUR)
+            f.write("🔄 BLOCS DYNAMIQUES\n")
+            f.write(SEPARATEUR + "\n")
+            par_bloc = _valeurs_par_bloc(proprietes_dynamiques)
+            for bloc_dyn in _relire(self._dynamiques):
+                self._ecrire_dynamique(f, bloc_dyn, par_bloc)
+
+            # Top blocs
+            f.write(SEPARATEUR)
+            f.write("🏆 TOP 10 DES BLOCS LES PLUS UTILISÉS\n")
+            f.write(SEPARATEUR + "\n")
+
+            for i, bloc in enumerate(stats['top_10_blocs_utilises'][:10], 1):
+                f.write(f"{i}. {bloc['nom']}: {bloc['nombre']} instances\n")
+        return [self.fichier_sortie]
+
+
+class RapportCSV:
+    """Tables CSV (séparateur ';', UTF-8 avec BOM pour Excel):
+    <base>_definitions.csv, <base>_instances.csv, <base>_dynamiques.csv
+    (base: plan_rapport_blocs)"""
+
+    COLONNES = {
+        'definitions': ['nom', 'est_dynamique', 'est_xref', 'est_layout', 'nombre_entites',
+                        'nombre_attributs', 'origine_x', 'origine_y', 'origine_z', 'blocs_imbriques'],
+        'instances': ['nom_bloc', 'nom_effectif', 'espace', 'calque', 'x', 'y', 'z', 'rotation_degres',
+                      'echelle_x', 'echelle_y', 'echelle_z', 'handle', 'attributs'],
+        'dynamiques': ['nom_effectif', 'nom', 'espace', 'calque', 'x', 'y', 'z', 'rotation_degres',
+                             'handle', 'proprietes'],
+    }
+
+    def __init__(self, base):
+        self.chemins = {table: f"{base}_{table}.csv" for table in self.COLONNES}
+        self._fichiers = {}
+        self._tables = {}
+        for table, colonnes in self.COLONNES.items():
+            f = open(self.chemins[table], 'w', encoding='utf-8-sig', newline='', buffering=TAMPON)
+            self._fichiers[table] = f
+            self._tables[table] = csv.writer(f, delimiter=';')
+            self._tables[table].writerow(colonnes)
+
+    def definition(self, bloc_def):
+        origine = bloc_def.get('origine') or {}
+        self._tables['definitions'].writerow([
+            bloc_def['nom'], bloc_def['est_dynamique'], bloc_def['est_xref'], bloc_def.get('est_layout'),
+            bloc_def['nombre_entites'], bloc_def['nombre_attributs'],
+            origine.get('x'), origine.get('y'), origine.get('z'),
+            '|'.join(f"{nom}={nombre}" for nom, nombre in (bloc_def.get('references_imbriquees') or {}).items())
+        ])
+
+    def instance(self, instance):
+        position, echelle = instance['position'], instance['echelle']
+        self._tables['instances'].writerow([
+            instance['nom_bloc'], instance.get('nom_effectif') or instance['nom_bloc'], instance['espace'],
+            instance['calque'], position['x'], position['y'], position['z'], instance['rotation_degres'],
+            echelle['x'], echelle['y'], echelle['z'], instance.get('handle'),
+            '|'.join(f"{a['tag']}={a['valeur']}" for a in instance['attributs'])
+        ])
+
+    def bloc_dynamique(self, bloc_dyn):
+        position = bloc_dyn['position']
+        self._tables['dynamiques'].writerow([
+            bloc_dyn['nom_effectif'], bloc_dyn['nom'], bloc_dyn.get('espace'), bloc_dyn['calque'],
+            position['x'], position['y'], position['z'], bloc_dyn['rotation_degres'], bloc_dyn.get('handle'),
+            '|'.join(f"{p['nom']}={p['valeur']}" for p in bloc_dyn['proprietes_dynamiques'])
+        ])
+
+    def terminer(self, stats, proprietes_dynamiques):
+        for f in self._fichiers.values():
+            f.close()
+        return list(self.chemins.values())
+
+
+class RapportHTML:
+    """Rapport HTML: statistiques, blocs les plus utilisés, définitions et blocs dynamiques"""
+
+    STYLE = ("body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;margin-bottom:2em}"
+             "th,td{border:1px solid #ccc;padding:2px 8px;text-align:left}th{background:#eee}")
+
+    def __init__(self, fichier_sortie):
+        self.fichier_sortie = fichier_sortie
+        self._definitions = _section()
+        self._dynamiques = _section_binaire()
+
+    @staticmethod
+    def _ligne(f, valeurs, balise='td'):
+        f.write("<tr>" + "".join(f"<{balise}>{html.escape(str(v))}</{balise}>" for v in valeurs) + "</tr>\n")
+
+    def definition(self, bloc_def):
+        types = ", ".join(f"{t}: {n}" for t, n in bloc_def['types_entites'].items())
+        imbriques = ", ".join(f"{nom}: {n}" for nom, n in (bloc_def.get('references_imbriquees') or {}).items())
+        attributs = ", ".join(str(a.get('tag', 'N/A')) for a in bloc_def['attributs'])
+        self._ligne(self._definitions, [bloc_def['nom'], bloc_def['est_dynamique'], bloc_def['est_xref'],
+                                        bloc_def['nombre_entites'], attributs, imbriques, types])
+
+    def instance(self, instance):
+        pass
+
+    def bloc_dynamique(self, bloc_dyn):
+        pickle.dump(bloc_dyn, self._dynamiques, pickle.HIGHEST_PROTOCOL)
+
+    def terminer(self, stats, proprietes_dynamiques):
+        par_bloc = _valeurs_par_bloc(proprietes_dynamiques)
+        with open(self.fichier_sortie, 'w', encoding='utf-8', buffering=TAMPON) as f:
+            f.write(f"<!DOCTYPE html>\n<html lang=\"fr\">\n<head>\n<meta charset=\"utf-8\">\n"
+                    f"<title>Rapport des blocs</title>\n<style>{self.STYLE}</style>\n</head>\n<body>\n")
+            f.write("<h1>Rapport détaillé des blocs</h1>\n")
+
+            f.write("<h2>Statistiques</h2>\n<table>\n")
+            self._ligne(f, ["Définitions de blocs", stats['definitions']['total']])
+            self._ligne(f, ["Instances de blocs", stats['instances']['total']])
+            self._ligne(f, ["Dans ModelSpace", stats['instances']['modelspace']])
+            self._ligne(f, ["Dans PaperSpace", stats['instances']['paperspace']])
+            self._ligne(f, ["Blocs dynamiques", stats['instances']['dynamiques']])
+            f.write("</table>\n")
+
+            f.write("<h2>Top 10 des blocs les plus utilisés</h2>\n<table>\n")
+            self._ligne(f, ["Bloc", "Instances"], 'th')
+            for bloc in stats['top_10_blocs_utilises'][:10]:
+                self._ligne(f, [bloc['nom'], bloc['nombre']])
+            f.write("</table>\n")
+
+            f.write("<h2>Définitions de blocs</h2>\n<table>\n")
+            self._ligne(f, ["Bloc", "Dynamique", "XRef", "Entités", "Attributs", "Blocs imbriqués",
+                            "Types d'entités"], 'th')
+            _recopier(self._definitions, f)
+            f.write("</table>\n")
+
+            f.write("<h2>Blocs dynamiques</h2>\n<table>\n")
+            self._ligne(f, ["Bloc", "Nom original", "Position", "Rotation (°)", "Calque",
+                            "Propriétés dynamiques"], 'th')
+            for bloc_dyn in _relire(self._dynamiques):
+                position = bloc_dyn['position']
+                proprietes = []
+                for prop in bloc_dyn['proprietes_dynamiques']:
+                    valeurs = _valeurs_autorisees(prop, bloc_dyn['nom_effectif'], par_bloc)
+                    proprietes.append(f"{prop['nom']}: {prop['valeur']}" + (f" ({valeurs})" if valeurs else ""))
+                self._ligne(f, [bloc_dyn['nom_effectif'], bloc_dyn['nom'],
+                                f"{position['x']:.2f}, {position['y']:.2f}, {position['z']:.2f}",
+                                f"{bloc_dyn['rotation_degres']:.2f}", bloc_dyn['calque'], "; ".join(proprietes)])
+            f.write("</table>\n</body>\n</html>\n")
+        return [self.fichier_sortie]
+
+
+def enregistrements_blocs_info(blocs_info):
+    """Informations extraites en mémoire, au format de sorties.lire_sortie"""
+    for categorie in ('definitions_blocs', 'instances_blocs', 'blocs_dynamiques'):
+        for enregistrement in blocs_info[categorie]:
+            yield categorie, enregistrement
+    for cle in ('proprietes_dynamiques', 'statistiques'):
+        if blocs_info.get(cle):
+            yield cle, blocs_info[cle]
+
+
+def generer_rapports(enregistrements, rapports):
+    """Écrit les rapports en un passage sur les enregistrements (categorie, donnees)
+    rapports: RapportTexte, RapportCSV, RapportHTML; renvoie les fichiers écrits
+    Le corps des définitions en double est rétabli depuis la première"""
+    statistiques = None
+    resolveur = ResolveurCorps()
+    proprietes_dynamiques = {}
+    accumulateur = AccumulateurStatistiques()
+    for categorie, donnees in enregistrements:
+        if categorie == 'definitions_blocs':
+            donnees = resolveur.resoudre(donnees)
+            accumulateur.ajouter_definition(donnees)
+            for rapport in rapports:
+                rapport.definition(donnees)
+        elif categorie == 'instances_blocs':
+            accumulateur.ajouter_instance(donnees)
+            for rapport in rapports:
+                rapport.instance(donnees)
+        elif categorie == 'blocs_dynamiques':
+            for rapport in rapports:
+                rapport.bloc_dynamique(donnees)
+        elif categorie == 'proprietes_dynamiques':
+            proprietes_dynamiques = donnees
+        elif categorie == 'statistiques':
+            statistiques = donnees
+
+    if not statistiques:
+        statistiques = accumulateur.resultat()
+    fichiers = []
+    for rapport in rapports:
+        fichiers.extend(rapport.terminer(statistiques, proprietes_dynamiques))
+    return fichiers
+
+
+def nom_base(chemin_sortie):
+    """plan_blocs.json -> plan"""
+    nom = os.path.basename(chemin_sortie)
+    for suffixe in ('_blocs.ndjson', '_blocs.json', '.ndjson', '.json'):
+        if nom.endswith(suffixe):
+            return nom[:-len(suffixe)]
+    return os.path.splitext(nom)[0]
+
+
+def rapports_sortie(chemin_sortie, formats=('txt',), dossier=None):
+    """Rapports d'une sortie sauvegardée (JSON ou NDJSON), lue en flux"""
+    dossier = dossier if dossier is not None else os.path.dirname(chemin_sortie)
+    if dossier:
+        os.makedirs(dossier, exist_ok=True)
+    base = os.path.join(dossier, f"{nom_base(chemin_sortie)}_rapport_blocs")
+
+    rapports = []
+    if 'txt' in formats:
+        rapports.append(RapportTexte(f"{base}.txt"))
+    if 'csv' in formats:
+        rapports.append(RapportCSV(base))
+    if 'html' in formats:
+        rapports.append(RapportHTML(f"{base}.html"))
+    return generer_rapports(lire_sortie(chemin_sortie), rapports)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rapports des blocs depuis une sortie JSON ou NDJSON")
+    parser.add_argument('sorties', nargs='+', help="fichiers *_blocs.json ou *.ndjson")
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=['txt'], help="formats des rapports")
+    parser.add_argument('-o', '--sortie', default=None, help="dossier des rapports (défaut: celui de la sortie)")
+    args = parser.parse_args(argv)
+
+    code = 0
+    for chemin in args.sorties:
+        try:
+            for fichier in rapports_sortie(chemin, args.formats, args.sortie):
+                print(f"📄 {os.path.abspath(fichier)}")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ {chemin}: {type(e).__name__}: {e}")
+            code = 1
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
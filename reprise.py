@@ -0,0 +1,94 @@
+"""
+Point de reprise de l'extraction des définitions de blocs
+La progression est relevée bloc par bloc (index et nom). Un bloc n'est
+validé qu'une fois entièrement parcouru: après une erreur, l'extraction
+reprend au bloc en échec, sans refaire ni dupliquer les blocs validés.
+Sur disque, le point de reprise est un fichier NDJSON en ajout seul:
+  1re ligne: {"dessin": ..., "empreinte": ..., "sortie": ...}
+  puis une ligne par bloc validé: {"index": ..., "nom": ..., "statistiques": ...,
+  "nombre_extraits": ..., et "enregistrements" (en mémoire) ou "position" (en flux)}
+Une dernière ligne tronquée (arrêt brutal pendant l'écriture) est ignorée.
+"""
+
+import json
+import os
+
+from enregistrements import en_json
+from index_incremental import empreinte_fichier
+
+
+class PointDeReprise:
+    """Progression bloc par bloc, éventuellement enregistrée dans un fichier"""
+
+    def __init__(self, chemin=None):
+        self.chemin = chemin
+        self.prochain_index = 0
+        self.blocs_valides = []
+        self.derniere = None
+        self.complet = False
+        self._f = None
+
+    def _entete(self, dessin, sortie):
+        try:
+            empreinte = empreinte_fichier(dessin)
+        except OSError:
+            empreinte = None
+        return {'dessin': os.path.abspath(dessin), 'empreinte': empreinte,
+                'sortie': os.path.abspath(sortie) if sortie else None}
+
+    def charger(self, dessin, sortie=None):
+        """Relit le point de reprise du dessin et l'ouvre en ajout
+        (sortie: fichier NDJSON de l'extraction en flux)
+        Retourne les entrées des blocs déjà validés (vide si aucune reprise
+        possible: fichier absent, autre dessin, dessin modifié, autre sortie)"""
+        entete = self._entete(dessin, sortie)
+        entrees = []
+        if self.chemin is not None and os.path.exists(self.chemin) \
+                and (sortie is None or os.path.exists(sortie)):
+            with open(self.chemin, encoding='utf-8') as f:
+                lignes = f.read().splitlines()
+            try:
+                if lignes and json.loads(lignes[0]) == entete:
+                    for ligne in lignes[1:]:
+                        entrees.append(json.loads(ligne))
+            except json.JSONDecodeError:
+                pass
+
+        for entree in entrees:
+            self.blocs_valides.append((entree['index'], entree['nom']))
+        if entrees:
+            self.derniere = entrees[-1]
+            self.prochain_index = self.derniere['index'] + 1
+
+        if self.chemin is not None:
+            # Réécrit l'en-tête et les entrées lisibles (sans ligne tronquée)
+            temporaire = self.chemin + '.tmp'
+            with open(temporaire, 'w', encoding='utf-8') as f:
+                for ligne in [entete] + entrees:
+                    f.write(json.dumps(ligne, ensure_ascii=False, default=en_json) + '\n')
+            os.replace(temporaire, self.chemin)
+            self._f = open(self.chemin, 'a', encoding='utf-8')
+        return entrees
+
+    def _ecrire(self, entree):
+        self._f.write(json.dumps(entree, ensure_ascii=False, default=en_json) + '\n')
+        self._f.flush()
+
+    def valider(self, index, nom, **donnees):
+        """Enregistre un bloc entièrement parcouru"""
+        self.blocs_valides.append((index, nom))
+        self.prochain_index = index + 1
+        self.derniere = {'index': index, 'nom': nom, **donnees}
+        if self._f is not None:
+            self._ecrire(self.derniere)
+
+    def terminer(self):
+        """Extraction achevée: le point de reprise n'est plus utile"""
+        self.fermer()
+        if self.chemin is not None and os.path.exists(self.chemin):
+            os.remove(self.chemin)
+
+    def fermer(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
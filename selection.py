@@ -0,0 +1,127 @@
+"""
+Sélection des références de blocs côté AutoCAD
+Un jeu de sélection filtré (SelectionSets, codes de groupe DXF) ne fait
+traverser la frontière COM qu'aux références retenues au lieu de toutes
+les entités de l'espace:
+  0   type d'entité (INSERT)
+  8   calques
+  2   noms de blocs (plus les blocs anonymes `*U*` des blocs dynamiques,
+      vérifiés ensuite par EffectiveName)
+  410 présentation (Model ou la présentation papier active)
+Sans jeu de sélection (backend DXF, erreur COM), l'espace entier est
+parcouru et le même filtre est appliqué en Python.
+"""
+
+import contextlib
+
+try:
+    import pythoncom
+    import win32com.client
+except ImportError:
+    pythoncom = None
+
+NOM_SELECTION = 'ExtracteurBlocs_references'
+AC_SELECTION_SET_ALL = 5
+CARACTERES_GENERIQUES = '#@.*?~[]`,'
+PREFIXE_ANONYME_DYNAMIQUE = '*U'
+
+
+def echapper(nom):
+    """Échappe les caractères génériques AutoCAD d'un nom (accent grave)"""
+    return ''.join('`' + c if c in CARACTERES_GENERIQUES else c for c in nom)
+
+
+class FiltreReferences:
+    """Calques et noms de blocs retenus (sans distinction de casse)"""
+
+    def __init__(self, calques=None, noms=None):
+        self.calques = {c.lower() for c in calques} if calques else None
+        self.noms = {n.lower() for n in noms} if noms else None
+
+    def codes_dxf(self, presentation):
+        """Filtre du jeu de sélection: [(code de groupe, valeur)]"""
+        filtre = [(0, 'INSERT'), (410, echapper(presentation))]
+        if self.calques:
+            filtre.append((8, ','.join(echapper(c) for c in sorted(self.calques))))
+        if self.noms:
+            motifs = [echapper(n) for n in sorted(self.noms)]
+            motifs.append(f"`{PREFIXE_ANONYME_DYNAMIQUE}*")
+            filtre.append((2, ','.join(motifs)))
+        return filtre
+
+    def retenir(self, acces, entity, selection=False):
+        """Vrai si la référence passe le filtre
+        (après un jeu de sélection, seuls les blocs anonymes restent à vérifier)"""
+        obj_type = "AcDbBlockReference"
+        if self.calques and not selection:
+            calque = acces.lire(entity, obj_type, 'Layer') or ''
+            if calque.lower() not in self.calques:
+                return False
+        if self.noms:
+            nom = acces.lire(entity, obj_type, 'Name') or ''
+            if selection and not nom.upper().startswith(PREFIXE_ANONYME_DYNAMIQUE):
+                return True
+            if nom.lower() in self.noms:
+                return True
+            if nom.startswith('*') and acces.lire(entity, obj_type, 'IsDynamicBlock', False):
+                nom_effectif = acces.lire(entity, obj_type, 'EffectiveName') or ''
+                return nom_effectif.lower() in self.noms
+            return False
+        return True
+
+
+def _arguments_filtre(filtre):
+    """Tableaux VARIANT attendus par AcadSelectionSet.Select"""
+    codes = [code for code, _ in filtre]
+    valeurs = [valeur for _, valeur in filtre]
+    if pythoncom is None:
+        return codes, valeurs
+    return (win32com.client.VARIANT(pythoncom.VT_ARRAY | pythoncom.VT_I2, codes),
+            win32com.client.VARIANT(pythoncom.VT_ARRAY | pythoncom.VT_VARIANT, valeurs))
+
+
+def _presentation(doc, espace):
+    """Nom de la présentation d'un espace ('Model' ou la présentation papier active)"""
+    if espace == 'ModelSpace':
+        return 'Model'
+    return doc.PaperSpace.Layout.Name
+
+
+def creer_selection(doc, espace, filtre):
+    """Jeu de sélection des références d'un espace filtrées par AutoCAD"""
+    selections = doc.SelectionSets
+    try:
+        selections.Item(NOM_SELECTION).Delete()
+    except Exception:
+        pass
+    selection = selections.Add(NOM_SELECTION)
+    try:
+        codes, valeurs = _arguments_filtre(filtre.codes_dxf(_presentation(doc, espace)))
+        selection.Select(AC_SELECTION_SET_ALL, None, None, codes, valeurs)
+    except Exception:
+        selection.Delete()
+        raise
+    return selection
+
+
+@contextlib.contextmanager
+def source_references(doc, espace, filtre, serveur=True):
+    """Entités à parcourir pour un espace: (collection, par_selection)
+    Jeu de sélection filtré si possible, sinon l'espace entier"""
+    selection = None
+    if serveur:
+        try:
+            selection = creer_selection(doc, espace, filtre or FiltreReferences())
+        except Exception:
+            selection = None
+
+    if selection is None:
+        yield (doc.ModelSpace if espace == 'ModelSpace' else doc.PaperSpace), False
+        return
+    try:
+        yield selection, True
+    finally:
+        try:
+            selection.Delete()
+        except Exception:
+            pass
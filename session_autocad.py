@@ -0,0 +1,153 @@
+"""
+Session AutoCAD réutilisable d'un dessin à l'autre
+- une seule application, invisible si la session l'a démarrée
+- attente du chargement par interrogation avec temporisation croissante
+  (GetAcadState().IsQuiescent) au lieu de pauses fixes
+- fermeture sans enregistrement des documents ouverts par la session
+"""
+
+import os
+import signal
+import time
+
+try:
+    import win32com.client
+except ImportError:
+    win32com = None
+
+
+class DelaiChargementDepasse(TimeoutError):
+    """Le document n'est pas prêt dans le délai imparti"""
+
+
+def attendre_disponibilite(condition, delai_max=120.0, attente_initiale=0.05,
+                           facteur=1.5, attente_max=1.0, horloge=time.monotonic, pause=time.sleep):
+    """Interroge `condition()` jusqu'à ce qu'elle soit vraie
+    L'attente entre deux essais croît de `attente_initiale` à `attente_max`;
+    retourne le nombre d'essais, lève DelaiChargementDepasse après `delai_max` s"""
+    fin = horloge() + delai_max
+    attente = attente_initiale
+    essais = 0
+    while True:
+        essais += 1
+        try:
+            if condition():
+                return essais
+        except Exception:
+            # AutoCAD occupé: l'appel COM est rejeté pendant le chargement
+            pass
+        reste = fin - horloge()
+        if reste <= 0:
+            raise DelaiChargementDepasse(f"AutoCAD toujours occupé après {delai_max} s ({essais} essais)")
+        pause(min(attente, reste))
+        attente = min(attente * facteur, attente_max)
+
+
+class SessionAutoCAD:
+    """Application AutoCAD gardée ouverte pour une suite de dessins"""
+
+    def __init__(self, application=None, nouvelle_instance=False, visible=False,
+                 delai_chargement=120.0, lecture_seule=True):
+        self.acad = application
+        # DispatchEx démarre une instance AutoCAD dédiée au lieu de
+        # se connecter à celle déjà ouverte (une session par processus)
+        self.nouvelle_instance = nouvelle_instance
+        self.visible = visible
+        self.delai_chargement = delai_chargement
+        self.lecture_seule = lecture_seule
+        self.demarree_par_session = False
+        self.pid = None
+        self.documents = []
+        self.essais_derniere_ouverture = 0
+
+    def demarrer(self):
+        """Démarre ou rejoint l'application AutoCAD"""
+        if self.acad is not None:
+            return self.acad
+        if win32com is None:
+            raise ImportError("pywin32 est nécessaire pour piloter AutoCAD (pip install pywin32)")
+
+        if self.nouvelle_instance:
+            self.acad = win32com.client.DispatchEx("AutoCAD.Application")
+            self.demarree_par_session = True
+        else:
+            try:
+                # AutoCAD déjà ouvert par l'utilisateur: ni masqué ni quitté
+                self.acad = win32com.client.GetActiveObject("AutoCAD.Application")
+            except Exception:
+                self.acad = win32com.client.Dispatch("AutoCAD.Application")
+                self.demarree_par_session = True
+
+        if self.demarree_par_session:
+            self.acad.Visible = self.visible
+            self.pid = self._pid()
+        return self.acad
+
+    def _pid(self):
+        """Processus de l'application (pour l'arrêter si elle ne répond plus)"""
+        try:
+            import win32process
+            return win32process.GetWindowThreadProcessId(self.acad.HWND)[1]
+        except Exception:
+            return None
+
+    def forcer_arret(self):
+        """Arrête le processus AutoCAD démarré par la session pour débloquer
+        un appel COM sans réponse (sans effet sur un AutoCAD rejoint)
+        Peut être appelé depuis un autre thread: aucun appel COM"""
+        if not self.demarree_par_session or self.pid is None:
+            return False
+        try:
+            os.kill(self.pid, signal.SIGTERM)
+        except OSError:
+            return False
+        # La session redémarrera AutoCAD au prochain dessin
+        self.acad = None
+        self.documents = []
+        self.demarree_par_session = False
+        self.pid = None
+        return True
+
+    def _est_pret(self, doc):
+        """Application au repos et document accessible"""
+        if not self.acad.GetAcadState().IsQuiescent:
+            return False
+        doc.ModelSpace.Count
+        return True
+
+    def ouvrir(self, chemin):
+        """Ouvre le dessin et attend qu'il soit chargé"""
+        self.demarrer()
+        doc = self.acad.Documents.Open(chemin, self.lecture_seule)
+        self.documents.append(doc)
+        self.essais_derniere_ouverture = attendre_disponibilite(
+            lambda: self._est_pret(doc), self.delai_chargement)
+        return doc
+
+    def fermer_document(self, doc):
+        """Ferme le document sans enregistrer"""
+        if doc in self.documents:
+            self.documents.remove(doc)
+        try:
+            doc.Close(False)
+        except Exception:
+            pass
+
+    def fermer(self):
+        """Ferme les documents ouverts et quitte AutoCAD s'il a été démarré par la session"""
+        for doc in list(self.documents):
+            self.fermer_document(doc)
+        if self.acad is not None and self.demarree_par_session:
+            try:
+                self.acad.Quit()
+            except Exception:
+                pass
+        self.acad = None
+        self.demarree_par_session = False
+
+    def __enter__(self):
+        self.demarrer()
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
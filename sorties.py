@@ -0,0 +1,224 @@
+"""
+Sorties en flux des informations des blocs
+Format NDJSON: une ligne JSON par enregistrement
+  {"categorie": "entete", "donnees": {...}}
+  {"categorie": "definitions_blocs", "donnees": {...}}
+  {"categorie": "instances_blocs", "donnees": {...}}
+  {"categorie": "blocs_dynamiques", "donnees": {...}}
+  {"categorie": "proprietes_dynamiques", "donnees": {...}}   (valeurs autorisées par bloc)
+  {"categorie": "xrefs", "donnees": [...]}   (dessins référencés, si suivis)
+  {"categorie": "statistiques", "donnees": {...}}   (dernière ligne)
+Les sorties JSON (*_blocs.json) se relisent aussi en flux (lire_json_en_flux):
+les tableaux de premier niveau sont lus élément par élément.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+from enregistrements import en_json
+
+
+def _json(valeur):
+    return json.dumps(valeur, ensure_ascii=False, default=en_json)
+
+
+class EnregistrementEnFlux:
+    """Ligne NDJSON dont une liste est écrite élément par élément
+    (entités d'une définition de bloc) dans un fichier temporaire,
+    puis recopiée d'un bloc dans la sortie quand elle est terminée"""
+
+    def __init__(self, ecrivain, categorie, debut, cle_liste):
+        self._ecrivain = ecrivain
+        self._tampon = tempfile.TemporaryFile('w+', encoding='utf-8')
+        self._premier = True
+        entete = _json({'categorie': categorie, 'donnees': debut})
+        # Retirer les deux accolades fermantes pour prolonger 'donnees'
+        self._tampon.write(entete[:-2] + f', {_json(cle_liste)}: [')
+
+    def ajouter(self, element):
+        if not self._premier:
+            self._tampon.write(', ')
+        self._tampon.write(_json(element))
+        self._premier = False
+
+    def terminer(self, fin):
+        """Ferme la liste, ajoute les derniers champs et recopie la ligne"""
+        self._tampon.write(']')
+        for cle, valeur in fin.items():
+            self._tampon.write(f', {_json(cle)}: {_json(valeur)}')
+        self._tampon.write('}}\n')
+        self._tampon.seek(0)
+        shutil.copyfileobj(self._tampon, self._ecrivain._f)
+        self._tampon.close()
+        self._ecrivain.nombre_lignes += 1
+
+
+def lire_ndjson(chemin_ndjson):
+    """Lit une sortie NDJSON ligne par ligne: (categorie, donnees)"""
+    with open(chemin_ndjson, encoding='utf-8') as f:
+        for ligne in f:
+            if ligne.strip():
+                enregistrement = json.loads(ligne)
+                yield enregistrement['categorie'], enregistrement['donnees']
+
+
+class LecteurJSONEnFlux:
+    """Lecture incrémentale d'un objet JSON de premier niveau
+    {cle: [élément, ...] | valeur}: seul l'élément en cours est en mémoire"""
+
+    def __init__(self, f, taille_lecture=1 << 16):
+        self._f = f
+        self._taille = taille_lecture
+        self._tampon = ''
+        self._pos = 0
+        self._fin = False
+        self._decodeur = json.JSONDecoder()
+
+    def _lire(self, taille):
+        """Ajoute au tampon (la partie déjà lue est abandonnée)"""
+        morceau = self._f.read(taille)
+        if not morceau:
+            self._fin = True
+        self._tampon = self._tampon[self._pos:] + morceau
+        self._pos = 0
+
+    def _caractere(self):
+        """Prochain caractère hors blancs (consommé), '' en fin de fichier"""
+        while True:
+            while self._pos < len(self._tampon) and self._tampon[self._pos] in ' \t\r\n':
+                self._pos += 1
+            if self._pos < len(self._tampon):
+                self._pos += 1
+                return self._tampon[self._pos - 1]
+            if self._fin:
+                return ''
+            self._lire(self._taille)
+
+    def _attendre(self, attendus):
+        c = self._caractere()
+        if c not in attendus:
+            raise ValueError(f"JSON invalide: {c!r} au lieu de {' ou '.join(map(repr, attendus))}")
+        return c
+
+    def _valeur(self):
+        """Valeur JSON complète suivante, le tampon étant agrandi au besoin"""
+        if self._caractere():
+            self._pos -= 1
+        taille = self._taille
+        while True:
+            try:
+                valeur, fin = self._decodeur.raw_decode(self._tampon, self._pos)
+                # Un nombre coupé en fin de tampon serait décodé tronqué
+                if fin < len(self._tampon) or self._fin:
+                    self._pos = fin
+                    return valeur
+            except json.JSONDecodeError:
+                if self._fin:
+                    raise
+            self._lire(taille)
+            taille *= 2
+
+    def __iter__(self):
+        """(cle, valeur) des membres, (cle, élément) pour chaque élément d'un tableau"""
+        self._attendre('{')
+        if self._caractere() == '}':
+            return
+        self._pos -= 1
+        while True:
+            cle = self._valeur()
+            self._attendre(':')
+            if self._caractere() == '[':
+                if self._caractere() != ']':
+                    self._pos -= 1
+                    while True:
+                        yield cle, self._valeur()
+                        if self._attendre(',]') == ']':
+                            break
+            else:
+                self._pos -= 1
+                yield cle, self._valeur()
+            if self._attendre(',}') == '}':
+                return
+
+
+def lire_json_en_flux(chemin_json):
+    """Lit une sortie JSON en flux: (categorie, donnees), un enregistrement à la fois"""
+    with open(chemin_json, encoding='utf-8') as f:
+        yield from LecteurJSONEnFlux(f)
+
+
+def lire_sortie(chemin):
+    """Lit une sortie sauvegardée (NDJSON ou JSON) en flux: (categorie, donnees)"""
+    if chemin.endswith('.ndjson'):
+        return lire_ndjson(chemin)
+    return lire_json_en_flux(chemin)
+
+
+class EcrivainNDJSON:
+    """Écrit les enregistrements au fur et à mesure de l'extraction"""
+
+    def __init__(self, fichier_sortie, reprise=None):
+        """reprise: (position, nombre_lignes) d'un point de reprise; le fichier
+        est tronqué à cette position et complété"""
+        self.fichier_sortie = fichier_sortie
+        self.nombre_lignes = 0
+        self._lot = None
+        if reprise is not None:
+            position, self.nombre_lignes = reprise
+            os.truncate(fichier_sortie, position)
+            self._f = open(fichier_sortie, 'a', encoding='utf-8')
+        else:
+            self._f = open(fichier_sortie, 'w', encoding='utf-8')
+
+    def ecrire(self, categorie, donnees):
+        self._f.write(_json({'categorie': categorie, 'donnees': donnees}) + '\n')
+        self.nombre_lignes += 1
+
+    def commencer(self, categorie, debut, cle_liste):
+        """Commence un enregistrement dont la liste `cle_liste` sera écrite en flux"""
+        return EnregistrementEnFlux(self, categorie, debut, cle_liste)
+
+    def commencer_lot(self):
+        """Les lignes suivantes sont retenues jusqu'à valider_lot ou annuler_lot"""
+        self._lot = (self._f, self.nombre_lignes)
+        self._f = tempfile.TemporaryFile('w+', encoding='utf-8')
+
+    def valider_lot(self):
+        """Recopie les lignes du lot; retourne (position, nombre_lignes) après le lot"""
+        tampon = self._f
+        self._f = self._lot[0]
+        self._lot = None
+        tampon.seek(0)
+        shutil.copyfileobj(tampon, self._f)
+        tampon.close()
+        return self.position()
+
+    def position(self):
+        """(position dans le fichier, nombre de lignes) après les lignes écrites"""
+        self._f.flush()
+        return self._f.tell(), self.nombre_lignes
+
+    def annuler_lot(self):
+        """Abandonne les lignes écrites depuis commencer_lot"""
+        self._f.close()
+        self._f, self.nombre_lignes = self._lot
+        self._lot = None
+
+    def terminer(self, statistiques):
+        """Écrit les statistiques en dernière ligne et ferme le fichier"""
+        self.ecrire('statistiques', statistiques)
+        self.fermer()
+
+    def fermer(self):
+        if self._lot is not None:
+            self.annuler_lot()
+        if not self._f.closed:
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
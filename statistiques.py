@@ -0,0 +1,332 @@
+"""
+Statistiques des blocs calculées au fil de l'extraction
+Chaque définition et chaque instance n'est vue qu'une fois: les
+statistiques restent disponibles quand les enregistrements ne sont
+pas conservés en mémoire (sortie NDJSON en flux)
+Les blocs les plus utilisés comptent aussi les blocs imbriqués dans les
+définitions (voir hierarchie_blocs)
+Répartitions: instances par calque et bloc (nom effectif), entités des
+définitions par type, instances par espace; distributions (percentiles)
+des rotations et des échelles des instances, comptées par valeur. Une
+distribution garde au plus MAX_VALEURS valeurs distinctes: au-delà, ses
+valeurs sont arrondies à moins de chiffres significatifs (indiqués avec
+les percentiles) et leurs comptes fusionnés.
+Les mêmes statistiques se calculent sur une sortie sauvegardée
+(statistiques_sortie: JSON ou NDJSON lu en flux, statistiques_colonnes:
+export en colonnes)
+"""
+
+import math
+
+from hierarchie_blocs import HierarchieBlocs
+from sorties import lire_sortie
+
+# Percentiles des distributions (rang le plus proche)
+PERCENTILES = {'min': 0, 'p5': 5, 'p25': 25, 'mediane': 50, 'p75': 75, 'p95': 95, 'max': 100}
+
+# Décimales retenues pour compter les rotations (degrés) et les échelles par valeur
+DECIMALES = 6
+
+# Distributions des instances
+DISTRIBUTIONS = ('rotation_degres', 'echelle_x', 'echelle_y', 'echelle_z')
+
+# Valeurs distinctes comptées par distribution avant d'arrondir davantage
+MAX_VALEURS = 4096
+
+
+def percentiles(compte):
+    """Percentiles d'une distribution comptée par valeur: {valeur: nombre}"""
+    total = sum(compte.values())
+    if not total:
+        return None
+    valeurs = sorted(compte.items())
+    resultat = {}
+    for nom, p in PERCENTILES.items():
+        rang = max(1, math.ceil(p / 100 * total))
+        cumul = 0
+        for valeur, nombre in valeurs:
+            cumul += nombre
+            if cumul >= rang:
+                resultat[nom] = valeur
+                break
+    return resultat
+
+
+def _ajouter(compte, cle, nombre=1):
+    compte[cle] = compte.get(cle, 0) + nombre
+
+
+def _arrondir(valeur, chiffres):
+    """Valeur arrondie à `chiffres` chiffres significatifs"""
+    return float(f"{valeur:.{chiffres}g}")
+
+
+class Distribution:
+    """Compte {valeur: nombre} de taille bornée
+    chiffres: chiffres significatifs des valeurs (None: DECIMALES décimales);
+    le minimum et le maximum restent exacts"""
+
+    def __init__(self, compte=None, chiffres=None, extremes=None):
+        self.compte = compte if compte is not None else {}
+        self.chiffres = chiffres
+        self.extremes = extremes
+
+    def ajouter(self, valeur):
+        valeur = round(valeur, DECIMALES)
+        if self.extremes is None:
+            self.extremes = (valeur, valeur)
+        elif not self.extremes[0] <= valeur <= self.extremes[1]:
+            self.extremes = (min(self.extremes[0], valeur), max(self.extremes[1], valeur))
+        if self.chiffres is not None:
+            valeur = _arrondir(valeur, self.chiffres)
+        _ajouter(self.compte, valeur)
+        if len(self.compte) > MAX_VALEURS:
+            self._reduire()
+
+    def _reduire(self):
+        """Retire des chiffres significatifs jusqu'à revenir à MAX_VALEURS
+        valeurs (un seul chiffre au minimum)"""
+        chiffres = self.chiffres or 8
+        while len(self.compte) > MAX_VALEURS and chiffres > 1:
+            chiffres -= 1
+            compte = {}
+            for valeur, nombre in self.compte.items():
+                _ajouter(compte, _arrondir(valeur, chiffres), nombre)
+            self.compte = compte
+        self.chiffres = chiffres
+
+    def percentiles(self):
+        resultat = percentiles(self.compte)
+        if resultat is not None and self.chiffres is not None:
+            resultat['min'], resultat['max'] = self.extremes
+            resultat['chiffres_significatifs'] = self.chiffres
+        return resultat
+
+    def etat(self):
+        # Valeurs en chaînes: clés d'objet JSON
+        return {'chiffres': self.chiffres, 'extremes': self.extremes,
+                'compte': {repr(valeur): nombre for valeur, nombre in self.compte.items()}}
+
+    @classmethod
+    def depuis_etat(cls, etat):
+        if not isinstance(etat.get('compte'), dict):
+            # Point de reprise antérieur: compte seul
+            etat = {'compte': etat}
+        compte = {float(valeur): nombre for valeur, nombre in etat['compte'].items()}
+        extremes = etat.get('extremes')
+        if extremes is None and compte:
+            extremes = (min(compte), max(compte))
+        return cls(compte, etat.get('chiffres'), tuple(extremes) if extremes else None)
+
+
+class AccumulateurStatistiques:
+    """Cumule les statistiques des définitions et des instances"""
+
+    def __init__(self):
+        self.total_defs = 0
+        self.defs_dynamiques = 0
+        self.defs_xref = 0
+        self.defs_avec_attributs = 0
+
+        self.total_instances = 0
+        self.instances_par_espace = {'ModelSpace': 0, 'PaperSpace': 0}
+        self.instances_dynamiques = 0
+        self.utilisation_blocs = {}
+        self.calques_blocs = set()
+
+        # Hiérarchie: références imbriquées par définition et instances par nom effectif
+        self.references_blocs = {}
+        self.instances_effectives = {}
+
+        # Répartitions et distributions
+        self.calques_par_bloc = {}
+        self.types_entites = {}
+        self.distributions = {nom: Distribution() for nom in DISTRIBUTIONS}
+
+    def ajouter_definition(self, bloc_def):
+        self.total_defs += 1
+        if bloc_def['est_dynamique']:
+            self.defs_dynamiques += 1
+        if bloc_def['est_xref']:
+            self.defs_xref += 1
+        if bloc_def['nombre_attributs'] > 0:
+            self.defs_avec_attributs += 1
+        if bloc_def.get('references_imbriquees'):
+            self.references_blocs[bloc_def['nom']] = dict(bloc_def['references_imbriquees'])
+        for obj_type, nombre in bloc_def.get('types_entites', {}).items():
+            _ajouter(self.types_entites, obj_type, nombre)
+
+    def ajouter_instance(self, instance):
+        if isinstance(instance, dict):
+            espace, est_dynamique = instance['espace'], instance['est_dynamique']
+            nom, nom_effectif = instance['nom_bloc'], instance.get('nom_effectif')
+            calque, rotation = instance['calque'], instance['rotation']
+            echelle = instance['echelle']
+            echelles = (echelle['x'], echelle['y'], echelle['z'])
+        else:
+            # Enregistrement compact: champs lus directement, sans dictionnaire x/y/z
+            espace, est_dynamique = instance.espace, instance.est_dynamique
+            nom, nom_effectif = instance.nom_bloc, getattr(instance, 'nom_effectif', None)
+            calque, rotation, echelles = instance.calque, instance.rotation, instance.echelles
+
+        self.total_instances += 1
+        self.instances_par_espace[espace] = self.instances_par_espace.get(espace, 0) + 1
+        if est_dynamique:
+            self.instances_dynamiques += 1
+
+        self.utilisation_blocs[nom] = self.utilisation_blocs.get(nom, 0) + 1
+        nom_effectif = nom_effectif or nom
+        self.instances_effectives[nom_effectif] = self.instances_effectives.get(nom_effectif, 0) + 1
+
+        if calque:
+            self.calques_blocs.add(calque)
+        _ajouter(self.calques_par_bloc.setdefault(calque, {}), nom_effectif)
+
+        distributions = self.distributions
+        distributions['rotation_degres'].ajouter(math.degrees(rotation))
+        distributions['echelle_x'].ajouter(echelles[0])
+        distributions['echelle_y'].ajouter(echelles[1])
+        distributions['echelle_z'].ajouter(echelles[2])
+
+    def etat(self):
+        """Copie de l'état du cumul (sérialisable en JSON), pour un point de reprise"""
+        etat = dict(vars(self))
+        etat['instances_par_espace'] = dict(self.instances_par_espace)
+        etat['utilisation_blocs'] = dict(self.utilisation_blocs)
+        etat['calques_blocs'] = sorted(self.calques_blocs)
+        etat['references_blocs'] = {nom: dict(refs) for nom, refs in self.references_blocs.items()}
+        etat['instances_effectives'] = dict(self.instances_effectives)
+        etat['calques_par_bloc'] = {calque: dict(blocs) for calque, blocs in self.calques_par_bloc.items()}
+        etat['types_entites'] = dict(self.types_entites)
+        etat['distributions'] = {nom: distribution.etat() for nom, distribution in self.distributions.items()}
+        return etat
+
+    def restaurer(self, etat):
+        """Revient à un état obtenu par etat()"""
+        for cle, valeur in etat.items():
+            setattr(self, cle, valeur)
+        self.instances_par_espace = dict(etat['instances_par_espace'])
+        self.utilisation_blocs = dict(etat['utilisation_blocs'])
+        self.calques_blocs = set(etat['calques_blocs'])
+        self.references_blocs = {nom: dict(refs) for nom, refs in etat.get('references_blocs', {}).items()}
+        self.instances_effectives = dict(etat.get('instances_effectives', {}))
+        self.calques_par_bloc = {calque: dict(blocs) for calque, blocs in etat.get('calques_par_bloc', {}).items()}
+        self.types_entites = dict(etat.get('types_entites', {}))
+        distributions = etat.get('distributions', {})
+        self.distributions = {nom: Distribution.depuis_etat(distributions.get(nom, {}))
+                              for nom in DISTRIBUTIONS}
+
+    def resultat(self):
+        """Statistiques au format de blocs_info['statistiques']"""
+        # Blocs les plus utilisés, blocs imbriqués compris
+        hierarchie = HierarchieBlocs(self.references_blocs)
+        utilisation = hierarchie.utilisation_effective(self.instances_effectives)
+        top_blocs = sorted(utilisation.items(), key=lambda x: x[1], reverse=True)[:10]
+        top_directs = sorted(self.utilisation_blocs.items(), key=lambda x: x[1], reverse=True)[:10]
+
+        return {
+            'definitions': {
+                'total': self.total_defs,
+                'dynamiques': self.defs_dynamiques,
+                'xref': self.defs_xref,
+                'avec_attributs': self.defs_avec_attributs
+            },
+            'instances': {
+                'total': self.total_instances,
+                'modelspace': self.instances_par_espace['ModelSpace'],
+                'paperspace': self.instances_par_espace['PaperSpace'],
+                'dynamiques': self.instances_dynamiques
+            },
+            'top_10_blocs_utilises': [{'nom': nom, 'nombre': count} for nom, count in top_blocs],
+            'top_10_blocs_instancies': [{'nom': nom, 'nombre': count} for nom, count in top_directs],
+            'hierarchie': {
+                'blocs_avec_imbrication': len(self.references_blocs),
+                'profondeur_max': max((hierarchie.profondeur(nom) for nom in self.references_blocs), default=0)
+            },
+            'nombre_calques_utilises': len(self.calques_blocs),
+            'calques_utilises': sorted(self.calques_blocs),
+            'repartition': {
+                'espaces': dict(self.instances_par_espace),
+                'calques_blocs': {calque: dict(sorted(blocs.items(), key=lambda x: x[1], reverse=True))
+                                  for calque, blocs in sorted(self.calques_par_bloc.items(), key=lambda x: str(x[0]))},
+                'types_entites': dict(sorted(self.types_entites.items(), key=lambda x: x[1], reverse=True))
+            },
+            'distributions': {nom: distribution.percentiles() for nom, distribution in self.distributions.items()}
+        }
+
+
+def statistiques_sortie(chemin):
+    """Statistiques d'une sortie sauvegardée (*_blocs.json ou NDJSON),
+    recalculées en un passage sur ses enregistrements lus en flux"""
+    accumulateur = AccumulateurStatistiques()
+    for categorie, donnees in lire_sortie(chemin):
+        if categorie == 'definitions_blocs':
+            accumulateur.ajouter_definition(donnees)
+        elif categorie == 'instances_blocs':
+            accumulateur.ajouter_instance(donnees)
+    return accumulateur.resultat()
+
+
+def statistiques_colonnes(dossier):
+    """Statistiques des instances d'un export en colonnes, calculées sur les
+    tableaux numpy (les en-têtes des définitions ne sont pas exportés en
+    colonnes: seules les entités par type en sont reprises)"""
+    import numpy as np
+    from export_colonnes import charger_colonnes
+
+    tables, dictionnaires = charger_colonnes(dossier)
+    instances = tables['instances']
+    noms, calques, espaces = dictionnaires['nom_bloc'], dictionnaires['calque'], dictionnaires['espace']
+    total = len(instances['nom_bloc'])
+
+    def compter(codes, valeurs):
+        codes = np.asarray(codes)
+        comptes = np.bincount(codes[codes >= 0], minlength=len(valeurs))
+        return {valeurs[code]: int(n) for code, n in enumerate(comptes.tolist()) if n}
+
+    def distribution(colonne):
+        if not total:
+            return None
+        valeurs = np.round(np.asarray(colonne, dtype=float), DECIMALES)
+        rangs = list(PERCENTILES.values())
+        resultats = np.percentile(valeurs, rangs, method='inverted_cdf')
+        return dict(zip(PERCENTILES, resultats.tolist()))
+
+    nom_effectif = instances.get('nom_effectif', instances['nom_bloc'])
+    par_espace = compter(instances['espace'], espaces)
+    utilisation = compter(instances['nom_bloc'], noms)
+    top_directs = sorted(utilisation.items(), key=lambda x: x[1], reverse=True)[:10]
+
+    # Calque x bloc: paires codées en un entier
+    calques_par_bloc = {}
+    code_calque = np.asarray(instances['calque']).astype(np.int64)
+    paires, comptes = np.unique(code_calque * len(noms) + np.asarray(nom_effectif), return_counts=True)
+    for paire, n in zip(paires.tolist(), comptes.tolist()):
+        code, bloc = divmod(paire, len(noms))
+        _ajouter(calques_par_bloc.setdefault(calques[code] if code >= 0 else None, {}), noms[bloc], n)
+
+    calques_utilises = sorted(calque for calque in calques_par_bloc if calque)
+    return {
+        'instances': {
+            'total': total,
+            'modelspace': par_espace.get('ModelSpace', 0),
+            'paperspace': par_espace.get('PaperSpace', 0),
+            'dynamiques': int(np.count_nonzero(instances['est_dynamique']))
+        },
+        'top_10_blocs_instancies': [{'nom': nom, 'nombre': count} for nom, count in top_directs],
+        'nombre_calques_utilises': len(calques_utilises),
+        'calques_utilises': calques_utilises,
+        'repartition': {
+            'espaces': par_espace,
+            'calques_blocs': {calque: dict(sorted(blocs.items(), key=lambda x: x[1], reverse=True))
+                              for calque, blocs in sorted(calques_par_bloc.items(), key=lambda x: str(x[0]))},
+            'types_entites': dict(sorted(compter(tables['entites']['type'], dictionnaires['type']).items(),
+                                         key=lambda x: x[1], reverse=True))
+        },
+        'distributions': {
+            'rotation_degres': distribution(np.degrees(instances['rotation'])),
+            'echelle_x': distribution(instances['echelle_x']),
+            'echelle_y': distribution(instances['echelle_y']),
+            'echelle_z': distribution(instances['echelle_z'])
+        }
+    }
@@ -0,0 +1,204 @@
+"""
+Surveillance des délais des appels COM pendant l'extraction
+Un appel COM bloqué (boîte de dialogue modale, AutoCAD figé) ne peut pas
+être interrompu depuis Python: l'extraction reste dans son thread (les
+objets COM y sont liés) et un thread de surveillance mesure le temps
+écoulé depuis le dernier signe d'activité (appel par l'accesseur, entité
+suivante du parcours).
+- appel plus long que délai 'appel': dépassement relevé, l'entité en
+  cours est ignorée quand l'appel rend la main
+- appel toujours bloqué après 'blocage', phase plus longue que son délai
+  ou plus de 'max_depassements' dépassements (disjoncteur): le document
+  est abandonné et le backend est interrompu (arrêt du processus AutoCAD
+  démarré par la session) pour débloquer l'appel en cours
+"""
+
+import threading
+import time
+
+DELAIS_PAR_DEFAUT = {
+    'appel': 30.0,            # durée max d'un appel COM (s)
+    'blocage': 300.0,         # appel toujours sans réponse: abandon du document
+    'phases': {               # durée max de chaque phase (s)
+        'ouverture': 600.0,
+        'extraction': 3600.0,
+    },
+    'max_depassements': 20,   # disjoncteur
+    'intervalle': 0.5,        # période de contrôle du thread de surveillance
+}
+
+
+class DelaiDepasse(TimeoutError):
+    """Appel COM revenu après son délai: l'entité en cours est ignorée"""
+
+
+class DocumentAbandonne(Exception):
+    """Trop de dépassements ou appel bloqué: extraction du document abandonnée"""
+
+
+def fusionner_delais(delais=None):
+    """Délais par défaut complétés par ceux fournis"""
+    resultat = dict(DELAIS_PAR_DEFAUT)
+    resultat['phases'] = dict(DELAIS_PAR_DEFAUT['phases'])
+    for cle, valeur in (delais or {}).items():
+        if cle == 'phases':
+            resultat['phases'].update(valeur)
+        else:
+            resultat[cle] = valeur
+    return resultat
+
+
+class Surveillant:
+    """Délais par appel et par phase, avec disjoncteur"""
+
+    def __init__(self, delais=None, interrompre=None):
+        self.delais = fusionner_delais(delais)
+        self.interrompre = interrompre
+        self.depassements = []
+        self.entites_ignorees = []
+        self.abandon = None
+        self.durees_phases = {}
+
+        self._verrou = threading.Lock()
+        self._arret = threading.Event()
+        self._thread = None
+        self._phase = None
+        self._debut_phase = None
+        self._dernier_signe = time.monotonic()
+        self._activite = None
+        self._entite = None
+        self._entite_en_depassement = False
+        self._depassement_signale = False
+
+    # Signes d'activité (thread d'extraction)
+
+    def signe(self, activite):
+        """Appelé avant chaque appel COM"""
+        self._verifier()
+        if self._entite_en_depassement:
+            # Les appels restants de l'entité en dépassement ne sont pas faits
+            raise DelaiDepasse(f"{self._entite}: délai dépassé")
+        with self._verrou:
+            self._dernier_signe = time.monotonic()
+            self._activite = activite
+            self._depassement_signale = False
+
+    def entite(self, bloc, index):
+        """Appelé avant chaque entité du parcours"""
+        self._verifier()
+        with self._verrou:
+            if self._entite_en_depassement:
+                self.entites_ignorees.append(self._entite)
+            self._entite = {'bloc': bloc, 'index': index}
+            self._entite_en_depassement = False
+            self._dernier_signe = time.monotonic()
+            self._activite = None
+            self._depassement_signale = False
+
+    def entite_en_depassement(self):
+        """Vrai si l'entité en cours a subi un dépassement (enregistrement à écarter)"""
+        return self._entite_en_depassement
+
+    def _verifier(self):
+        if self.abandon is not None:
+            raise DocumentAbandonne(self.abandon)
+
+    def phase(self, nom):
+        return _Phase(self, nom)
+
+    # Thread de surveillance
+
+    def _controler(self):
+        maintenant = time.monotonic()
+        with self._verrou:
+            if self._phase is None:
+                return None
+            # Délai par appel dès le premier signe d'activité de la phase
+            # (l'ouverture du document n'a que son délai de phase)
+            actif = self._activite is not None or self._entite is not None
+            silence = maintenant - self._dernier_signe
+            if actif and silence > self.delais['appel'] and not self._depassement_signale:
+                self._depassement_signale = True
+                self._entite_en_depassement = True
+                self.depassements.append({
+                    'phase': self._phase,
+                    'entite': self._entite,
+                    'appel': self._activite,
+                    'delai_s': self.delais['appel']
+                })
+                if len(self.depassements) > self.delais['max_depassements']:
+                    return f"{len(self.depassements)} appels COM hors délai (disjoncteur)"
+            if self._depassement_signale and silence > self.delais['blocage']:
+                return f"appel {self._activite} bloqué depuis plus de {self.delais['blocage']} s"
+            delai_phase = self.delais['phases'].get(self._phase)
+            if delai_phase is not None and self._debut_phase is not None \
+                    and maintenant - self._debut_phase > delai_phase:
+                return f"phase {self._phase} plus longue que {delai_phase} s"
+        return None
+
+    def _surveiller(self):
+        while not self._arret.wait(self.delais['intervalle']):
+            raison = self._controler()
+            if raison is not None:
+                self.abandon = raison
+                if self.interrompre is not None:
+                    try:
+                        self.interrompre()
+                    except Exception:
+                        pass
+                return
+
+    def demarrer(self):
+        self._thread = threading.Thread(target=self._surveiller, name='surveillance-com', daemon=True)
+        self._thread.start()
+        return self
+
+    def arreter(self):
+        self._arret.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._entite_en_depassement and self._entite not in self.entites_ignorees:
+            self.entites_ignorees.append(self._entite)
+
+    def __enter__(self):
+        return self.demarrer()
+
+    def __exit__(self, *exc):
+        self.arreter()
+
+    def rapport(self):
+        return {
+            'delais': self.delais,
+            'depassements': self.depassements,
+            'entites_ignorees': self.entites_ignorees,
+            'abandon': self.abandon,
+            'durees_phases': self.durees_phases
+        }
+
+
+class _Phase:
+    """Phase surveillée (ouverture, extraction, ...)"""
+
+    def __init__(self, surveillant, nom):
+        self.surveillant = surveillant
+        self.nom = nom
+
+    def __enter__(self):
+        s = self.surveillant
+        s._verifier()
+        with s._verrou:
+            s._phase = self.nom
+            s._debut_phase = s._dernier_signe = time.monotonic()
+            s._activite = None
+            s._entite = None
+            s._entite_en_depassement = False
+            s._depassement_signale = False
+        return self
+
+    def __exit__(self, *exc):
+        s = self.surveillant
+        with s._verrou:
+            s.durees_phases[self.nom] = round(time.monotonic() - s._debut_phase, 3)
+            s._phase = None
+            s._debut_phase = None
@@ -0,0 +1,363 @@
+"""
+Vérifications automatiques de ExtracteurBlocs sur le modèle AutoCAD simulé
+Usage: python verifications_simulees.py [noms des vérifications]
+Code de sortie 1 si une vérification échoue.
+- appels_com: appels COM du motif hasattr contre l'accesseur à plans
+- incremental: une erreur COM passagère pendant la ré-extraction
+  incrémentale ne supprime rien de l'index; d'autres réglages relisent
+  le fichier inchangé
+- index_spatial: une instance isolée loin du dessin ne grossit pas les
+  cellules de la grille, requêtes identiques à une recherche exhaustive
+- selection: jeu de sélection filtré par AutoCAD et filtre Python, même
+  résultat
+- session: une application pour plusieurs dessins, attente du chargement,
+  documents refermés
+- surveillance: appel lent (entité ignorée, y compris des attributs de sa
+  définition), appel bloqué (abandon), disjoncteur, délai de phase
+"""
+
+import os
+import sys
+import math
+import random
+import time
+import tempfile
+import traceback
+import contextlib
+
+from acad_simule import (CompteurAppels, BackendSimule, BlocageSimule, bloquer, generer_dessin,
+                         reference_simulee, attribut_simule, ApplicationSimulee, ErreurCOMSimulee)
+from acces_com import AccesseurCOM, PlanProprietes
+from index_spatial import IndexSpatial, _distance_boite
+from backends import BackendAutoCAD
+from session_autocad import SessionAutoCAD, DelaiChargementDepasse, attendre_disponibilite
+from ReadBlocDWG import ExtracteurBlocs
+
+# Délais courts: les blocages simulés durent quelques dixièmes de seconde
+DELAIS_COURTS = {'appel': 0.15, 'blocage': 5.0, 'intervalle': 0.02}
+
+
+def _dessin(**options):
+    parametres = dict(definitions=10, instances=200, part_dynamiques=0.5)
+    parametres.update(options)
+    return generer_dessin(CompteurAppels(), **parametres)
+
+
+def _references(document):
+    model = document._membres['ModelSpace']
+    return [e for e in model._elements if e._membres['ObjectName'] == 'AcDbBlockReference']
+
+
+def _bloc(document, nom):
+    return next(b for b in document._membres['Blocks']._elements if b._membres['Name'] == nom)
+
+
+def _extraire(document, blocage=None, delais=None, backend=None, chemin='simule.dwg', **options):
+    """Extraction complète du dessin simulé, sans affichage: (réussie, extracteur)"""
+    backend = backend if backend is not None else BackendSimule(document, blocage)
+    extracteur = ExtracteurBlocs(chemin, backend=backend, delais=delais, **options)
+    with open(os.devnull, 'w', encoding='utf-8') as muet, contextlib.redirect_stdout(muet):
+        ok = extracteur.extraire_tout()
+    return ok, extracteur
+
+
+def _extraire_references(document, **options):
+    """Instances et blocs dynamiques seuls (parcours des références, où le
+    jeu de sélection s'applique)"""
+    extracteur = ExtracteurBlocs('simule.dwg', backend=BackendSimule(document), **options)
+    extracteur.doc = document
+    with open(os.devnull, 'w', encoding='utf-8') as muet, contextlib.redirect_stdout(muet):
+        extracteur.extraire_instances_blocs()
+        extracteur.extraire_blocs_dynamiques()
+    return extracteur
+
+
+def verifier_appels_com():
+    """Six propriétés de 100 références: hasattr puis lecture contre un plan par type"""
+    compteur = CompteurAppels()
+    references = [
+        reference_simulee(compteur, 'Porte', (i, 0.0, 0.0),
+                          attributs=[attribut_simule(compteur, 'NUM', str(i))])
+        for i in range(100)
+    ]
+    champs = ('Color', 'Linetype', 'Lineweight', 'Visible', 'Handle', 'Thickness')
+
+    compteur.remettre_a_zero()
+    valeurs_hasattr = [[getattr(entity, nom) if hasattr(entity, nom) else None for nom in champs]
+                       for entity in references]
+    appels_hasattr = compteur.total
+
+    compteur.remettre_a_zero()
+    acces = AccesseurCOM()
+    plan = PlanProprietes(optionnels=[(nom.lower(), nom) for nom in champs])
+    valeurs_plan = [acces.lire_plan(entity, 'AcDbBlockReference', plan) for entity in references]
+    appels_plan = compteur.total
+
+    # hasattr: recherche + invocation deux fois par champ (Thickness absent: une
+    # recherche); accesseur: DISPID résolus une fois, un appel par champ connu
+    assert appels_hasattr == 2100, appels_hasattr
+    assert appels_plan == 506, appels_plan
+    assert all(valeur == plan_lu[nom.lower()]
+               for valeurs, plan_lu in zip(valeurs_hasattr, valeurs_plan)
+               for nom, valeur in zip(champs, valeurs))
+
+
+def _panne_item(collection, apres):
+    """Item de la collection en erreur COM après `apres` appels; rétablit Item"""
+    item = collection._membres['Item']
+    appels = [0]
+
+    def item_en_panne(index):
+        appels[0] += 1
+        if appels[0] > apres:
+            raise ErreurCOMSimulee("Appel rejeté")
+        return item(index)
+
+    collection._membres['Item'] = item_en_panne
+    return lambda: collection._membres.__setitem__('Item', item)
+
+
+def verifier_incremental():
+    """Ré-extraction incrémentale interrompue par des erreurs COM: rien
+    n'est supprimé, le dessin est relu entièrement ensuite"""
+    document = _dessin()
+    descripteur, chemin = tempfile.mkstemp(suffix='.dwg')
+    os.close(descripteur)
+    index = chemin + '.sqlite'
+
+    def reextraire(marque, **options):
+        # Contenu du fichier modifié: l'empreinte change, le dessin est rouvert
+        with open(chemin, 'ab') as f:
+            f.write(marque)
+        extracteur = ExtracteurBlocs(chemin, backend=BackendSimule(document), **options)
+        with open(os.devnull, 'w', encoding='utf-8') as muet, contextlib.redirect_stdout(muet):
+            assert extracteur.extraire_incremental(index)
+        return extracteur.blocs_info['modifications'], extracteur
+
+    try:
+        _, initial = reextraire(b'1')
+        attendu = {categorie: len(initial.blocs_info[categorie])
+                   for categorie in ('definitions_blocs', 'instances_blocs', 'blocs_dynamiques')}
+
+        # ModelSpace en panne après 100 entités
+        retablir = _panne_item(document._membres['ModelSpace'], 100)
+        modifications, extracteur = reextraire(b'2')
+        retablir()
+        assert modifications['blocs_incomplets'] == ['*Model_Space']
+        for categorie, nombre in attendu.items():
+            assert not modifications[categorie]['supprimes'], categorie
+            assert len(extracteur.blocs_info[categorie]) == nombre, categorie
+
+        # Définition en panne: son enregistrement est gardé tel quel
+        definition = _bloc(document, 'Bloc_0002')
+        avant = next(d for d in initial.blocs_info['definitions_blocs'] if d['nom'] == 'Bloc_0002')
+        definition._elements.append(definition._elements[0])
+        definition._membres['Count'] += 1
+        retablir = _panne_item(definition, 3)
+        modifications, extracteur = reextraire(b'3')
+        retablir()
+        assert 'Bloc_0002' in modifications['blocs_incomplets']
+        apres = next(d for d in extracteur.blocs_info['definitions_blocs'] if d['nom'] == 'Bloc_0002')
+        assert len(apres['entites_contenues']) == len(avant['entites_contenues'])
+
+        # Fichier inchangé mais dernier parcours incomplet: relu, sans rien ajouter
+        modifications, extracteur = reextraire(b'')
+        assert not modifications['blocs_incomplets']
+        assert modifications['definitions_blocs']['modifies'] == ['Bloc_0002']
+        assert not modifications['instances_blocs']['ajoutes']
+        assert not modifications['instances_blocs']['supprimes']
+        apres = next(d for d in extracteur.blocs_info['definitions_blocs'] if d['nom'] == 'Bloc_0002')
+        assert len(apres['entites_contenues']) == len(avant['entites_contenues']) + 1
+
+        # Fichier inchangé, autre filtre: relu avec ce filtre
+        modifications, extracteur = reextraire(b'', filtre_references={'calques': ['Calque_0']})
+        instances = extracteur.blocs_info['instances_blocs']
+        assert 0 < len(instances) < attendu['instances_blocs']
+        assert {instance['calque'] for instance in instances} == {'Calque_0'}
+        assert modifications['instances_blocs']['ajoutes']
+
+        # Réglages d'origine: l'index du dessin sans filtre est toujours valable
+        modifications, extracteur = reextraire(b'')
+        assert modifications['instances_blocs']['inchanges'] == attendu['instances_blocs']
+        assert len(extracteur.blocs_info['instances_blocs']) == attendu['instances_blocs']
+    finally:
+        for fichier in (chemin, index):
+            if os.path.exists(fichier):
+                os.remove(fichier)
+
+
+def verifier_index_spatial():
+    """Grille de 20 000 petites instances et d'une instance isolée très loin:
+    cellules à l'échelle des instances, requêtes exactes"""
+    aleatoire = random.Random(7)
+    boites, positions = [], []
+    for _ in range(20000):
+        x, y = aleatoire.uniform(0, 1000), aleatoire.uniform(0, 1000)
+        boites.append((x, y, x + 2, y + 2))
+        positions.append((x, y))
+    boites.append((1e8, 1e8, 1e8 + 2, 1e8 + 2))
+    positions.append((1e8, 1e8))
+    index = IndexSpatial(boites, positions)
+    # Sans l'isolée: environ sqrt(1000² / 20000) = 7
+    assert index.taille < 20, index.taille
+    assert len(index.cellules) > 5000, len(index.cellules)
+
+    for x, y, cote in ((100, 100, 30), (500, 20, 5), (990, 990, 50), (1e8 - 1, 1e8 - 1, 5)):
+        attendu = [i for i, b in enumerate(boites)
+                   if b[0] <= x + cote and x <= b[2] and b[1] <= y + cote and y <= b[3]]
+        assert index.fenetre(x, y, x + cote, y + cote) == attendu, (x, y)
+
+    for x, y in ((500, 500), (1e8, 1e8), (5e7, 5e7), (-1e6, 0)):
+        trouves = [distance for distance, _ in index.plus_proches(x, y, 3)]
+        attendu = sorted(_distance_boite(x, y, b) for b in boites)[:3]
+        assert all(math.isclose(a, b) for a, b in zip(trouves, attendu)), (x, y, trouves, attendu)
+
+
+def verifier_selection():
+    """Références filtrées: mêmes instances avec ou sans jeu de sélection,
+    moins d'appels COM avec"""
+    compteur = CompteurAppels()
+    document = generer_dessin(compteur, definitions=20, instances=300, part_dynamiques=0.3)
+    # Bloc dynamique modifié: la référence prend un nom anonyme *U
+    anonyme = next(r for r in _references(document) if r._membres['IsDynamicBlock'])
+    anonyme._membres['Name'] = '*U12'
+    filtres = [None, {'calques': ['Calque_3', 'calque_5']},
+               {'noms': [anonyme._membres['EffectiveName'], 'Bloc_0001']},
+               {'calques': ['Calque_1'], 'noms': ['Bloc_0002', 'Bloc_0004']}]
+    for filtre in filtres:
+        resultats = {}
+        for serveur in (False, True):
+            compteur.remettre_a_zero()
+            extracteur = _extraire_references(document, filtre_references=filtre, selection_serveur=serveur)
+            instances = sorted((i.en_dict() for i in extracteur.blocs_info['instances_blocs']),
+                               key=lambda i: i['handle'])
+            dynamiques = sorted(extracteur.blocs_info['blocs_dynamiques'], key=lambda b: b['handle'])
+            resultats[serveur] = ((instances, dynamiques), compteur.total)
+        (python, appels_python), (serveur, appels_serveur) = resultats[False], resultats[True]
+        assert python == serveur, f"résultats différents avec le filtre {filtre}"
+        assert appels_serveur < appels_python, (filtre, appels_serveur, appels_python)
+    extracteur = _extraire_references(document, filtre_references=filtres[2], selection_serveur=True)
+    assert any(i['nom_bloc'] == '*U12' for i in extracteur.blocs_info['instances_blocs'])
+
+
+def verifier_session():
+    """Session AutoCAD sur une application simulée qui met 0,2 s à charger"""
+    document = _dessin()
+    application = ApplicationSimulee(CompteurAppels(), document, duree_chargement=0.2)
+    session = SessionAutoCAD(application)
+    backend = BackendAutoCAD(session=session)
+    descripteur, chemin = tempfile.mkstemp(suffix='.dwg')
+    os.close(descripteur)
+    try:
+        for _ in range(3):
+            debut = time.perf_counter()
+            ok, extracteur = _extraire(document, backend=backend, chemin=chemin)
+            duree = time.perf_counter() - debut
+            assert ok and extracteur.nombre_extraits['instances_blocs'] == 200
+            # Attente réglée sur le chargement, pas sur une pause fixe
+            assert 0.2 <= duree < 1.5, duree
+            assert session.essais_derniere_ouverture > 1
+        assert len(application.ouvertures) == 3 and application.documents_ouverts == 0
+        assert not session.documents
+        session.fermer()
+        # Application rejointe (non démarrée par la session): laissée ouverte
+        assert not application.quittee
+
+        lente = ApplicationSimulee(CompteurAppels(), document, duree_chargement=5.0)
+        try:
+            SessionAutoCAD(lente, delai_chargement=0.3).ouvrir(chemin)
+        except DelaiChargementDepasse:
+            pass
+        else:
+            raise AssertionError("délai de chargement non signalé")
+    finally:
+        os.remove(chemin)
+
+    # Temporisation croissante, plafonnée à attente_max (horloge simulée)
+    pauses, horloge = [], [0.0]
+
+    def pause(duree):
+        pauses.append(duree)
+        horloge[0] += duree
+
+    attendre_disponibilite(lambda: horloge[0] > 5, horloge=lambda: horloge[0], pause=pause)
+    assert pauses[0] == 0.05 and max(pauses) == 1.0
+    assert all(a <= b for a, b in zip(pauses, pauses[1:]))
+
+
+def verifier_surveillance():
+    """Délais des appels COM: ignorer, disjoncteur, abandon"""
+    # Sans blocage: aucun dépassement, même résultat que sans surveillance
+    ok, surveille = _extraire(_dessin(), delais=DELAIS_COURTS)
+    _, libre = _extraire(_dessin())
+    assert ok and not surveille.blocs_info['surveillance']['depassements']
+    assert surveille.nombre_extraits == libre.nombre_extraits
+
+    # Appels lents qui finissent par répondre: seules ces entités sont ignorées
+    document, blocage = _dessin(), BlocageSimule()
+    dynamiques = [r for r in _references(document) if r._membres['IsDynamicBlock']]
+    for reference in dynamiques[:3]:
+        bloquer(reference, 'GetDynamicBlockProperties', blocage, 0.4)
+    definition = _bloc(document, 'Bloc_0003')
+    attribut = next(e for e in definition._elements if e._membres['ObjectName'] == 'AcDbAttributeDefinition')
+    bloquer(attribut, 'PromptString', blocage, 0.4)
+    ok, extracteur = _extraire(document, blocage, DELAIS_COURTS)
+    rapport = extracteur.blocs_info['surveillance']
+    assert ok and rapport['abandon'] is None
+    assert len(rapport['depassements']) == 4 and len(rapport['entites_ignorees']) == 4
+    assert extracteur.nombre_extraits['blocs_dynamiques'] == libre.nombre_extraits['blocs_dynamiques'] - 3
+    bloc_def = next(d for d in extracteur.blocs_info['definitions_blocs'] if d['nom'] == 'Bloc_0003')
+    assert not bloc_def['attributs'], "attribut ignoré encore présent dans la définition"
+    assert all(e['type'] != 'AcDbAttributeDefinition' for e in bloc_def['entites_contenues'])
+
+    # Appel sans réponse: document abandonné après 'blocage', backend interrompu
+    document, blocage = _dessin(), BlocageSimule()
+    bloquer(_references(document)[5], 'InsertionPoint', blocage)
+    debut = time.perf_counter()
+    ok, extracteur = _extraire(document, blocage, dict(DELAIS_COURTS, appel=0.1, blocage=0.5))
+    assert not ok and extracteur.blocs_info['surveillance']['abandon']
+    assert time.perf_counter() - debut < 5, "l'appel bloqué n'a pas été interrompu"
+
+    # Disjoncteur: trop de dépassements
+    document, blocage = _dessin(), BlocageSimule()
+    for reference in _references(document)[:10]:
+        bloquer(reference, 'Rotation', blocage, 0.2)
+    ok, extracteur = _extraire(document, blocage, dict(DELAIS_COURTS, appel=0.05, max_depassements=3))
+    assert not ok and 'disjoncteur' in extracteur.erreur
+
+    # Phase d'extraction plus longue que son délai
+    document, blocage = _dessin(), BlocageSimule()
+    for reference in _references(document)[:50]:
+        bloquer(reference, 'Layer', blocage, 0.03)
+    ok, extracteur = _extraire(document, blocage, dict(DELAIS_COURTS, appel=1.0, phases={'extraction': 0.3}))
+    assert not ok and 'extraction' in extracteur.erreur
+
+
+VERIFICATIONS = {
+    'appels_com': verifier_appels_com,
+    'incremental': verifier_incremental,
+    'index_spatial': verifier_index_spatial,
+    'selection': verifier_selection,
+    'session': verifier_session,
+    'surveillance': verifier_surveillance,
+}
+
+
+def main(argv=None):
+    noms = (argv if argv is not None else sys.argv[1:]) or list(VERIFICATIONS)
+    echecs = 0
+    for nom in noms:
+        debut = time.perf_counter()
+        try:
+            VERIFICATIONS[nom]()
+        except Exception:
+            echecs += 1
+            print(f"❌ {nom}")
+            traceback.print_exc()
+        else:
+            print(f"✓ {nom} ({time.perf_counter() - debut:.2f} s)")
+    return 1 if echecs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+Résolution des références externes (xrefs) des dessins
+Le fichier d'une xref est cherché comme le fait AutoCAD: chemin enregistré
+dans le dessin (absolu, ou relatif au dossier du dessin hôte), puis nom du
+fichier dans le dossier de l'hôte et dans les dossiers de recherche; un
+fichier de même nom avec l'extension de l'hôte est aussi accepté (xref
+.dwg d'un dessin exporté en DXF).
+Chaque fichier référencé est extrait une fois par empreinte de contenu
+(blake2b) et par options d'extraction (profil, valeurs autorisées, héritées
+du dessin hôte) dans un cache partagé par tous les dessins hôtes
+(CacheXrefs), sous la clé <empreinte>-<options>:
+  - en mémoire, pour les dessins d'un même processus
+  - dans un dossier, pour les processus d'un lot:
+      <clé>_blocs.json   sortie complète de l'extraction
+      <clé>.json         résumé, écrit en dernier (extraction terminée)
+      <clé>.verrou       extraction en cours par un autre processus;
+                         contient la clé de la xref que ce processus
+                         attend à son tour
+Les xrefs imbriquées sont résolues par l'extraction de la xref elle-même;
+une xref qui se référence (directement ou non) est marquée 'circulaire'.
+Le cycle est reconnu sur la pile des dessins en cours d'extraction avant
+de prendre le verrou, et, pendant l'attente d'un verrou, en suivant la
+chaîne des xrefs attendues par les processus qui les tiennent (cycle
+réparti entre deux extractions parallèles).
+"""
+
+import hashlib
+import json
+import ntpath
+import os
+import time
+
+TAILLE_LECTURE = 1 << 20
+# Attente maximale (s) de l'extraction d'une xref par un autre processus,
+# au-delà la xref est extraite sans verrou
+ATTENTE_VERROU = 60
+INTERVALLE_VERROU = 0.2
+
+
+class XrefCirculaire(Exception):
+    """La xref est en cours d'extraction plus haut dans la chaîne des xrefs"""
+
+
+def empreinte_fichier(chemin):
+    """Empreinte hexadécimale du contenu du fichier"""
+    condense = hashlib.blake2b(digest_size=16)
+    with open(chemin, 'rb') as f:
+        for morceau in iter(lambda: f.read(TAILLE_LECTURE), b''):
+            condense.update(morceau)
+    return condense.hexdigest()
+
+
+def trouver_xref(chemin_xref, chemin_hote, dossiers_recherche=()):
+    """Fichier de la xref (chemin absolu), None s'il est introuvable"""
+    if not chemin_xref:
+        return None
+    # Chemins enregistrés sous Windows (séparateur \\) lus sur un autre système
+    chemin = chemin_xref.replace('\\', os.sep) if os.sep != '\\' else chemin_xref
+    nom = ntpath.basename(chemin_xref)
+    dossier_hote = os.path.dirname(os.path.abspath(chemin_hote))
+
+    candidats = [chemin if os.path.isabs(chemin) else os.path.join(dossier_hote, chemin)]
+    candidats.extend(os.path.join(dossier, nom) for dossier in (dossier_hote, *dossiers_recherche))
+    extension_hote = os.path.splitext(chemin_hote)[1]
+    for candidat in dict.fromkeys(candidats):
+        for fichier in (candidat, os.path.splitext(candidat)[0] + extension_hote):
+            if os.path.isfile(fichier):
+                return os.path.abspath(fichier)
+    return None
+
+
+class CacheXrefs:
+    """Extractions des xrefs par empreinte de contenu
+    dossier: cache partagé entre processus (None: en mémoire seulement)
+    dossiers_recherche: dossiers où chercher les fichiers des xrefs"""
+
+    def __init__(self, dossier=None, dossiers_recherche=(), attente=ATTENTE_VERROU):
+        self.dossier = dossier
+        self.dossiers_recherche = tuple(dossiers_recherche)
+        self.attente = attente
+        # Résumés et extractions gardées en mémoire (cache sans dossier) par clé
+        self.resumes = {}
+        self.extractions = {}
+        self._empreintes = {}
+        # Clés dont ce processus tient le verrou
+        self._verrous = set()
+        self.compteurs = {'extraites': 0, 'reutilisees': 0}
+        if dossier is not None:
+            os.makedirs(dossier, exist_ok=True)
+
+    def empreinte(self, fichier):
+        """Empreinte du fichier, recalculée seulement s'il a changé"""
+        etat = os.stat(fichier)
+        cle = (fichier, etat.st_size, etat.st_mtime_ns)
+        if cle not in self._empreintes:
+            self._empreintes[cle] = empreinte_fichier(fichier)
+        return self._empreintes[cle]
+
+    @staticmethod
+    def cle(empreinte, options=None):
+        """Clé du cache: empreinte du contenu et empreinte des options d'extraction"""
+        return f"{empreinte}-{options}" if options else empreinte
+
+    def _chemin(self, cle, suffixe):
+        return os.path.join(self.dossier, f"{cle}{suffixe}")
+
+    def sortie(self, cle):
+        """Fichier de la sortie complète d'une xref (None sans dossier)"""
+        return self._chemin(cle, '_blocs.json') if self.dossier is not None else None
+
+    def _lire_resume(self, cle):
+        try:
+            with open(self._chemin(cle, '.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _ecrire_resume(self, cle, resume):
+        chemin = self._chemin(cle, '.json')
+        temporaire = f"{chemin}.{os.getpid()}.tmp"
+        with open(temporaire, 'w', encoding='utf-8') as f:
+            json.dump(resume, f, indent=2, ensure_ascii=False)
+        os.replace(temporaire, chemin)
+
+    def _attendue(self, cle):
+        """Clé de la xref attendue par le processus qui tient le verrou"""
+        try:
+            with open(self._chemin(cle, '.verrou'), encoding='utf-8') as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def _signaler_attente(self, pile, cle):
+        """Inscrit dans le verrou du dessin en cours la xref qu'il attend"""
+        if pile and pile[-1] in self._verrous:
+            try:
+                with open(self._chemin(pile[-1], '.verrou'), 'w', encoding='utf-8') as f:
+                    f.write(cle or '')
+            except OSError:
+                pass
+
+    def _cycle(self, cle, pile):
+        """Vrai si la chaîne des xrefs attendues depuis `cle` revient
+        à un dessin de la pile"""
+        vues = set()
+        while cle is not None and cle not in vues:
+            if cle in pile:
+                return True
+            vues.add(cle)
+            cle = self._attendue(cle)
+        return False
+
+    def _attendre(self, cle, pile=()):
+        """Attend le résumé écrit par le processus qui tient le verrou;
+        None si le verrou est libéré sans résumé ou si l'attente est dépassée
+        Lève XrefCirculaire si ce processus attend (indirectement) la pile"""
+        limite = time.monotonic() + self.attente
+        verrou = self._chemin(cle, '.verrou')
+        self._signaler_attente(pile, cle)
+        try:
+            while time.monotonic() < limite:
+                resume = self._lire_resume(cle)
+                if resume is not None:
+                    return resume
+                if not os.path.exists(verrou):
+                    return self._lire_resume(cle)
+                if self._cycle(cle, pile):
+                    raise XrefCirculaire(cle)
+                time.sleep(INTERVALLE_VERROU)
+            return None
+        finally:
+            self._signaler_attente(pile, None)
+
+    def _reutiliser(self, cle, resume):
+        self.resumes[cle] = resume
+        self.compteurs['reutilisees'] += 1
+        return resume, False
+
+    def obtenir(self, fichier, extraire, pile=(), options=None):
+        """Résumé de l'extraction du fichier, extrait au premier besoin
+        extraire(fichier, cle, sortie) -> résumé (sortie: fichier JSON
+        à écrire, None pour un cache en mémoire)
+        pile: clés des dessins en cours d'extraction, de l'hôte au
+        dessin qui référence le fichier
+        options: empreinte des options d'extraction (voir cle)
+        Renvoie (clé, résumé, extrait: False si réutilisé)
+        Lève XrefCirculaire si le fichier est en cours d'extraction dans la pile"""
+        empreinte = self.empreinte(fichier)
+        cle = self.cle(empreinte, options)
+        if cle in pile:
+            raise XrefCirculaire(cle)
+        if cle in self.resumes:
+            return (cle, *self._reutiliser(cle, self.resumes[cle]))
+        if self.dossier is None:
+            return (cle, *self._extraire(fichier, empreinte, cle, extraire))
+
+        while True:
+            resume = self._lire_resume(cle)
+            if resume is not None:
+                return (cle, *self._reutiliser(cle, resume))
+            try:
+                descripteur = os.open(self._chemin(cle, '.verrou'), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                resume = self._attendre(cle, pile)
+                if resume is not None:
+                    return (cle, *self._reutiliser(cle, resume))
+                if os.path.exists(self._chemin(cle, '.verrou')):
+                    # Verrou abandonné (processus arrêté): extraction sans verrou
+                    return (cle, *self._extraire(fichier, empreinte, cle, extraire))
+                continue
+            os.close(descripteur)
+            self._verrous.add(cle)
+            try:
+                return (cle, *self._extraire(fichier, empreinte, cle, extraire))
+            finally:
+                self._verrous.discard(cle)
+                os.remove(self._chemin(cle, '.verrou'))
+
+    def _extraire(self, fichier, empreinte, cle, extraire):
+        resume = extraire(fichier, cle, self.sortie(cle))
+        resume = dict(resume, empreinte=empreinte, fichier=fichier, sortie=self.sortie(cle))
+        if self.dossier is not None:
+            self._ecrire_resume(cle, resume)
+        self.resumes[cle] = resume
+        self.compteurs['extraites'] += 1
+        return resume, True